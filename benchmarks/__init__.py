@@ -0,0 +1 @@
+"""Micro-benchmarks for webargs-starlette. Run with ``python -m benchmarks``."""
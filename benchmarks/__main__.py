@@ -0,0 +1,136 @@
+"""Run the benchmark suite.
+
+Usage::
+
+    python -m benchmarks [-k FILTER] [--save RESULTS.json]
+                         [--compare BASELINE.json] [--threshold 0.15]
+
+When ``--compare`` is passed, the command exits with status 1 if any case is
+slower, or allocates more, than the baseline by more than ``--threshold``
+(a fraction; 0.15 means 15%).
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+
+from .cases import Case, get_cases
+
+
+class Result(typing.NamedTuple):
+    #: Operations per second
+    ops: float
+    #: Peak memory allocated by one operation, in bytes, measured with tracemalloc
+    peak_bytes: int
+
+
+async def _measure(case: Case, min_time: float) -> Result:
+    # Warm up caches (schemas, location plans) before measuring
+    await case()
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        await case()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    iterations = 0
+    batch = 1
+    elapsed = 0.0
+    while elapsed < min_time:
+        start_time = time.perf_counter()
+        for _ in range(batch):
+            await case()
+        elapsed += time.perf_counter() - start_time
+        iterations += batch
+        batch *= 2
+    return Result(ops=iterations / elapsed, peak_bytes=peak - start)
+
+
+def run(cases: typing.Mapping[str, Case], min_time: float) -> typing.Dict[str, Result]:
+    async def run_all() -> typing.Dict[str, Result]:
+        results = {}
+        for name, case in cases.items():
+            results[name] = result = await _measure(case, min_time)
+            print(
+                f"{name:<45} {result.ops:>12,.1f} ops/s "
+                f"{result.peak_bytes / 1024:>10,.1f} KiB"
+            )
+        return results
+
+    return asyncio.run(run_all())
+
+
+def compare(
+    results: typing.Mapping[str, Result],
+    baseline: typing.Mapping[str, Result],
+    threshold: float,
+) -> typing.List[str]:
+    """Return a description of each regression of ``results`` against
+    ``baseline``.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if result.ops < base.ops * (1 - threshold):
+            regressions.append(
+                f"{name}: {result.ops:,.0f} ops/s vs {base.ops:,.0f} ops/s baseline"
+            )
+        if result.peak_bytes > base.peak_bytes * (1 + threshold):
+            regressions.append(
+                f"{name}: {result.peak_bytes:,} bytes vs "
+                f"{base.peak_bytes:,} bytes baseline"
+            )
+    return regressions
+
+
+def _load(path: str) -> typing.Dict[str, Result]:
+    with open(path) as fp:
+        data = json.load(fp)
+    return {name: Result(**result) for name, result in data["results"].items()}
+
+
+def _save(path: str, results: typing.Mapping[str, Result]) -> None:
+    data = {
+        "python": platform.python_version(),
+        "results": {name: result._asdict() for name, result in results.items()},
+    }
+    with open(path, "w") as fp:
+        json.dump(data, fp, indent=2)
+
+
+def main(argv: typing.Optional[typing.Sequence[str]] = None) -> int:
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    arg_parser.add_argument(
+        "-k", dest="filter", help="only run cases containing FILTER"
+    )
+    arg_parser.add_argument("--save", help="save results to a JSON file")
+    arg_parser.add_argument("--compare", help="compare results to a saved baseline")
+    arg_parser.add_argument("--threshold", type=float, default=0.15)
+    arg_parser.add_argument(
+        "--min-time", type=float, default=0.2, help="seconds to run each case for"
+    )
+    args = arg_parser.parse_args(argv)
+
+    cases = get_cases()
+    if args.filter:
+        cases = {name: case for name, case in cases.items() if args.filter in name}
+    results = run(cases, args.min_time)
+    if args.save:
+        _save(args.save, results)
+    if args.compare:
+        regressions = compare(results, _load(args.compare), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
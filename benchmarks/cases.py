@@ -0,0 +1,305 @@
+"""Benchmark cases.
+
+Each case is an async callable that performs one operation. Requests are built
+directly from an ASGI scope, so the numbers include building the `Request`
+but not running a Starlette app.
+"""
+import json
+import typing
+from urllib.parse import urlencode
+
+import marshmallow as ma
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from webargs import fields
+
+from webargs_starlette import (
+    StarletteParser,
+    WebargsHTTPException,
+    webargs_exception_handler,
+)
+from webargs_starlette.binary import cbor2, msgpack
+
+Case = typing.Callable[[], typing.Awaitable[typing.Any]]
+
+parser = StarletteParser()
+lightweight_parser = StarletteParser(lightweight_errors=True)
+
+USER_ARGS = {
+    "name": fields.Str(required=True),
+    "age": fields.Int(load_default=0),
+    "active": fields.Bool(load_default=True),
+}
+VALID = {"name": "Ada", "age": "36", "active": "true"}
+INVALID = {"age": "not a number", "active": "maybe"}
+
+#: Payload sizes for the JSON cases, in number of list items
+SIZES = {"tiny": 1, "1k": 60, "100k": 6_000, "2m": 120_000}
+
+
+def make_request(
+    method: str = "GET",
+    *,
+    query: typing.Optional[typing.Mapping[str, str]] = None,
+    headers: typing.Optional[typing.Mapping[str, str]] = None,
+    body: bytes = b"",
+    path_params: typing.Optional[dict] = None,
+) -> Request:
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    raw_headers = [
+        (key.lower().encode("latin-1"), value.encode("latin-1"))
+        for key, value in (headers or {}).items()
+    ]
+    if body:
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": "/",
+        "query_string": urlencode(query or {}).encode(),
+        "headers": raw_headers,
+        "path_params": path_params or {},
+    }
+    return Request(scope, receive)
+
+
+def _request_for(location: str, data: typing.Mapping[str, str]) -> Request:
+    if location in ("query", "querystring"):
+        return make_request(query=data)
+    if location == "path_params":
+        return make_request(path_params=dict(data))
+    if location == "headers":
+        return make_request(headers=data)
+    if location == "cookies":
+        cookie = "; ".join(f"{key}={value}" for key, value in data.items())
+        return make_request(headers={"Cookie": cookie})
+    if location in ("json", "json_or_form", "body"):
+        return make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=json.dumps(data).encode(),
+        )
+    if location == "form":
+        return make_request(
+            "POST",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            body=urlencode(data).encode(),
+        )
+    if location == "msgpack":
+        return make_request(
+            "POST",
+            headers={"Content-Type": "application/msgpack"},
+            body=msgpack.packb(dict(data)),
+        )
+    if location == "cbor":
+        return make_request(
+            "POST",
+            headers={"Content-Type": "application/cbor"},
+            body=cbor2.dumps(dict(data)),
+        )
+    if location == "multipart":
+        boundary = "benchmark"
+        parts = [
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n'
+            f"{value}\r\n"
+            for key, value in data.items()
+        ]
+        body = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        return make_request(
+            "POST",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            body=body,
+        )
+    raise ValueError(f"No request builder for location {location!r}")
+
+
+def _parse_case(location: str, data: typing.Mapping[str, str]) -> Case:
+    # Headers and cookies carry unrelated data in practice; ignore unknown keys
+    unknown = ma.EXCLUDE
+
+    async def case() -> typing.Any:
+        try:
+            return await parser.parse(
+                USER_ARGS,
+                _request_for(location, data),
+                location=location,
+                unknown=unknown,
+            )
+        except WebargsHTTPException:
+            return None
+
+    return case
+
+
+def _decorator_case(handler: typing.Callable, data: typing.Mapping[str, str]) -> Case:
+    async def case() -> typing.Any:
+        try:
+            return await handler(_request_for("query", data))
+        except WebargsHTTPException:
+            return None
+
+    return case
+
+
+@parser.use_args(USER_ARGS, location="query")
+async def use_args_handler(request, args):
+    return args
+
+
+@parser.use_kwargs(USER_ARGS, location="query")
+async def use_kwargs_handler(request, name, age, active):
+    return name
+
+
+@parser.use_annotations(location="query")
+async def use_annotations_handler(
+    request: Request, name: str, age: int = 0, active: bool = True
+):
+    return name
+
+
+@parser.use_annotations(location="query", compile=True)
+async def use_annotations_compiled_handler(
+    request: Request, name: str, age: int = 0, active: bool = True
+):
+    return name
+
+
+@parser.use_args(USER_ARGS, location="query")
+@parser.use_args({"x-request-id": fields.Str()}, location="headers", unknown=ma.EXCLUDE)
+async def stacked_use_args_handler(request, args, headers):
+    return args
+
+
+@parser.use_args(USER_ARGS, location="json")
+async def put_handler(request, args):
+    return args
+
+
+@parser.use_args(USER_ARGS, location="json", partial=True)
+async def patch_handler(request, args):
+    return args
+
+
+def _update_case(
+    handler: typing.Callable, method: str, data: typing.Mapping[str, str]
+) -> Case:
+    # PATCH loads with a cached partial copy of the schema: its cost should
+    # match PUT's for the same payload
+    body = json.dumps(data).encode()
+
+    async def case() -> typing.Any:
+        req = make_request(
+            method, headers={"Content-Type": "application/json"}, body=body
+        )
+        try:
+            return await handler(req)
+        except WebargsHTTPException:
+            return None
+
+    return case
+
+
+def _response_case(
+    case_parser: StarletteParser, data: typing.Mapping[str, str]
+) -> Case:
+    # Parse and build the response, including the error response
+    async def case() -> typing.Any:
+        req = _request_for("query", data)
+        try:
+            args = await case_parser.parse(USER_ARGS, req, location="query")
+        except WebargsHTTPException as exc:
+            return await webargs_exception_handler(req, exc)
+        return JSONResponse(args)
+
+    return case
+
+
+ITEM_ARGS = {
+    "items": fields.List(
+        fields.Nested({"id": fields.Int(), "name": fields.Str()}), required=True
+    )
+}
+
+
+#: Query string of a search request with a long tail of tracking parameters
+TRACKING_QUERY = {
+    **{f"utm_param_{i}": f"tracking value {i}" for i in range(200)},
+    **VALID,
+}
+
+
+def _query_tail_case() -> Case:
+    async def case() -> typing.Any:
+        return await parser.parse(
+            USER_ARGS, make_request(query=TRACKING_QUERY), location="query"
+        )
+
+    return case
+
+
+def _json_size_case(size: int, valid: bool) -> Case:
+    items = [{"id": i, "name": f"item-{i}"} for i in range(size)]
+    if not valid:
+        items[-1]["id"] = "not a number"
+    body = json.dumps({"items": items}).encode()
+
+    async def case() -> typing.Any:
+        req = make_request(
+            "POST", headers={"Content-Type": "application/json"}, body=body
+        )
+        try:
+            return await parser.parse(ITEM_ARGS, req, location="json")
+        except WebargsHTTPException:
+            return None
+
+    return case
+
+
+def get_cases() -> typing.Dict[str, Case]:
+    """Return all benchmark cases, by name."""
+    cases: typing.Dict[str, Case] = {}
+    for location in parser.__location_map__:
+        if location == "files":
+            # Not supported by StarletteParser
+            continue
+        if (location == "msgpack" and msgpack is None) or (
+            location == "cbor" and cbor2 is None
+        ):
+            # Optional dependency not installed
+            continue
+        for validity, data in (("valid", VALID), ("invalid", INVALID)):
+            cases[f"parse[{location}-{validity}]"] = _parse_case(location, data)
+    handlers = {
+        "use_args": use_args_handler,
+        "use_kwargs": use_kwargs_handler,
+        "use_annotations": use_annotations_handler,
+        "use_annotations_compiled": use_annotations_compiled_handler,
+        "stacked_use_args": stacked_use_args_handler,
+    }
+    for name, handler in handlers.items():
+        for validity, data in (("valid", VALID), ("invalid", INVALID)):
+            cases[f"{name}[{validity}]"] = _decorator_case(handler, data)
+    for name, case_parser in (("default", parser), ("lightweight", lightweight_parser)):
+        for validity, data in (("valid", VALID), ("invalid", INVALID)):
+            cases[f"response[{name}-{validity}]"] = _response_case(case_parser, data)
+    cases["parse[query-tracking_tail]"] = _query_tail_case()
+    cases["update[put]"] = _update_case(put_handler, "PUT", VALID)
+    cases["update[patch]"] = _update_case(patch_handler, "PATCH", VALID)
+    cases["update[patch-sparse]"] = _update_case(
+        patch_handler, "PATCH", {"name": "Ada"}
+    )
+    for size_name, size in SIZES.items():
+        for validity in ("valid", "invalid"):
+            cases[f"json_size[{size_name}-{validity}]"] = _json_size_case(
+                size, validity == "valid"
+            )
+    return cases
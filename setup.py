@@ -1,9 +1,18 @@
 import re
 from setuptools import setup, find_packages
 
-INSTALL_REQUIRES = ["webargs~=8.0", "starlette>=0.21.0", "marshmallow~=3.0"]
+INSTALL_REQUIRES = ["webargs>=8.3,<9", "starlette>=0.21.0", "marshmallow~=3.0"]
 EXTRAS_REQUIRE = {
-    "tests": ["pytest", "mock", "webtest~=2.0.32", "webtest-asgi~=1.1.0"],
+    "msgpack": ["msgpack>=1.0"],
+    "cbor": ["cbor2>=5.0"],
+    "tests": [
+        "pytest",
+        "mock",
+        "webtest~=2.0.32",
+        "webtest-asgi~=1.1.0",
+        "msgpack>=1.0",
+        "cbor2>=5.0",
+    ],
     "examples": ["httpie", "uvicorn"],
     "lint": [
         "mypy==0.971",
@@ -51,7 +60,7 @@ setup(
     author="Steven Loria",
     author_email="sloria1@gmail.com",
     url="https://github.com/sloria/webargs-starlette",
-    packages=find_packages(exclude=("test*", "examples")),
+    packages=find_packages(exclude=("test*", "examples", "benchmarks")),
     package_data={"webargs_starlette": ["py.typed"]},
     install_requires=INSTALL_REQUIRES,
     extras_require=EXTRAS_REQUIRE,
@@ -1,3 +1,6 @@
+import dataclasses
+import typing
+
 from starlette.applications import Starlette
 from starlette.responses import JSONResponse as J
 from starlette.endpoints import HTTPEndpoint
@@ -74,6 +77,12 @@ async def echo_use_args_validated(request, args):
     return J(args)
 
 
+@app.route("/echo_use_args_max_body_size", methods=["POST"])
+@use_args(hello_args, location="json", max_body_size=32)
+async def echo_use_args_max_body_size(request, args):
+    return J(args)
+
+
 @app.route("/echo_use_kwargs", methods=["GET"])
 @use_kwargs(hello_args, location="query")
 async def echo_use_kwargs(request, name):
@@ -98,12 +107,37 @@ async def echo_multi_json(request):
     return J(result)
 
 
+@app.route("/echo_multipart", methods=["POST"])
+@use_args(
+    {"name": hello_args["name"], "file": fields.Raw(required=True)},
+    location="multipart",
+)
+async def echo_multipart(request, args):
+    upload = args["file"]
+    position = upload.file.tell()
+    content = await upload.read()
+    return J(
+        {
+            "name": args["name"],
+            "filename": upload.filename,
+            "position": position,
+            "content": content.decode(),
+        }
+    )
+
+
 @app.route("/echo_many_schema", methods=["GET", "POST"])
 async def many_nested(request):
     arguments = await parser.parse(hello_many_schema, request, location="json")
     return J(arguments)
 
 
+@app.route("/echo_json_stream", methods=["POST"])
+@use_args(hello_many_schema, location="json_stream")
+async def echo_json_stream(request, records):
+    return J([record async for record in records])
+
+
 @app.route("/echo_use_args_with_path_param/{name}")
 @use_args({"value": fields.Int()}, location="query")
 async def echo_use_args_with_path(request, args):
@@ -168,12 +202,74 @@ class EchoEndpoint(HTTPEndpoint):
         return J(args)
 
 
+@app.route("/echo_annotations_compiled")
+@use_annotations(location="query", compile=True)
+async def echo_annotations_compiled(request, name: str = "World", count: int = 1):
+    return J({"name": name, "count": count})
+
+
+class UserSchema(ma.Schema):
+    id = fields.Int()
+    name = fields.Str()
+    tags = fields.List(fields.Str())
+
+
+@app.route("/echo_annotations_response")
+@use_annotations(location="query", response_schema=UserSchema)
+async def echo_annotations_response(request, name: str = "World") -> dict:
+    return {"id": 1, "name": name, "tags": ["a"], "password": "hidden"}
+
+
+@app.route("/echo_annotations_response_many")
+@use_annotations(location="query", response_schema=UserSchema(many=True))
+async def echo_annotations_response_many(
+    request, count: int = 2
+) -> typing.Union[typing.List[dict], J]:
+    if count < 0:
+        return J({"error": "negative count"}, status_code=400)
+    return [{"id": i, "name": f"user-{i}"} for i in range(count)]
+
+
 @app.route("/echo_endpoint_annotations/")
 class EchoEndpointAnnotations(HTTPEndpoint):
     @use_annotations(location="query")
     async def get(self, request, name: str = "World"):
         return J({"name": name})
 
+    @use_annotations(location="json")
+    async def patch(self, request, name: str):
+        return J({"name": name})
+
+
+@dataclasses.dataclass
+class NewUser:
+    name: str
+    tags: typing.List[str] = dataclasses.field(default_factory=list)
+
+
+@app.route("/echo_annotations_dataclass", methods=["POST"])
+@use_annotations(location="json")
+async def echo_annotations_dataclass(request, user: NewUser):
+    assert isinstance(user, NewUser)
+    return J(dataclasses.asdict(user))
+
+
+user_update_args = {
+    "name": fields.Str(required=True),
+    "email": fields.Str(required=True),
+}
+
+
+@app.route("/echo_endpoint_update/")
+class EchoEndpointUpdate(HTTPEndpoint):
+    @use_args(user_update_args, location="json")
+    async def put(self, request, args):
+        return J(args)
+
+    @use_args(user_update_args, location="json", partial=True)
+    async def patch(self, request, args):
+        return J(args)
+
 
 @app.exception_handler(WebargsHTTPException)
 async def http_exception(request, exc):
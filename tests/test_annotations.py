@@ -1,11 +1,27 @@
+import dataclasses
+import enum
+import sys
 import typing
 
 import pytest
 from starlette.requests import Request
 from starlette.responses import Response
-from marshmallow import fields
+from unittest import mock
 
-from webargs_starlette.annotations import annotations2schema, DEFAULT_TYPE_MAPPING
+import marshmallow as ma
+from marshmallow import Schema, fields
+
+from webargs_starlette.annotations import (
+    annotations2schema,
+    resolve_field_class,
+    return_annotation2schema,
+    structured_schema,
+    DEFAULT_TYPE_MAPPING,
+    TypeMappingError,
+)
+from webargs_starlette import WebargsHTTPException, use_annotations
+
+from .utils import make_request, run
 
 
 def test_annotations2schema():
@@ -94,3 +110,328 @@ def test_annotation2schema_type_not_in_mapping():
     schema = annotations2schema(func, type_mapping=type_mapping)()
     y_field = schema.fields["y"]
     assert isinstance(y_field, fields.Int)
+
+
+def test_annotations2schema_shares_schemas_of_identical_signatures():
+    def func1(request: Request, page: int = 1, q: typing.Optional[str] = None):
+        pass
+
+    def func2(request: Request, page: int = 1, q: typing.Optional[str] = None):
+        pass
+
+    def func3(request: Request, page: int = 2, q: typing.Optional[str] = None):
+        pass
+
+    schema_cls = annotations2schema(func1)
+    assert annotations2schema(func2) is schema_cls
+    other_schema_cls = annotations2schema(func3)
+    assert other_schema_cls is not schema_cls
+    # Fields of identical parameters are shared
+    assert other_schema_cls._declared_fields["q"] is schema_cls._declared_fields["q"]
+    assert other_schema_cls._declared_fields["page"].load_default == 2
+
+
+def test_annotations2schema_distinguishes_equal_defaults_of_different_types():
+    def func1(x: int = 1):
+        pass
+
+    def func2(x: int = True):
+        pass
+
+    assert annotations2schema(func1)().fields["x"].load_default is not True
+    assert annotations2schema(func2)().fields["x"].load_default is True
+
+
+def test_annotations2schema_unhashable_defaults():
+    def func1(x: list = [1]):  # noqa: B006
+        pass
+
+    def func2(x: list = [2]):  # noqa: B006
+        pass
+
+    assert annotations2schema(func1)().fields["x"].load_default == [1]
+    assert annotations2schema(func2)().fields["x"].load_default == [2]
+
+
+def test_annotations2schema_resolves_subclasses_of_mapped_types():
+    class Slug(str):
+        pass
+
+    def func(slug: typing.Optional[Slug] = None):
+        pass
+
+    schema = annotations2schema(func)()
+    assert isinstance(schema.fields["slug"], fields.Str)
+    assert schema.fields["slug"].allow_none is True
+
+
+class Level(enum.IntEnum):
+    LOW = 1
+    HIGH = 2
+
+
+class Mode(str, enum.Enum):
+    READ = "r"
+
+
+@pytest.mark.skipif(
+    not hasattr(fields, "Enum"), reason="fields.Enum requires marshmallow>=3.18"
+)
+def test_annotations2schema_loads_enum_members():
+    def func(level: Level, mode: Mode = Mode.READ):
+        pass
+
+    schema = annotations2schema(func)()
+    assert isinstance(schema.fields["level"], fields.Enum)
+    assert schema.load({"level": "HIGH"}) == {"level": Level.HIGH, "mode": Mode.READ}
+    assert schema.load({"level": "LOW", "mode": "READ"}) == {
+        "level": Level.LOW,
+        "mode": Mode.READ,
+    }
+    # Values of the mixin type are not members
+    for data in ({"level": 999}, {"level": "999"}, {"level": 1}, {"mode": "x"}):
+        with pytest.raises(ma.ValidationError):
+            schema.load({"level": "LOW", **data})
+
+
+@pytest.mark.skipif(
+    not hasattr(fields, "Enum"), reason="fields.Enum requires marshmallow>=3.18"
+)
+def test_use_annotations_passes_enum_members():
+    @use_annotations(location="query")
+    async def handler(request, level: Level):
+        return level
+
+    level = run(handler(make_request(query_string=b"level=HIGH")))
+    assert level is Level.HIGH
+    with pytest.raises(WebargsHTTPException) as excinfo:
+        run(handler(make_request(query_string=b"level=999")))
+    assert excinfo.value.status_code == 422
+
+
+def test_annotations2schema_does_not_load_enums_as_their_mixin_type():
+    class Priority(enum.IntEnum):
+        LOW = 1
+
+    def func(priority: Priority):
+        pass
+
+    with mock.patch("webargs_starlette.annotations._EnumField", None):
+        with pytest.raises(TypeMappingError):
+            annotations2schema(func)
+
+
+def test_resolve_field_class_is_memoized():
+    class Slug(str):
+        pass
+
+    type_mapping = DEFAULT_TYPE_MAPPING.copy()
+    assert resolve_field_class(Slug, type_mapping) is fields.String
+    type_mapping[Slug] = fields.Email
+    # The mapping changed: the memoized result is discarded
+    assert resolve_field_class(Slug, type_mapping) is fields.Email
+    assert resolve_field_class(Slug, DEFAULT_TYPE_MAPPING) is fields.String
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="PEP 604 requires Python>=3.10")
+def test_annotations2schema_handles_pep604_unions():
+    def func(x: int | None = None, y: list[int] | None = None):
+        pass
+
+    schema = annotations2schema(func)()
+    assert isinstance(schema.fields["x"], fields.Int)
+    assert schema.fields["x"].allow_none is True
+    assert isinstance(schema.fields["y"], fields.List)
+    assert isinstance(schema.fields["y"].inner, fields.Int)
+    assert schema.load({"x": None, "y": ["1"]}) == {"x": None, "y": [1]}
+
+
+@pytest.mark.skipif(
+    not hasattr(typing, "Annotated"), reason="typing.Annotated requires Python>=3.9"
+)
+def test_annotations2schema_handles_annotated():
+    positive = fields.Int(validate=lambda n: n > 0)
+
+    def func(x: typing.Annotated[int, "doc"], y: typing.Annotated[int, positive]):
+        pass
+
+    schema = annotations2schema(func)()
+    assert isinstance(schema.fields["x"], fields.Int)
+    assert schema.fields["x"].required is True
+    assert schema._declared_fields["y"] is positive
+
+
+@dataclasses.dataclass
+class Address:
+    city: str
+    zip_code: typing.Optional[str] = None
+
+
+@dataclasses.dataclass
+class Customer:
+    name: str
+    address: Address
+    tags: typing.List[str] = dataclasses.field(default_factory=list)
+    referrer: typing.Optional["Customer"] = None
+
+
+class Point(typing.NamedTuple):
+    x: int
+    y: int = 0
+
+
+def test_annotations2schema_handles_dataclasses():
+    def func(customer: Customer):
+        pass
+
+    schema = annotations2schema(func)()
+    customer = schema.load(
+        {
+            "customer": {
+                "name": "Ada",
+                "address": {"city": "London"},
+                "referrer": {"name": "Bob", "address": {"city": "Paris"}},
+            }
+        }
+    )["customer"]
+    assert customer == Customer(
+        "Ada", Address("London"), referrer=Customer("Bob", Address("Paris"))
+    )
+    with pytest.raises(ma.ValidationError) as excinfo:
+        schema.load({"customer": {"address": {"zip_code": 1}}})
+    assert excinfo.value.messages == {
+        "customer": {
+            "name": ["Missing data for required field."],
+            "address": {
+                "city": ["Missing data for required field."],
+                "zip_code": ["Not a valid string."],
+            },
+        }
+    }
+
+
+def test_annotations2schema_handles_namedtuples():
+    def func(point: Point, points: typing.List[Point] = []):  # noqa: B006
+        pass
+
+    schema = annotations2schema(func)()
+    assert schema.load({"point": {"x": "1"}, "points": [{"x": 3, "y": 4}]}) == {
+        "point": Point(1),
+        "points": [Point(3, 4)],
+    }
+    assert schema.load({"point": {"x": 1}}) == {"point": Point(1), "points": []}
+
+
+@pytest.mark.skipif(
+    not hasattr(typing, "TypedDict"), reason="typing.TypedDict requires Python>=3.8"
+)
+def test_annotations2schema_handles_typeddicts():
+    class Filters(typing.TypedDict, total=False):
+        status: str
+        limit: int
+
+    def func(filters: Filters):
+        pass
+
+    schema = annotations2schema(func)()
+    assert schema.load({"filters": {"limit": "2"}}) == {"filters": {"limit": 2}}
+    assert schema.load({"filters": {}}) == {"filters": {}}
+
+
+def test_structured_schema_is_generated_once_per_type():
+    def func1(customer: Customer):
+        pass
+
+    def func2(customer: Customer, point: Point):
+        pass
+
+    nested1 = annotations2schema(func1)().fields["customer"]
+    nested2 = annotations2schema(func2)().fields["customer"]
+    assert nested1.nested is nested2.nested is structured_schema(Customer)
+    assert structured_schema(int) is None
+
+
+def test_partial_structured_loads_return_dicts():
+    schema = structured_schema(Customer)()
+    assert schema.load({"name": "Ada"}, partial=True) == {"name": "Ada"}
+
+
+@pytest.mark.skipif(sys.version_info < (3, 10), reason="slots requires Python>=3.10")
+def test_slotted_dataclasses_are_loaded_directly():
+    @dataclasses.dataclass(slots=True, frozen=True)
+    class Item:
+        id: int
+        name: str = "item"
+
+    schema_cls = structured_schema(Item)
+    assert schema_cls.load_target is Item
+    with mock.patch.object(ma.Schema, "_do_load", side_effect=AssertionError):
+        assert schema_cls().load({"id": "1"}) == Item(1)
+    # Invalid data is reported by marshmallow
+    with pytest.raises(ma.ValidationError):
+        schema_cls().load({"id": "x"})
+    assert schema_cls().load([{"id": 2}], many=True) == [Item(2)]
+
+
+def test_dataclasses_with_post_init_are_constructed():
+    @dataclasses.dataclass
+    class Range:
+        start: int
+        end: int
+
+        def __post_init__(self):
+            if self.end < self.start:
+                raise ValueError("end before start")
+
+    schema_cls = structured_schema(Range)
+    assert schema_cls.load_target is None
+    assert schema_cls().load({"start": 1, "end": 2}) == Range(1, 2)
+
+
+class ReturnSchema(Schema):
+    id = fields.Int()
+
+
+def test_return_annotation2schema():
+    def one() -> ReturnSchema:
+        pass
+
+    def many() -> typing.List[ReturnSchema]:
+        pass
+
+    schema = ReturnSchema(many=True)
+
+    def instance() -> schema:  # type: ignore[valid-type]
+        pass
+
+    def other() -> typing.List[int]:
+        pass
+
+    def response() -> Response:
+        pass
+
+    def unannotated():
+        pass
+
+    assert return_annotation2schema(one) == (ReturnSchema, False)
+    assert return_annotation2schema(many) == (ReturnSchema, True)
+    assert return_annotation2schema(instance) == (schema, True)
+    assert return_annotation2schema(other) is None
+    assert return_annotation2schema(response) is None
+    assert return_annotation2schema(unannotated) is None
+
+
+@pytest.mark.skipif(sys.version_info < (3, 9), reason="requires typing.Annotated")
+def test_return_annotation2schema_handles_annotated():
+    def one() -> typing.Annotated[dict, ReturnSchema]:
+        pass
+
+    def many() -> typing.Annotated[typing.List[dict], ReturnSchema]:
+        pass
+
+    def other() -> typing.Annotated[dict, "other"]:
+        pass
+
+    assert return_annotation2schema(one) == (ReturnSchema, False)
+    assert return_annotation2schema(many) == (ReturnSchema, True)
+    assert return_annotation2schema(other) is None
@@ -0,0 +1,34 @@
+import pytest
+
+from benchmarks.__main__ import Result, compare, main
+from benchmarks.cases import get_cases
+from webargs_starlette import parser
+
+from .utils import run
+
+CASES = get_cases()
+
+
+def test_compare_reports_regressions():
+    baseline = {"fast": Result(ops=1000, peak_bytes=100)}
+    assert compare({"fast": Result(ops=900, peak_bytes=110)}, baseline, 0.15) == []
+    regressions = compare({"fast": Result(ops=800, peak_bytes=200)}, baseline, 0.15)
+    assert len(regressions) == 2
+
+
+def test_run_and_compare_against_saved_baseline(tmp_path):
+    baseline = str(tmp_path / "baseline.json")
+    argv = ["-k", "parse[query-valid]", "--min-time", "0.01"]
+    assert main(argv + ["--save", baseline]) == 0
+    assert main(argv + ["--compare", baseline, "--threshold", "1.0"]) == 0
+
+
+def test_cases_cover_every_location():
+    for location in parser.__location_map__:
+        if location != "files":
+            assert f"parse[{location}-valid]" in CASES
+
+
+@pytest.mark.parametrize("name", [name for name in CASES if "[2m-" not in name])
+def test_case_runs(name):
+    run(CASES[name]())
@@ -0,0 +1,186 @@
+import typing
+
+import pytest
+import marshmallow as ma
+from marshmallow import fields
+from unittest import mock
+
+from webargs_starlette.annotations import annotations2schema
+from webargs_starlette.compiler import compile_dumper, compile_schema
+
+
+@typing.no_type_check
+def handler(
+    page: int = 1,
+    q: typing.Optional[str] = None,
+    flag: bool = False,
+    ratio: float = 0.5,
+    ids: typing.List[int] = None,
+    name: fields.Str(validate=ma.validate.Length(min=2)) = "World",
+):
+    pass
+
+
+def required_handler(x: int, y: typing.List[str]):
+    pass
+
+
+@pytest.fixture(params=[handler, required_handler])
+def schemas(request):
+    schema_cls = annotations2schema(request.param)
+    return schema_cls(), compile_schema(schema_cls)()
+
+
+def load(schema, data, **kwargs):
+    try:
+        return schema.load(data, **kwargs)
+    except ma.ValidationError as error:
+        return error.messages
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        {"page": "2", "q": "term", "flag": "true", "ratio": "1.5", "ids": ["1", "2"]},
+        {"page": 3, "q": None, "flag": 0, "ratio": 2, "ids": (4, 5)},
+        {"page": "2.5"},
+        {"page": True},
+        {"page": 1.0},
+        {"ratio": "nan"},
+        {"ratio": "1e999"},
+        {"flag": "maybe"},
+        {"q": b"bytes"},
+        {"ids": ["1", "x"]},
+        {"ids": "1"},
+        {"name": "A"},
+        {"name": "Ada"},
+        {"x": "1", "y": ["a", None]},
+        {"x": "1", "y": ["a"]},
+        {"x": None, "y": []},
+        {"x": "1", "y": [], "extra": "value"},
+        ["not", "a", "mapping"],
+    ],
+)
+@pytest.mark.parametrize("unknown", [None, ma.EXCLUDE, ma.INCLUDE, ma.RAISE])
+def test_compiled_schema_matches_marshmallow(schemas, data, unknown):
+    schema, compiled = schemas
+    assert load(compiled, data, unknown=unknown) == load(schema, data, unknown=unknown)
+
+
+def test_valid_flat_data_does_not_use_marshmallow_load():
+    compiled = compile_schema(annotations2schema(handler))()
+    with mock.patch.object(ma.Schema, "_do_load", side_effect=AssertionError):
+        assert compiled.load({"page": "2", "ids": ["1"]}, unknown=ma.EXCLUDE) == {
+            "page": 2,
+            "q": None,
+            "flag": False,
+            "ratio": 0.5,
+            "ids": [1],
+        }
+
+
+class AddressSchema(ma.Schema):
+    city = fields.Str(required=True)
+    street = fields.Str(required=True)
+
+
+@pytest.mark.parametrize("partial", [True, ("x",), ("y",), ("address.city",)])
+@pytest.mark.parametrize(
+    "data",
+    [
+        {},
+        {"x": "1"},
+        {"y": ["a"], "page": "2"},
+        {"address": {"street": "Main"}},
+        {"x": "1", "y": [], "address": {"city": "Paris", "street": "Main"}},
+    ],
+)
+def test_partial_loader_matches_marshmallow(partial, data):
+    schema_cls = ma.Schema.from_dict(
+        {
+            "x": fields.Int(required=True),
+            "y": fields.List(fields.Str(), required=True),
+            "page": fields.Int(load_default=1),
+            "address": fields.Nested(AddressSchema),
+        }
+    )
+    compiled = compile_schema(schema_cls)(partial=partial)
+    assert compiled._compiled_loader is not None
+    assert load(compiled, data) == load(schema_cls(), data, partial=partial)
+
+
+def test_valid_partial_data_does_not_use_marshmallow_load():
+    schema_cls = ma.Schema.from_dict(
+        {"x": fields.Int(required=True), "y": fields.Int(load_default=1)}
+    )
+    compiled = compile_schema(schema_cls)(partial=True)
+    with mock.patch.object(ma.Schema, "_do_load", side_effect=AssertionError):
+        assert compiled.load({"x": "2"}) == {"x": 2}
+
+
+def test_schema_with_hooks_is_not_compiled():
+    class HookSchema(ma.Schema):
+        x = fields.Int()
+
+        @ma.post_load
+        def double(self, data, **kwargs):
+            return {"x": data["x"] * 2}
+
+    assert compile_schema(HookSchema)().load({"x": "2"}) == {"x": 4}
+
+
+class DumpSchema(ma.Schema):
+    id = fields.Int()
+    name = fields.Str(data_key="userName")
+    score = fields.Float()
+    active = fields.Bool()
+    label = fields.Str(attribute="title")
+    tags = fields.List(fields.Str())
+    count = fields.Int(dump_default=0)
+
+
+class User:
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+@pytest.mark.parametrize(
+    "obj",
+    [
+        {},
+        {"id": 1, "name": "Ada", "score": 1.5, "active": True, "title": "x"},
+        {"id": None, "name": None, "tags": ["a", "b"], "count": 3},
+        {"id": True, "score": 2, "active": 1},
+        {"id": "1", "name": 42},
+        {"items": 1},
+        User(id=1, name="Ada", tags=("a",)),
+        User(),
+    ],
+)
+def test_compiled_dumper_matches_marshmallow(obj):
+    schema = DumpSchema()
+    dump = compile_dumper(schema)
+    assert dump(obj, False) == schema.dump(obj)
+    assert dump([obj, obj], True) == schema.dump([obj, obj], many=True)
+
+
+def test_flat_objects_do_not_use_marshmallow_dump():
+    dump = compile_dumper(DumpSchema())
+    with mock.patch.object(ma.Schema, "_serialize", side_effect=AssertionError):
+        assert dump({"id": 1, "name": "Ada"}, False) == {
+            "id": 1,
+            "userName": "Ada",
+            "count": 0,
+        }
+
+
+def test_schema_with_dump_hooks_is_not_compiled():
+    class HookSchema(ma.Schema):
+        x = fields.Int()
+
+        @ma.post_dump
+        def wrap(self, data, **kwargs):
+            return {"data": data}
+
+    assert compile_dumper(HookSchema()) is None
@@ -0,0 +1,88 @@
+from webargs_starlette.datastructures import HeaderIndex, LazyCookies, QueryParams
+
+
+class TestHeaderIndex:
+    def test_lookups_are_case_insensitive(self):
+        index = HeaderIndex([(b"x-token", b"abc"), (b"accept", b"text/html")])
+        assert index["X-Token"] == "abc"
+        assert index.get("ACCEPT") == "text/html"
+        assert index.get("missing", "default") == "default"
+        assert "X-TOKEN" in index
+        assert 42 not in index
+        assert list(index) == ["x-token", "accept"]
+        assert len(index) == 2
+
+    def test_repeated_headers(self):
+        index = HeaderIndex(
+            [(b"x-forwarded-for", b"1.1.1.1"), (b"x-forwarded-for", b"2.2.2.2")]
+        )
+        assert index["X-Forwarded-For"] == "1.1.1.1"
+        assert index.getlist("x-forwarded-for") == ["1.1.1.1", "2.2.2.2"]
+        assert index.getlist("x-missing") == []
+        assert len(index) == 1
+
+    def test_built_once_per_scope(self):
+        scope = {"type": "http", "headers": [(b"x-token", b"abc")]}
+        index = HeaderIndex.from_scope(scope)
+        assert HeaderIndex.from_scope(scope) is index
+
+
+class TestLazyCookies:
+    def test_parsing(self):
+        cookies = LazyCookies('session=abc; theme="dark\\054blue"; flag; a=1; a=2')
+        assert cookies["session"] == "abc"
+        assert cookies["theme"] == "dark,blue"
+        assert cookies[""] == "flag"
+        assert cookies["a"] == "2"
+        assert cookies.get("missing") is None
+        assert set(cookies) == {"session", "theme", "", "a"}
+
+    def test_only_looked_up_values_are_unquoted(self):
+        cookies = LazyCookies('a="1"; b="2"')
+        assert cookies["a"] == "1"
+        assert cookies._values == {"a": "1"}
+
+    def test_empty_header(self):
+        scope = {"type": "http", "headers": []}
+        cookies = LazyCookies.from_scope(scope)
+        assert dict(cookies) == {}
+        assert LazyCookies.from_scope(scope) is cookies
+
+
+class TestQueryParams:
+    def test_parsing(self):
+        query = QueryParams(b"a=1&a=2&b=x+y%21&c&&d=", ["a", "b", "c", "d"])
+        assert query["a"] == "2"
+        assert query.getlist("a") == ["1", "2"]
+        assert query["b"] == "x y!"
+        assert query["c"] == ""
+        assert query["d"] == ""
+        assert list(query) == ["a", "b", "c", "d"]
+        assert len(query) == 4
+
+    def test_only_keys_are_indexed(self):
+        query = QueryParams(b"utm=1&na%6De=Ada&other=2", ["name"])
+        assert query["name"] == "Ada"
+        assert query._index == {"name": [b"Ada"]}
+        # Other keys are still found, with a full scan
+        assert query["other"] == "2"
+        assert "utm" in query
+        assert "missing" not in query
+
+    def test_encoded_keys(self):
+        query = QueryParams(b"na%6De=Ada&n+a=1&name=Al", ["name", "n a"])
+        assert query.getlist("name") == ["Ada", "Al"]
+        assert query["n a"] == "1"
+        query = QueryParams(b"a+b=1&a%2Bb=2", ["a+b"])
+        assert query["a+b"] == "2"
+
+    def test_list_delimiter(self):
+        query = QueryParams(b"ids=1,2&ids=3%2C4", ["ids"], list_delimiter=b",")
+        assert query.getlist("ids") == ["1", "2", "3,4"]
+        assert query["ids"] == "3,4"
+
+    def test_max_params(self):
+        query = QueryParams(b"a=1&b=2&c=3", ["a", "c"], max_params=2)
+        assert query["a"] == "1"
+        assert "c" not in query
+        assert list(query) == ["a", "b"]
@@ -0,0 +1,116 @@
+import pytest
+import marshmallow as ma
+from marshmallow import fields
+from webargs.fields import DelimitedList
+
+from webargs_starlette.compiler import compile_schema
+from webargs_starlette.failfast import fail_fast_schema
+
+
+class CountingInt(fields.Int):
+    def __init__(self, calls, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = calls
+
+    def _deserialize(self, value, attr, data, **kwargs):
+        self.calls.append(value)
+        return super()._deserialize(value, attr, data, **kwargs)
+
+
+class ItemSchema(ma.Schema):
+    id = fields.Int(required=True)
+    name = fields.Str(required=True)
+
+
+class OrderSchema(ma.Schema):
+    customer = fields.Str(required=True)
+    items = fields.List(fields.Nested(ItemSchema), required=True)
+    tags = fields.Dict(keys=fields.Str(), values=fields.Int())
+    parent = fields.Nested(lambda: OrderSchema(), allow_none=True)
+
+
+def first_error(schema, data, **kwargs):
+    with pytest.raises(ma.ValidationError) as excinfo:
+        fail_fast_schema(schema).load(data, **kwargs)
+    return excinfo.value.messages
+
+
+def test_stops_at_first_field():
+    schema = ma.Schema.from_dict({"a": fields.Int(), "b": fields.Int()})()
+    assert first_error(schema, {"a": "x", "b": "y"}) == {"a": ["Not a valid integer."]}
+    with pytest.raises(ma.ValidationError) as excinfo:
+        schema.load({"a": "x", "b": "y"})
+    assert len(excinfo.value.messages) == 2
+
+
+def test_stops_at_first_list_item():
+    calls = []
+    schema = ma.Schema.from_dict({"ids": fields.List(CountingInt(calls))})()
+    assert first_error(schema, {"ids": [1, "x", "y", 4]}) == {
+        "ids": {1: ["Not a valid integer."]}
+    }
+    assert calls == [1, "x"]
+
+
+def test_delimited_list():
+    schema = ma.Schema.from_dict({"ids": DelimitedList(fields.Int())})()
+    assert first_error(schema, {"ids": "1,x,y"}) == {
+        "ids": {1: ["Not a valid integer."]}
+    }
+    assert fail_fast_schema(schema).load({"ids": "1,2"}) == {"ids": [1, 2]}
+    assert fail_fast_schema(schema).load({"ids": ""}) == {"ids": []}
+
+
+def test_nested_and_mappings():
+    data = {
+        "customer": "Ada",
+        "items": [{"id": 1, "name": "a"}, {"id": "x"}, {"id": "y"}],
+    }
+    assert first_error(OrderSchema(), data) == {
+        "items": {1: {"id": ["Not a valid integer."]}}
+    }
+    data = {"customer": "Ada", "items": [], "tags": {"a": 1, "b": "x", "c": "y"}}
+    assert first_error(OrderSchema(), data) == {
+        "tags": {"b": {"value": ["Not a valid integer."]}}
+    }
+    data = {"customer": "Ada", "items": [], "parent": {"items": []}}
+    assert first_error(OrderSchema(), data) == {
+        "parent": {"customer": ["Missing data for required field."]}
+    }
+
+
+def test_many():
+    schema = ItemSchema(many=True)
+    assert first_error(schema, [{"id": 1, "name": "a"}, {"id": 2}, {}]) == {
+        1: {"name": ["Missing data for required field."]}
+    }
+
+
+def test_valid_data_loads_as_usual():
+    data = {
+        "customer": "Ada",
+        "items": [{"id": 1, "name": "a"}],
+        "tags": {"a": 1},
+        "parent": {"customer": "Bob", "items": []},
+    }
+    assert fail_fast_schema(OrderSchema()).load(data) == OrderSchema().load(data)
+
+
+def test_schema_is_unchanged():
+    schema = OrderSchema()
+    fail_fast_schema(schema)
+    with pytest.raises(ma.ValidationError) as excinfo:
+        schema.load({"items": [{"id": "x"}, {"id": "y"}]})
+    assert excinfo.value.messages["items"].keys() == {0, 1}
+
+
+def test_compiled_schema():
+    calls = []
+    schema_cls = compile_schema(
+        ma.Schema.from_dict({"ids": fields.List(CountingInt(calls))})
+    )
+    assert first_error(schema_cls(), {"ids": ["x", "y"]}) == {
+        "ids": {0: ["Not a valid integer."]}
+    }
+    # Once by the compiled loader, once by marshmallow after the fallback
+    assert calls == ["x", "x"]
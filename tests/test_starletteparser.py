@@ -1,9 +1,43 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+
+import cbor2
+import msgpack
+
+import marshmallow as ma
 import pytest
 
+from webargs import fields
 from webargs.testing import CommonTestCase
 from webtest_asgi import TestApp
 
-from .app import app
+from webargs_starlette import (
+    OffloadPolicy,
+    ResultCache,
+    StarletteParser,
+    WebargsHTTPException,
+    webargs_exception_handler,
+)
+from webargs_starlette.metrics import (
+    Histogram,
+    ParseMetrics,
+    ParseMetricsMiddleware,
+    ParseStats,
+)
+from webargs_starlette.multipart import MultipartLimits
+from webargs_starlette.streaming import iter_json_array
+from webargs_starlette.compiler import compile_schema
+from .app import app, parser, hello_args, HelloSchema, user_update_args
+from .utils import make_request, run
+
+
+@pytest.fixture
+def testapp():
+    return TestApp(app)
 
 
 class TestStarletteParser(CommonTestCase):
@@ -32,3 +66,1545 @@ class TestStarletteParser(CommonTestCase):
     def test_endpoint_method(self, testapp, url):
         assert testapp.get(url).json == {"name": "World"}
         assert testapp.get(url + "?name=Ada").json == {"name": "Ada"}
+
+    def test_use_annotations_compiled(self, testapp):
+        url = "/echo_annotations_compiled"
+        assert testapp.get(url).json == {"name": "World", "count": 1}
+        assert testapp.get(url + "?count=3").json == {"name": "World", "count": 3}
+        res = testapp.get(url + "?count=x", expect_errors=True)
+        assert res.status_code == 422
+        assert res.json == {"query": {"count": ["Not a valid integer."]}}
+
+    def test_use_annotations_dataclass(self, testapp):
+        url = "/echo_annotations_dataclass"
+        res = testapp.post_json(url, {"user": {"name": "Ada"}})
+        assert res.json == {"name": "Ada", "tags": []}
+        res = testapp.post_json(url, {"user": {"tags": [1]}}, expect_errors=True)
+        assert res.status_code == 422
+        assert res.json == {
+            "json": {
+                "user": {
+                    "name": ["Missing data for required field."],
+                    "tags": {"0": ["Not a valid string."]},
+                }
+            }
+        }
+
+    def test_use_annotations_response(self, testapp):
+        res = testapp.get("/echo_annotations_response?name=Ada")
+        assert res.content_type == "application/json"
+        assert res.json == {"id": 1, "name": "Ada", "tags": ["a"]}
+        res = testapp.get("/echo_annotations_response_many")
+        assert res.json == [{"id": 0, "name": "user-0"}, {"id": 1, "name": "user-1"}]
+        res = testapp.get("/echo_annotations_response_many?count=-1", status=400)
+        assert res.json == {"error": "negative count"}
+
+
+class TestSchemaCache:
+    def test_dict_argmap_reuses_schema_instance(self):
+        parser = StarletteParser()
+        argmap = {"name": fields.Str()}
+        schema = parser.get_schema(argmap)
+        assert parser.get_schema(argmap) is schema
+        info = parser.schema_cache.cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    def test_schema_class_argmap_reuses_schema_instance(self):
+        parser = StarletteParser()
+        schema = parser.get_schema(HelloSchema)
+        assert isinstance(schema, HelloSchema)
+        assert parser.get_schema(HelloSchema) is schema
+
+    def test_schema_instance_is_not_cached(self):
+        parser = StarletteParser()
+        schema = HelloSchema()
+        assert parser.get_schema(schema) is schema
+        assert len(parser.schema_cache) == 0
+
+    def test_least_recently_used_schema_is_evicted(self):
+        parser = StarletteParser(schema_cache_size=1)
+        first, second = {"a": fields.Int()}, {"b": fields.Int()}
+        first_schema = parser.get_schema(first)
+        parser.get_schema(second)
+        assert len(parser.schema_cache) == 1
+        assert parser.get_schema(first) is not first_schema
+
+    def test_use_args_builds_schema_once(self, testapp):
+        parser.schema_cache.clear()
+        testapp.get("/echo_use_args?name=Ada")
+        testapp.get("/echo_use_args?name=Ada")
+        assert parser.schema_cache.cache_info().misses == 0
+
+
+class TestJSONLoads:
+    def test_custom_json_loads_receives_raw_bytes(self):
+        received = []
+
+        def loads(body):
+            received.append(body)
+            return json.loads(body)
+
+        parser = StarletteParser(json_loads=loads)
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=b'{"name": "Ada"}',
+        )
+        assert run(parser.parse(hello_args, req)) == {"name": "Ada"}
+        assert received == [b'{"name": "Ada"}']
+
+    def test_custom_json_loads_errors_are_invalid_json(self):
+        def loads(body):
+            raise ValueError("nope")
+
+        parser = StarletteParser(json_loads=loads)
+        req = make_request(
+            "POST", headers={"Content-Type": "application/json"}, body=b"{}"
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req))
+        assert excinfo.value.status_code == 400
+        assert excinfo.value.messages == {"json": ["Invalid JSON body."]}
+
+    def test_empty_body_is_missing(self):
+        parser = StarletteParser(json_loads=lambda body: pytest.fail("called"))
+        req = make_request("POST", headers={"Content-Type": "application/json"})
+        assert run(parser.parse(hello_args, req)) == {"name": "World"}
+
+
+class TestMaxBodySize:
+    def test_content_length_over_limit_is_rejected_before_reading(self):
+        parser = StarletteParser(max_body_size=10)
+        # No body messages: reading the body would raise ClientDisconnect
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json", "Content-Length": "100"},
+            body=[],
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req))
+        assert excinfo.value.status_code == 413
+
+    def test_streamed_body_is_cut_off_at_limit(self):
+        parser = StarletteParser(max_body_size=10)
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=[b'{"name": ', b'"Ada Lovelace"', b"}"],
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req))
+        assert excinfo.value.status_code == 413
+        assert "body" in excinfo.value.messages
+
+    def test_body_within_limit_is_parsed(self):
+        parser = StarletteParser(max_body_size=100)
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=[b'{"name": ', b'"Ada"}'],
+        )
+        assert run(parser.parse(hello_args, req)) == {"name": "Ada"}
+        assert run(req.json()) == {"name": "Ada"}
+
+    def test_per_call_limit_overrides_parser_limit(self):
+        parser = StarletteParser(max_body_size=100)
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            body=b"name=Ada+Lovelace",
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req, location="form", max_body_size=5))
+        assert excinfo.value.status_code == 413
+
+    def test_form_within_limit_is_parsed(self):
+        parser = StarletteParser(max_body_size=100)
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            body=b"name=Ada",
+        )
+        assert run(parser.parse(hello_args, req, location="form")) == {"name": "Ada"}
+
+    def test_use_args_max_body_size(self, testapp):
+        res = testapp.post_json(
+            "/echo_use_args_max_body_size", {"name": "x" * 100}, expect_errors=True
+        )
+        assert res.status_code == 413
+        res = testapp.post_json("/echo_use_args_max_body_size", {"name": "Ada"})
+        assert res.json == {"name": "Ada"}
+
+
+def _multipart_body(boundary, *parts, close=True):
+    lines = []
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename:
+            disposition += f'; filename="{filename}"'
+        lines += [f"--{boundary}", f"Content-Disposition: {disposition}", "", value]
+    if close:
+        lines.append(f"--{boundary}--")
+    return "\r\n".join(lines).encode() + b"\r\n"
+
+
+class TestMultipart:
+    def test_file_is_passed_as_unread_upload(self, testapp):
+        res = testapp.post(
+            "/echo_multipart",
+            {"name": "Ada"},
+            upload_files=[("file", "hello.txt", b"hello world")],
+        )
+        assert res.json == {
+            "name": "Ada",
+            "filename": "hello.txt",
+            "position": 0,
+            "content": "hello world",
+        }
+
+    def test_invalid_field_fails_request(self, testapp):
+        res = testapp.post(
+            "/echo_multipart",
+            {"name": "b"},
+            upload_files=[("file", "hello.txt", b"hello world")],
+            expect_errors=True,
+        )
+        assert res.status_code == 422
+        assert res.json == {"multipart": {"name": ["Invalid value."]}}
+
+    def test_invalid_field_fails_before_file_is_received(self):
+        boundary = "xyz"
+        # The body ends in the middle of the file part; reading past the first
+        # part would fail with an incomplete body rather than a validation error
+        body = _multipart_body(
+            boundary, ("name", "b", None), ("file", "partial", "a.txt"), close=False
+        )
+        req = make_request(
+            "POST",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            body=[body, b"more file data"],
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req, location="multipart"))
+        assert excinfo.value.status_code == 422
+        assert excinfo.value.messages == {"multipart": {"name": ["Invalid value."]}}
+
+    def test_part_size_limit(self):
+        limited_parser = StarletteParser(
+            multipart_limits=MultipartLimits(max_part_size=4)
+        )
+        boundary = "xyz"
+        req = make_request(
+            "POST",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            body=_multipart_body(boundary, ("name", "Ada Lovelace", None)),
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(limited_parser.parse(hello_args, req, location="multipart"))
+        assert excinfo.value.status_code == 413
+
+    def test_large_file_is_spooled_to_disk(self):
+        limited_parser = StarletteParser(
+            multipart_limits=MultipartLimits(spool_max_size=4)
+        )
+        boundary = "xyz"
+        req = make_request(
+            "POST",
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            body=_multipart_body(boundary, ("file", "0123456789", "a.txt")),
+        )
+        args = {"file": fields.Raw()}
+        parsed = run(limited_parser.parse(args, req, location="multipart"))
+        assert parsed["file"].file._rolled is True
+        assert parsed["file"].size == 10
+
+    def test_multi_value_and_delimited_fields(self):
+        boundary = "xyz"
+        args = {
+            "ids": fields.DelimitedList(fields.Int()),
+            "tags": fields.List(fields.Int()),
+        }
+
+        def parse(*parts):
+            req = make_request(
+                "POST",
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+                body=_multipart_body(boundary, *parts),
+            )
+            return run(parser.parse(args, req, location="multipart"))
+
+        assert parse(
+            ("ids", "1,2,3", None), ("tags", "4", None), ("tags", "5", None)
+        ) == {
+            "ids": [1, 2, 3],
+            "tags": [4, 5],
+        }
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            parse(("ids", "1,x", None))
+        assert excinfo.value.messages == {
+            "multipart": {"ids": {1: ["Not a valid integer."]}}
+        }
+
+    def test_non_multipart_request_is_missing(self):
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=b'{"name": "Ada"}',
+        )
+        assert run(parser.parse(hello_args, req, location="multipart")) == {
+            "name": "World"
+        }
+
+
+class TestLocationPlanning:
+    @pytest.mark.parametrize("location", ["json", "form", "json_or_form", "multipart"])
+    def test_body_is_not_read_for_get_without_body(self, location):
+        # No body messages: reading the body would raise ClientDisconnect
+        req = make_request("GET", headers={"Content-Type": "application/json"}, body=[])
+        assert run(parser.parse(hello_args, req, location=location)) == {
+            "name": "World"
+        }
+
+    def test_body_is_read_for_get_with_content_length(self):
+        req = make_request(
+            "GET",
+            headers={"Content-Type": "application/json", "Content-Length": "15"},
+            body=b'{"name": "Ada"}',
+        )
+        assert run(parser.parse(hello_args, req)) == {"name": "Ada"}
+
+    def test_json_or_form_ignores_other_content_types(self):
+        req = make_request("POST", headers={"Content-Type": "text/plain"}, body=[])
+        assert run(parser.parse(hello_args, req, location="json_or_form")) == {
+            "name": "World"
+        }
+
+    def test_json_or_form_reads_form(self):
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            body=b"name=Ada",
+        )
+        assert run(parser.parse(hello_args, req, location="json_or_form")) == {
+            "name": "Ada"
+        }
+
+    def test_plan_is_computed_once_per_schema(self):
+        schema = parser.get_schema(hello_args)
+        plan = parser._get_location_plan(schema, "json")
+        assert plan.reads_body is True
+        assert parser._get_location_plan(schema, "json") is plan
+        assert parser._get_location_plan(schema, "query").reads_body is False
+
+    @pytest.mark.parametrize(
+        "kwargs", [{}, {"partial": True}, {"fail_fast": True}, {"cache": ResultCache()}]
+    )
+    def test_argmap_factory_does_not_grow_caches(self, kwargs):
+        factory_parser = StarletteParser()
+
+        for name in ["Ada", "Grace", "Alan"]:
+            req = make_request(query_string=f"name={name}".encode())
+            parsed = run(
+                factory_parser.parse(
+                    lambda req: HelloSchema(), req, location="query", **kwargs
+                )
+            )
+            assert parsed == {"name": name}
+        assert len(factory_parser._location_plans) == 0
+        assert len(factory_parser._partial_schemas) == 0
+        assert len(factory_parser._fail_fast_schemas) == 0
+        assert len(kwargs.get("cache", ())) == 0
+
+    def test_invalid_location(self):
+        with pytest.raises(ValueError, match="Invalid location"):
+            run(parser.parse(hello_args, make_request(), location="invalid"))
+
+
+class TestQueryString:
+    def test_only_schema_keys_are_decoded(self):
+        req = make_request(query_string=b"utm_source=x%ZZ&name=Ada+L&utm_medium=y")
+        assert run(parser.parse(hello_args, req, location="query")) == {"name": "Ada L"}
+
+    def test_list_delimiter(self):
+        delimited_parser = StarletteParser(query_list_delimiter=",")
+        req = make_request(query_string=b"ids=1,2&ids=3&tag=a%2Cb")
+        args = {"ids": fields.List(fields.Int()), "tag": fields.List(fields.Str())}
+        assert run(delimited_parser.parse(args, req, location="query")) == {
+            "ids": [1, 2, 3],
+            "tag": ["a,b"],
+        }
+
+    def test_max_query_params(self):
+        limited_parser = StarletteParser(max_query_params=2)
+        req = make_request(query_string=b"a=1&b=2&name=Ada")
+        assert run(limited_parser.parse(hello_args, req, location="query")) == {
+            "name": "World"
+        }
+
+    def test_query_string_too_long(self):
+        limited_parser = StarletteParser(max_query_string_length=8)
+        req = make_request(query_string=b"name=Ada&x=1")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(limited_parser.parse(hello_args, req, location="query"))
+        assert excinfo.value.status_code == 414
+
+    def test_unknown_keys_are_raised(self):
+        req = make_request(query_string=b"name=Ada&na%6De2=x")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req, location="query", unknown=ma.RAISE))
+        assert excinfo.value.messages == {"query": {"name2": ["Unknown field."]}}
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseSerialization:
+    def test_response_schema(self):
+        dumps = []
+
+        def json_dumps(data):
+            dumps.append(data)
+            return json.dumps(data).encode()
+
+        custom_parser = StarletteParser(json_dumps=json_dumps)
+
+        @custom_parser.use_annotations(
+            location="query", response_schema={"total": fields.Int()}
+        )
+        async def handler(request, page: int = 1):
+            return {"total": page * 10, "other": True}
+
+        response = run(handler(make_request(query_string=b"page=2")))
+        assert response.body == b'{"total": 20}'
+        assert response.media_type == "application/json"
+        assert dumps == [{"total": 20}]
+
+    def test_no_response_schema(self):
+        @parser.use_annotations(location="query")
+        async def handler(request) -> dict:
+            return {"raw": True}
+
+        assert run(handler(make_request())) == {"raw": True}
+
+
+class TestResultCache:
+    def _counting_args(self):
+        calls = []
+
+        def count(value):
+            calls.append(value)
+            return True
+
+        args = {"page": fields.Int(validate=count), "tags": fields.List(fields.Str())}
+        return args, calls
+
+    def test_results_are_cached(self):
+        cache = ResultCache()
+        args, calls = self._counting_args()
+        for query_string in (b"page=2&tags=a&utm=1", b"utm=2&page=2&tags=a"):
+            req = make_request(query_string=query_string)
+            result = run(parser.parse(args, req, location="query", cache=cache))
+            assert result == {"page": 2, "tags": ["a"]}
+        assert calls == [2]
+        assert cache.cache_info().hits == 1
+        req = make_request(query_string=b"page=3")
+        run(parser.parse(args, req, location="query", cache=cache))
+        assert calls == [2, 3]
+
+    def test_cached_results_are_copied(self):
+        cache = ResultCache()
+        args, _ = self._counting_args()
+        req = make_request(query_string=b"tags=a")
+        result = run(parser.parse(args, req, location="query", cache=cache))
+        result["tags"].append("b")
+        req = make_request(query_string=b"tags=a")
+        assert run(parser.parse(args, req, location="query", cache=cache)) == {
+            "tags": ["a"]
+        }
+
+    def test_ttl(self):
+        timer = FakeTimer()
+        cache = ResultCache(ttl=10, timer=timer)
+        args, calls = self._counting_args()
+        for now in (0, 5, 10):
+            timer.now = now
+            req = make_request(query_string=b"page=1")
+            run(parser.parse(args, req, location="query", cache=cache))
+        assert calls == [1, 1]
+
+    def test_only_get_requests_are_cached(self):
+        cache = ResultCache()
+        args, calls = self._counting_args()
+        for _ in range(2):
+            req = make_request("POST", query_string=b"page=1")
+            run(parser.parse(args, req, location="query", cache=cache))
+        assert calls == [1, 1]
+        assert len(cache) == 0
+
+    def test_unknown_arguments_are_part_of_the_key(self):
+        cache = ResultCache()
+        req = make_request(query_string=b"name=Ada")
+        run(
+            parser.parse(
+                hello_args, req, location="query", cache=cache, unknown=ma.RAISE
+            )
+        )
+        req = make_request(query_string=b"name=Ada&other=1")
+        with pytest.raises(WebargsHTTPException):
+            run(
+                parser.parse(
+                    hello_args, req, location="query", cache=cache, unknown=ma.RAISE
+                )
+            )
+
+    def test_body_locations_are_rejected(self):
+        with pytest.raises(ValueError, match="cannot be cached"):
+            parser.use_args(hello_args, location="json", cache=ResultCache())
+        with pytest.raises(ValueError, match="cannot be cached"):
+            run(parser.parse(hello_args, make_request(), cache=ResultCache()))
+
+    def test_use_args(self):
+        cache = ResultCache()
+        args, calls = self._counting_args()
+
+        @parser.use_args(args, location="query", cache=cache)
+        async def handler(request, args):
+            return args
+
+        for _ in range(2):
+            assert run(handler(make_request(query_string=b"page=1"))) == {"page": 1}
+        assert calls == [1]
+
+
+class TestAsyncValidators:
+    @staticmethod
+    def _tracked(results):
+        # Validators that record how many of them run at once
+        state = {"running": 0, "max_running": 0}
+
+        def make(result):
+            async def validator(value):
+                state["running"] += 1
+                state["max_running"] = max(state["max_running"], state["running"])
+                await asyncio.sleep(0.01)
+                state["running"] -= 1
+                return result
+
+            return validator
+
+        return [make(result) for result in results], state
+
+    def test_field_validators_are_awaited(self):
+        (accept, reject), _ = self._tracked([True, False])
+        args = {"name": fields.Str(validate=accept), "id": fields.Int(validate=reject)}
+        req = make_request(query_string=b"name=Ada&id=1")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(args, req, location="query"))
+        assert excinfo.value.status_code == 422
+        assert excinfo.value.messages == {"query": {"id": ["Invalid value."]}}
+        req = make_request(query_string=b"name=Ada")
+        assert run(parser.parse(args, req, location="query")) == {"name": "Ada"}
+
+    def test_validation_error_messages(self):
+        async def exists(value):
+            raise ma.ValidationError("User {} does not exist.".format(value))
+
+        args = {"user_id": fields.Int(data_key="user", validate=[exists])}
+        req = make_request(query_string=b"user=7")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(args, req, location="query"))
+        assert excinfo.value.messages == {"query": {"user": ["User 7 does not exist."]}}
+
+    def test_validators_run_concurrently(self):
+        validators, state = self._tracked([True, True, True])
+        args = {"a": fields.Int(validate=validators[0]), "b": fields.Int()}
+        req = make_request(query_string=b"a=1&b=2")
+        run(parser.parse(args, req, location="query", validate=validators[1:]))
+        assert state["max_running"] == 3
+
+    def test_concurrency_cap(self):
+        capped_parser = StarletteParser(async_validation_concurrency=2)
+        validators, state = self._tracked([True, True, True])
+        args = {name: fields.Int(validate=v) for name, v in zip("abc", validators)}
+        req = make_request(query_string=b"a=1&b=2&c=3")
+        run(capped_parser.parse(args, req, location="query"))
+        assert state["max_running"] == 2
+
+    def test_timeout(self):
+        timeout_parser = StarletteParser(async_validation_timeout=0.01)
+
+        async def slow(value):
+            await asyncio.sleep(1)
+
+        args = {"name": fields.Str(validate=slow)}
+        req = make_request(query_string=b"name=Ada")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(timeout_parser.parse(args, req, location="query"))
+        assert excinfo.value.messages == {"query": {"name": ["Validation timed out."]}}
+
+    def test_validate_argument(self):
+        (reject,), _ = self._tracked([False])
+        req = make_request(query_string=b"name=Ada")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req, location="query", validate=reject))
+        assert excinfo.value.messages == {"query": ["Invalid value."]}
+
+    def test_errors_are_merged(self):
+        (reject_name, reject_args), _ = self._tracked([False, False])
+        args = {"name": fields.Str(validate=reject_name)}
+
+        @parser.use_args(args, location="query", validate=reject_args)
+        async def handler(request, args):
+            return args
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(handler(make_request(query_string=b"name=Ada")))
+        assert excinfo.value.messages == {
+            "query": {"name": ["Invalid value."], "_schema": ["Invalid value."]}
+        }
+
+    def test_not_run_when_schema_fails(self):
+        validators, state = self._tracked([True])
+        args = {"name": fields.Str(validate=validators[0]), "id": fields.Int()}
+        req = make_request(query_string=b"name=Ada&id=x")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(args, req, location="query"))
+        assert excinfo.value.messages == {"query": {"id": ["Not a valid integer."]}}
+        assert state["max_running"] == 0
+
+    def test_nested_field_validators(self):
+        async def positive(value):
+            return value > 0
+
+        args = {
+            "ids": fields.List(fields.Int(validate=positive)),
+            "pair": fields.Tuple((fields.Int(), fields.Int(validate=positive))),
+            "scores": fields.Dict(
+                keys=fields.Str(), values=fields.Int(validate=positive)
+            ),
+            "item": fields.Nested(
+                {"qty": fields.Int(data_key="quantity", validate=positive)}
+            ),
+            "items": fields.Nested({"qty": fields.Int(validate=positive)}, many=True),
+        }
+        body = {
+            "ids": [1, -1, 2],
+            "pair": [-1, -1],
+            "scores": {"a": 1, "b": -1},
+            "item": {"quantity": -1},
+            "items": [{"qty": 1}, {"qty": -1}],
+        }
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=json.dumps(body).encode(),
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(args, req, location="json"))
+        assert excinfo.value.messages == {
+            "json": {
+                "ids": {1: ["Invalid value."]},
+                "pair": {1: ["Invalid value."]},
+                "scores": {"b": {"value": ["Invalid value."]}},
+                "item": {"quantity": ["Invalid value."]},
+                "items": {1: {"qty": ["Invalid value."]}},
+            }
+        }
+
+    def test_self_nested_schema(self):
+        async def positive(value):
+            return value > 0
+
+        class NodeSchema(ma.Schema):
+            value = fields.Int(validate=positive)
+            child = fields.Nested(lambda: NodeSchema())
+
+        body = b'{"value": 1, "child": {"value": 2, "child": {"value": -1}}}'
+        req = make_request(
+            "POST", headers={"Content-Type": "application/json"}, body=body
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(NodeSchema(), req, location="json"))
+        assert excinfo.value.messages == {
+            "json": {"child": {"child": {"value": ["Invalid value."]}}}
+        }
+
+    def test_schemas_are_left_unchanged(self):
+        async def positive(value):
+            return value > 0
+
+        class ItemSchema(ma.Schema):
+            qty = fields.Int(validate=positive)
+
+        class OrderSchema(ma.Schema):
+            ids = fields.List(fields.Int(validate=positive))
+            item = fields.Nested(ItemSchema)
+
+        id_field = fields.Int(validate=positive)
+        args = {"id": id_field}
+        order_schema = OrderSchema()
+        for argmap, body in ((args, {"id": -1}), (order_schema, {"ids": [-1]})):
+            req = make_request(
+                "POST",
+                headers={"Content-Type": "application/json"},
+                body=json.dumps(body).encode(),
+            )
+            with pytest.raises(WebargsHTTPException):
+                run(parser.parse(argmap, req, location="json"))
+        assert id_field.validators == [positive]
+        assert order_schema.fields["ids"].inner.validators == [positive]
+        assert OrderSchema._declared_fields["ids"].inner.validators == [positive]
+        assert ItemSchema._declared_fields["qty"].validators == [positive]
+        assert order_schema.fields["item"].schema.fields["qty"].validators == [positive]
+        assert order_schema.fields["ids"].parent is order_schema
+
+    def test_json_stream(self):
+        async def positive(value):
+            return value > 0
+
+        async def has_name(record):
+            return "name" in record
+
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=b'[{"id": 1, "name": "Ada"}, {"id": 2}, {"id": -3, "name": "Cy"}]',
+        )
+        args = {"id": fields.Int(validate=positive), "name": fields.Str()}
+
+        async def collect():
+            records = await parser.parse(
+                args, req, location="json_stream", validate=has_name
+            )
+            return [record async for record in records]
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(collect())
+        assert excinfo.value.messages == {"json_stream": {1: ["Invalid value."]}}
+
+
+class TestBinaryBodies:
+    args = {"name": fields.Str(required=True), "blob": fields.Raw()}
+
+    @pytest.mark.parametrize(
+        ("location", "content_type", "dumps"),
+        [
+            ("msgpack", "application/msgpack", msgpack.packb),
+            ("msgpack", "application/x-msgpack", msgpack.packb),
+            ("cbor", "application/cbor", cbor2.dumps),
+        ],
+    )
+    def test_load(self, location, content_type, dumps):
+        body = dumps({"name": "Ada", "blob": b"\x00\xff"})
+        req = make_request("POST", headers={"Content-Type": content_type}, body=body)
+        result = run(parser.parse(self.args, req, location=location))
+        assert result == {"name": "Ada", "blob": b"\x00\xff"}
+
+    @pytest.mark.parametrize(
+        ("location", "message", "dumps"),
+        [
+            ("msgpack", "Invalid msgpack body.", msgpack.packb),
+            ("cbor", "Invalid CBOR body.", cbor2.dumps),
+        ],
+    )
+    def test_invalid_body(self, location, message, dumps):
+        content_type = "application/" + location
+        # Truncated value, and extra data after a value
+        for body in (dumps({"name": "Ada"})[:-1], dumps({"name": "Ada"}) + b"\x00"):
+            req = make_request(
+                "POST", headers={"Content-Type": content_type}, body=body
+            )
+            with pytest.raises(WebargsHTTPException) as excinfo:
+                run(parser.parse(self.args, req, location=location))
+            assert excinfo.value.status_code == 400
+            assert excinfo.value.messages == {location: [message]}
+
+    def test_other_content_types_are_ignored(self):
+        req = make_request(
+            "POST", headers={"Content-Type": "application/json"}, body=b"{}"
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(self.args, req, location="msgpack"))
+        assert excinfo.value.messages == {
+            "msgpack": {"name": ["Missing data for required field."]}
+        }
+
+    @pytest.mark.parametrize(
+        ("content_type", "body"),
+        [
+            ("application/json", b'{"name": "Ada"}'),
+            ("application/x-www-form-urlencoded", b"name=Ada"),
+            ("application/msgpack", msgpack.packb({"name": "Ada"})),
+            ("application/cbor", cbor2.dumps({"name": "Ada"})),
+        ],
+    )
+    def test_body_location_negotiates(self, content_type, body):
+        req = make_request("POST", headers={"Content-Type": content_type}, body=body)
+        assert run(parser.parse(self.args, req, location="body")) == {"name": "Ada"}
+
+    def test_custom_loads(self):
+        calls = []
+
+        def loads(body):
+            calls.append(type(body))
+            return msgpack.unpackb(body)
+
+        custom_parser = StarletteParser(msgpack_loads=loads)
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/msgpack"},
+            body=msgpack.packb({"name": "Ada"}),
+        )
+        run(custom_parser.parse(self.args, req, location="msgpack"))
+        assert calls == [bytes]
+
+
+class TestFailFast:
+    args = {"ids": fields.List(fields.Int()), "name": fields.Str(required=True)}
+    # Unordered schemas of marshmallow<3.20 report errors in any field order
+    ids_args = {"ids": fields.List(fields.Int())}
+
+    def _json_request(self, data):
+        return make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=json.dumps(data).encode(),
+        )
+
+    def test_parser_option(self):
+        fail_fast_parser = StarletteParser(fail_fast=True)
+        req = self._json_request({"ids": [1, "x", "y"]})
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(fail_fast_parser.parse(self.args, req))
+        assert excinfo.value.status_code == 422
+        assert excinfo.value.messages == {
+            "json": {"ids": {1: ["Not a valid integer."]}}
+        }
+        req = self._json_request({"ids": [1, "x", "y"]})
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(fail_fast_parser.parse(self.args, req, fail_fast=False))
+        assert excinfo.value.messages["json"].keys() == {"ids", "name"}
+
+    def test_use_args(self):
+        @parser.use_args(self.args, location="json", fail_fast=True)
+        async def handler(request, args):
+            return args
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(handler(self._json_request({"ids": ["x"], "name": 1})))
+        assert excinfo.value.messages == {
+            "json": {"ids": {0: ["Not a valid integer."]}}
+        }
+        assert run(handler(self._json_request({"name": "Ada"}))) == {"name": "Ada"}
+
+    def test_stacked_decorators_stop_at_first_location(self):
+        fail_fast_parser = StarletteParser(fail_fast=True)
+
+        @fail_fast_parser.use_args({"page": fields.Int()}, location="query")
+        @fail_fast_parser.use_args(self.args, location="json")
+        async def handler(request, query_args, json_args):
+            return query_args
+
+        req = self._json_request({})
+        req.scope["query_string"] = b"page=x"
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(handler(req))
+        assert excinfo.value.messages == {"query": {"page": ["Not a valid integer."]}}
+
+    def test_fail_fast_schemas_are_cached(self):
+        schema = parser.get_schema(self.args)
+        assert parser.get_fail_fast_schema(schema) is parser.get_fail_fast_schema(
+            schema
+        )
+
+    def test_max_error_messages(self):
+        capped_parser = StarletteParser(max_error_messages=3)
+        req = self._json_request({"ids": ["x"] * 1000})
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(capped_parser.parse(self.ids_args, req))
+        assert excinfo.value.messages == {
+            "json": {"ids": {index: ["Not a valid integer."] for index in range(3)}}
+        }
+
+    def test_default_max_error_messages(self):
+        req = self._json_request({"ids": ["x"] * 1000})
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(self.ids_args, req))
+        assert len(excinfo.value.messages["json"]["ids"]) == 100
+
+
+class TestPartial:
+    def _json_request(self, data, method="PATCH"):
+        return make_request(
+            method,
+            headers={"Content-Type": "application/json"},
+            body=json.dumps(data).encode(),
+        )
+
+    @pytest.mark.parametrize("partial", [True, ("email",), ["email"]])
+    def test_parse(self, partial):
+        req = self._json_request({"name": "Ada"})
+        assert run(parser.parse(user_update_args, req, partial=partial)) == {
+            "name": "Ada"
+        }
+
+    def test_partial_fields_only(self):
+        req = self._json_request({"email": "ada@example.com"})
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(user_update_args, req, partial=("email",)))
+        assert excinfo.value.messages == {
+            "json": {"name": ["Missing data for required field."]}
+        }
+
+    def test_partial_schemas_are_cached(self):
+        schema = parser.get_schema(user_update_args)
+        partial_schema = parser.get_partial_schema(schema, ("email", "name"))
+        assert partial_schema is not schema
+        assert partial_schema.partial == ("email", "name")
+        assert parser.get_partial_schema(schema, ["name", "email"]) is partial_schema
+        assert parser.get_partial_schema(schema, False) is schema
+        assert not schema.partial
+
+    def test_compiled_schema(self):
+        schema = compile_schema(ma.Schema.from_dict(dict(user_update_args)))()
+        partial_schema = parser.get_partial_schema(schema, True)
+        assert partial_schema._compiled_loader is not None
+        req = self._json_request({"name": "Ada"})
+        assert run(parser.parse(partial_schema, req)) == {"name": "Ada"}
+
+    def test_use_args(self):
+        @parser.use_args(user_update_args, location="json", partial=True)
+        async def handler(request, args):
+            return args
+
+        assert run(handler(self._json_request({"email": "a@b.c"}))) == {
+            "email": "a@b.c"
+        }
+
+    def test_endpoint_patch_is_partial_when_requested(self, testapp):
+        res = testapp.patch_json("/echo_endpoint_update/", {"name": "Ada"})
+        assert res.json == {"name": "Ada"}
+        res = testapp.put_json(
+            "/echo_endpoint_update/", {"name": "Ada"}, expect_errors=True
+        )
+        assert res.status_code == 422
+        assert res.json == {"json": {"email": ["Missing data for required field."]}}
+
+    @pytest.mark.parametrize("body", [b"", b"{}"])
+    def test_endpoint_patch_loads_required_annotations(self, testapp, body):
+        res = testapp.patch(
+            "/echo_endpoint_annotations/",
+            body,
+            headers={"Content-Type": "application/json"},
+            expect_errors=True,
+        )
+        assert res.status_code == 422
+        assert res.json == {"json": {"name": ["Missing data for required field."]}}
+        res = testapp.patch_json("/echo_endpoint_annotations/", {"name": "Ada"})
+        assert res.json == {"name": "Ada"}
+
+
+class TestMetrics:
+    def test_callback_receives_metrics(self):
+        metrics_parser = StarletteParser()
+        collected = []
+
+        @metrics_parser.metrics_callback
+        def collect(metrics, req):
+            collected.append(metrics)
+
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=b'{"name": "Ada"}',
+        )
+        assert run(metrics_parser.parse(hello_args, req)) == {"name": "Ada"}
+        (metrics,) = collected
+        assert isinstance(metrics, ParseMetrics)
+        assert metrics.method == "POST"
+        assert metrics.location == "json"
+        assert metrics.payload_size == 15
+        assert metrics.error_count == 0
+        assert set(metrics.phases) == {"load_json", "schema"}
+        assert metrics.duration >= sum(metrics.phases.values())
+
+    def test_callback_receives_error_count(self):
+        metrics_parser = StarletteParser()
+        collected = []
+        metrics_parser.metrics_callback(lambda metrics, req: collected.append(metrics))
+        req = make_request("GET", query_string=b"x=a&y=b")
+        with pytest.raises(WebargsHTTPException):
+            run(
+                metrics_parser.parse(
+                    {"x": fields.Int(), "y": fields.Int()}, req, location="query"
+                )
+            )
+        (metrics,) = collected
+        assert metrics.error_count == 2
+        assert metrics.payload_size == 7
+        assert "handle_error" in metrics.phases
+
+    def test_slow_parse_is_logged(self, caplog):
+        slow_parser = StarletteParser(slow_parse_threshold=0)
+        req = make_request("GET", query_string=b"name=Ada")
+        with caplog.at_level(logging.WARNING, logger="webargs_starlette"):
+            run(slow_parser.parse(hello_args, req, location="query"))
+        (record,) = caplog.records
+        assert "Slow parse on GET" in record.getMessage()
+        assert "'name': 'str'" in record.getMessage()
+        assert "Ada" not in record.getMessage()
+
+    def test_no_metrics_by_default(self, caplog):
+        req = make_request("GET", query_string=b"name=Ada")
+        with caplog.at_level(logging.DEBUG, logger="webargs_starlette"):
+            run(StarletteParser().parse(hello_args, req, location="query"))
+        assert caplog.records == []
+
+    def test_middleware_aggregates_by_route(self):
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse
+
+        metrics_parser = StarletteParser()
+        stats = ParseStats()
+        metrics_app = Starlette()
+
+        @metrics_app.route("/hello")
+        @metrics_parser.use_args(hello_args, location="query")
+        async def hello(request, args):
+            return JSONResponse(args)
+
+        metrics_app.add_middleware(
+            ParseMetricsMiddleware, parser=metrics_parser, stats=stats
+        )
+        client = TestApp(metrics_app)
+        client.get("/hello?name=Ada")
+        client.get("/hello")
+        route_stats = stats.routes["GET /hello"]
+        assert route_stats.count == 2
+        assert route_stats.error_count == 0
+        assert route_stats.duration.count == 2
+        assert set(route_stats.phases) == {"load_querystring", "schema"}
+
+    def test_histogram_is_cumulative(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.observe(value)
+        assert histogram.cumulative() == [(0.1, 1), (1.0, 3), (float("inf"), 4)]
+        assert histogram.count == 4
+
+
+class TestJSONStream:
+    def _parse(self, body, content_type="application/json", **kwargs):
+        req = make_request("POST", headers={"Content-Type": content_type}, body=body)
+
+        async def collect():
+            records = await parser.parse(
+                HelloSchema(many=True), req, location="json_stream", **kwargs
+            )
+            return [record async for record in records]
+
+        return run(collect())
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            b'[{"name": "Ada"}, {"name": "Bob"}]',
+            [b' [ {"na', b'me": "Ada"} ', b",", b'{"name": "Bob"}]  '],
+            [bytes([byte]) for byte in b'[{"name":"Ada"},{"name":"Bob"}]'],
+        ],
+    )
+    def test_json_array(self, body):
+        assert self._parse(body) == [{"name": "Ada"}, {"name": "Bob"}]
+
+    @pytest.mark.parametrize(
+        ("head", "tail", "value"),
+        [(b"12", b"34", 1234), (b"0.", b"1", 0.1), (b"1e", b"2", 100.0)]
+        + [(b"1e-", b"2", 0.01), (b"1.5E", b"+1", 15.0), (b"-", b"3", -3)],
+    )
+    def test_numbers_split_across_chunks(self, head, tail, value):
+        records = self._parse(
+            [b"[{", b'"name": "Ada", "id": ' + head, tail + b"}]"],
+            unknown="include",
+        )
+        assert records == [{"name": "Ada", "id": value}]
+
+    @pytest.mark.parametrize("head", [b"0.", b"1e", b"1e-"])
+    def test_top_level_numbers_split_across_chunks(self, head):
+        async def chunks():
+            for chunk in (b"[", head, b"1,{}]"):
+                yield chunk
+
+        async def collect():
+            return [record async for record in iter_json_array(chunks())]
+
+        records = run(collect())
+        assert records == [json.loads(head + b"1"), {}]
+
+    def test_multibyte_characters_split_across_chunks(self):
+        body = '[{"name": "Zoë"}]'.encode()
+        index = body.index(b"\xc3") + 1
+        assert self._parse([body[:index], body[index:]]) == [{"name": "Zoë"}]
+
+    @pytest.mark.parametrize("body", [b"", b"[]", b" [ ] "])
+    def test_empty(self, body):
+        assert self._parse(body) == []
+
+    def test_ndjson(self):
+        body = [b'{"name": "Ada"}\n{"na', b'me": "Bob"}\n\n{"name": "Cy', b'd"}']
+        assert self._parse(body, "application/x-ndjson") == [
+            {"name": "Ada"},
+            {"name": "Bob"},
+            {"name": "Cyd"},
+        ]
+
+    def test_other_content_types_are_empty(self):
+        assert self._parse(b'[{"name": "Ada"}]', "text/plain") == []
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            b'{"name": "Ada"}',
+            b'[{"name": "Ada"}',
+            b'[{"name": "Ada"},]',
+            b'[{"name": "Ada"}] 2',
+        ],
+    )
+    def test_invalid_json(self, body):
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            self._parse(body)
+        assert excinfo.value.status_code == 400
+        assert excinfo.value.messages == {"json": ["Invalid JSON body."]}
+
+    def test_partial_and_fail_fast_apply_to_each_record(self):
+        argmap = {"id": fields.Int(required=True), "tags": fields.List(fields.Int())}
+        body = b'[{"tags": [1]}, {"id": 2}]'
+        req = make_request(
+            "POST", headers={"Content-Type": "application/json"}, body=body
+        )
+
+        async def collect(**kwargs):
+            records = await parser.parse(argmap, req, location="json_stream", **kwargs)
+            return [record async for record in records]
+
+        assert run(collect(partial=True)) == [{"tags": [1]}, {"id": 2}]
+        req = make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=b'[{"id": 1, "tags": ["x", "y"]}]',
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(collect(fail_fast=True))
+        assert excinfo.value.messages == {
+            "json_stream": {0: {"tags": {0: ["Not a valid integer."]}}}
+        }
+
+    def test_offload_is_rejected(self):
+        policy = OffloadPolicy(max_workers=1)
+        req = make_request("POST", headers={"Content-Type": "application/json"})
+        with pytest.raises(ValueError):
+            run(parser.parse(hello_args, req, location="json_stream", offload=policy))
+        with pytest.raises(ValueError):
+            parser.use_args(hello_args, location="json_stream", offload=policy)
+
+    @pytest.mark.parametrize(
+        ("content_type", "body"),
+        [
+            ("application/json", [b'[{"name": "Ada"}, {"name": "', b"x" * 40, b'"}]']),
+            ("application/x-ndjson", [b'{"name": "Ada"}\n{"name": "', b"x" * 40]),
+            ("application/x-ndjson", b'{"name": "Ada"}\n{"name": "' + b"x" * 40),
+        ],
+    )
+    def test_record_size_limit(self, content_type, body):
+        limited_parser = StarletteParser(max_stream_record_size=32)
+        req = make_request("POST", headers={"Content-Type": content_type}, body=body)
+
+        async def collect():
+            records = await limited_parser.parse(
+                HelloSchema(many=True), req, location="json_stream"
+            )
+            return [record async for record in records]
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(collect())
+        assert excinfo.value.status_code == 413
+        assert excinfo.value.messages == {
+            "json_stream": ["Record exceeds the maximum size of 32 bytes."]
+        }
+
+    def test_malformed_record_fails_without_reading_the_rest(self):
+        read = []
+
+        async def stream():
+            for chunk in [b'[{"name": oops, "padding": "0123456789"', b"x" * 100]:
+                read.append(chunk)
+                yield chunk
+
+        req = make_request("POST", headers={"Content-Type": "application/json"})
+        req.stream = stream
+
+        async def collect():
+            records = await parser.parse(
+                HelloSchema(many=True), req, location="json_stream"
+            )
+            return [record async for record in records]
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(collect())
+        assert excinfo.value.status_code == 400
+        assert len(read) == 1
+
+    def test_records_are_yielded_before_body_is_complete(self):
+        received = []
+
+        async def chunks():
+            yield b'[{"name": "Ada"},'
+            # The first record has been handed over before the next chunk
+            assert received == [{"name": "Ada"}]
+            yield b'{"name": "Bob"}]'
+
+        async def collect():
+            req = make_request(
+                "POST", headers={"Content-Type": "application/json"}, body=[]
+            )
+
+            async def stream():
+                async for chunk in chunks():
+                    yield chunk
+
+            req.stream = stream
+            records = await parser.parse(
+                HelloSchema(many=True), req, location="json_stream"
+            )
+            async for record in records:
+                received.append(record)
+
+        run(collect())
+        assert received == [{"name": "Ada"}, {"name": "Bob"}]
+
+    def test_error_reports_index(self):
+        received = []
+
+        async def collect():
+            req = make_request(
+                "POST",
+                headers={"Content-Type": "application/x-ndjson"},
+                body=b'{"name": "Ada"}\n{"name": 42}\n{"name": "Bob"}\n',
+            )
+            records = await parser.parse(HelloSchema, req, location="json_stream")
+            async for record in records:
+                received.append(record)
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(collect())
+        assert excinfo.value.status_code == 422
+        assert excinfo.value.messages == {
+            "json_stream": {1: {"name": ["Not a valid string."]}}
+        }
+        assert received == [{"name": "Ada"}]
+
+    def test_max_body_size(self):
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            self._parse([b'[{"name": "Ada"},', b'{"name": "Bob"}]'], max_body_size=20)
+        assert excinfo.value.status_code == 413
+
+    def test_use_args(self, testapp):
+        res = testapp.post_json("/echo_json_stream", [{"name": "Ada"}, {}])
+        assert res.json == [{"name": "Ada"}, {"name": "World"}]
+        res = testapp.post_json(
+            "/echo_json_stream", [{"name": "Ada"}, {"name": "X"}], expect_errors=True
+        )
+        assert res.status_code == 422
+        assert res.json == {
+            "json_stream": {"1": {"name": ["Invalid value."]}},
+        }
+
+
+class TestLightweightErrors:
+    @pytest.fixture
+    def lightweight_parser(self):
+        return StarletteParser(lightweight_errors=True)
+
+    def test_validation_error(self, lightweight_parser):
+        req = make_request(query_string=b"name=Al")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(lightweight_parser.parse(hello_args, req, location="query"))
+        exc = excinfo.value
+        assert exc.status_code == 422
+        assert exc.messages == {"query": {"name": ["Invalid value."]}}
+        assert json.loads(exc.body) == exc.messages
+        assert exc.exception is None
+        assert exc.schema is None
+
+    def test_error_bodies_are_reused(self, lightweight_parser):
+        args = {"name": fields.Str(required=True)}
+        bodies = []
+        for _ in range(2):
+            with pytest.raises(WebargsHTTPException) as excinfo:
+                run(lightweight_parser.parse(args, make_request(), location="query"))
+            bodies.append(excinfo.value.body)
+        assert bodies[0] is bodies[1]
+        assert lightweight_parser.error_bodies.cache.cache_info().hits == 1
+
+    def test_invalid_json(self, lightweight_parser):
+        req = make_request(
+            "POST", headers={"Content-Type": "application/json"}, body=b"{"
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(lightweight_parser.parse(hello_args, req))
+        assert excinfo.value.status_code == 400
+        assert excinfo.value.body == b'{"json":["Invalid JSON body."]}'
+
+    def test_body_too_large(self, lightweight_parser):
+        req = make_request(
+            "POST", headers={"Content-Type": "application/json"}, body=b"[1, 2, 3]"
+        )
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(lightweight_parser.parse(hello_args, req, max_body_size=4))
+        assert json.loads(excinfo.value.body) == excinfo.value.messages
+
+    def test_full_errors_by_default(self):
+        req = make_request(query_string=b"name=Al")
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req, location="query"))
+        assert excinfo.value.body is None
+        assert excinfo.value.schema is not None
+
+
+class TestExceptionHandler:
+    @pytest.mark.parametrize("lightweight_errors", [True, False])
+    def test_responds_with_messages(self, lightweight_errors):
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse
+
+        handler_parser = StarletteParser(lightweight_errors=lightweight_errors)
+        handler_app = Starlette(
+            exception_handlers={WebargsHTTPException: webargs_exception_handler}
+        )
+
+        @handler_app.route("/hello")
+        @handler_parser.use_args(
+            hello_args, location="query", error_headers={"X-Error": "1"}
+        )
+        async def hello(request, args):
+            return JSONResponse(args)
+
+        res = TestApp(handler_app).get("/hello?name=Al", expect_errors=True)
+        assert res.status_code == 422
+        assert res.content_type == "application/json"
+        assert res.headers["X-Error"] == "1"
+        assert res.json == {"query": {"name": ["Invalid value."]}}
+
+
+class TestStackedDecorators:
+    def _request(self):
+        return make_request(
+            "POST",
+            query_string=b"page=2",
+            headers={"Content-Type": "application/json"},
+            body=b'{"name": "Ada"}',
+        )
+
+    def test_stacked_decorators_are_fused(self):
+        calls = []
+
+        @parser.use_args({"page": fields.Int()}, location="query")
+        @parser.use_kwargs(hello_args, location="json")
+        async def handler(request, query_args, name):
+            calls.append((query_args, name))
+
+        stack = handler.__webargs_starlette_stack__
+        assert stack.wrapper is handler
+        assert len(stack.specs) == 2
+        # The handler is called directly by the outer wrapper
+        assert stack.handler.__code__ is handler.__wrapped__.__wrapped__.__code__
+        run(handler(self._request()))
+        assert calls == [({"page": 2}, "Ada")]
+
+    def test_errors_are_aggregated(self):
+        @parser.use_args({"page": fields.Int()}, location="query")
+        @parser.use_args({"name": fields.Int(), "x": fields.Int()}, location="json")
+        @parser.use_args(
+            {"x": fields.Int(required=True), "name": fields.Str()}, location="json"
+        )
+        async def handler(request, *args):
+            pass
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(
+                handler(
+                    make_request(
+                        "POST",
+                        query_string=b"page=two",
+                        headers={"Content-Type": "application/json"},
+                        body=b'{"name": "Ada"}',
+                    )
+                )
+            )
+        assert excinfo.value.status_code == 422
+        assert excinfo.value.messages == {
+            "query": {"page": ["Not a valid integer."]},
+            "json": {
+                "name": ["Not a valid integer."],
+                "x": ["Missing data for required field."],
+            },
+        }
+
+    def test_error_options_of_first_failing_decorator_are_used(self):
+        @parser.use_args({"page": fields.Int()}, location="query")
+        @parser.use_args(
+            {"name": fields.Int()},
+            location="json",
+            error_status_code=400,
+            error_headers={"X-Error": "1"},
+        )
+        async def handler(request, *args):
+            pass
+
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(handler(self._request()))
+        assert excinfo.value.status_code == 400
+        assert excinfo.value.headers == {"X-Error": "1"}
+
+    def test_other_decorators_are_not_skipped(self):
+        calls = []
+
+        def record(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                calls.append("record")
+                return await func(*args, **kwargs)
+
+            return wrapper
+
+        @parser.use_args({"page": fields.Int()}, location="query")
+        @record
+        @parser.use_args(hello_args, location="json")
+        async def handler(request, query_args, json_args):
+            calls.append((query_args, json_args))
+
+        assert len(handler.__webargs_starlette_stack__.specs) == 1
+        run(handler(self._request()))
+        assert calls == ["record", ({"page": 2}, {"name": "Ada"})]
+
+    def test_decorators_of_other_parsers_are_not_fused(self):
+        other_parser = StarletteParser()
+
+        @parser.use_args({"page": fields.Int()}, location="query")
+        @other_parser.use_args(hello_args, location="json")
+        async def handler(request, query_args, json_args):
+            return query_args, json_args
+
+        assert len(handler.__webargs_starlette_stack__.specs) == 1
+        assert run(handler(self._request())) == ({"page": 2}, {"name": "Ada"})
+
+
+class PidField(fields.Field):
+    def _deserialize(self, value, attr, data, **kwargs):
+        return os.getpid()
+
+
+class PidSchema(ma.Schema):
+    name = fields.Str(required=True)
+    pid = PidField()
+
+
+class FlaggedSchema(ma.Schema):
+    name = fields.Str()
+
+    class Meta:
+        offload = True
+
+
+class TestOffload:
+    @pytest.fixture
+    def thread_policy(self):
+        policy = OffloadPolicy(min_size=16, max_workers=2)
+        yield policy
+        policy.shutdown()
+
+    def _json_request(self, data):
+        return make_request(
+            "POST",
+            headers={"Content-Type": "application/json"},
+            body=json.dumps(data).encode(),
+        )
+
+    def _thread_recorder(self):
+        threads = []
+
+        def record(value):
+            threads.append(threading.current_thread())
+            return True
+
+        return threads, {"name": fields.Str(validate=record)}
+
+    def test_large_payload_is_offloaded_to_thread(self, thread_policy):
+        offload_parser = StarletteParser(offload=thread_policy)
+        threads, args = self._thread_recorder()
+        req = self._json_request({"name": "Ada Lovelace"})
+        assert run(offload_parser.parse(args, req)) == {"name": "Ada Lovelace"}
+        assert threads[0] is not threading.current_thread()
+
+    def test_small_payload_is_loaded_inline(self, thread_policy):
+        offload_parser = StarletteParser(offload=thread_policy)
+        threads, args = self._thread_recorder()
+        assert run(offload_parser.parse(args, self._json_request({"name": "Ada"})))
+        assert threads[0] is threading.current_thread()
+
+    def test_schema_flag(self, thread_policy):
+        flag_policy = OffloadPolicy(max_workers=1)
+        offload_parser = StarletteParser(offload=flag_policy)
+        req = self._json_request({"name": "Ada"})
+        assert run(offload_parser.parse(FlaggedSchema(), req)) == {"name": "Ada"}
+        assert flag_policy._executor is not None
+        flag_policy.shutdown()
+
+    def test_errors_in_thread(self, thread_policy):
+        req = self._json_request({"name": 42, "padding": "x" * 16})
+        with pytest.raises(WebargsHTTPException) as excinfo:
+            run(parser.parse(hello_args, req, offload=thread_policy))
+        assert excinfo.value.messages == {
+            "json": {
+                "name": ["Not a valid string."],
+                "padding": ["Unknown field."],
+            }
+        }
+
+    def test_decorator_option(self, thread_policy):
+        threads, args = self._thread_recorder()
+
+        @parser.use_args(args, offload=thread_policy)
+        async def handler(request, parsed):
+            return parsed
+
+        assert run(handler(self._json_request({"name": "Ada Lovelace"})))
+        assert threads[0] is not threading.current_thread()
+
+    def test_process_pool(self):
+        policy = OffloadPolicy("process", min_size=0, max_workers=1)
+        offload_parser = StarletteParser(offload=policy)
+        try:
+            req = self._json_request({"name": "Ada", "pid": 0})
+            parsed = run(offload_parser.parse(PidSchema(), req))
+            assert parsed["name"] == "Ada"
+            assert parsed["pid"] != os.getpid()
+            with pytest.raises(WebargsHTTPException) as excinfo:
+                run(offload_parser.parse(PidSchema(), self._json_request({})))
+            assert excinfo.value.messages == {
+                "json": {"name": ["Missing data for required field."]}
+            }
+            # Schemas that cannot be pickled are loaded inline
+            assert run(
+                offload_parser.parse(hello_args, self._json_request({"name": "Ada"}))
+            ) == {"name": "Ada"}
+        finally:
+            policy.shutdown()
+
+    def test_invalid_mode(self):
+        with pytest.raises(ValueError, match="Invalid offload mode"):
+            OffloadPolicy("fiber")
@@ -0,0 +1,75 @@
+import pytest
+from starlette.applications import Starlette
+from starlette.endpoints import HTTPEndpoint
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from webargs_starlette import StarletteParser, warmup
+from .utils import make_request, run
+
+
+@pytest.fixture
+def lazy_parser():
+    return StarletteParser(lazy_annotations=True)
+
+
+def test_lazy_handler_is_built_on_first_use(lazy_parser):
+    @lazy_parser.use_annotations(location="query")
+    async def handler(request, page: int = 1):
+        return page
+
+    plan = handler.__webargs_starlette_annotations__
+    assert plan.schema is None
+    assert run(handler(make_request(query_string=b"page=2"))) == 2
+    assert plan.schema is not None
+    assert plan.build_time is not None
+
+
+def test_eager_handler_is_built_at_decoration_time(lazy_parser):
+    @lazy_parser.use_annotations(location="query", lazy=False)
+    async def handler(request, page: int = 1):
+        return page
+
+    assert handler.__webargs_starlette_annotations__.schema is not None
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_warmup(lazy_parser, max_workers):
+    @lazy_parser.use_annotations(location="query")
+    async def items(request, page: int = 1):
+        return JSONResponse({"page": page})
+
+    @lazy_parser.use_annotations(location="query", lazy=False)
+    async def eager(request, name: str = "World"):
+        return JSONResponse({"name": name})
+
+    class Users(HTTPEndpoint):
+        @lazy_parser.use_annotations(location="query")
+        async def get(self, request, user_id: int):
+            return JSONResponse({"user_id": user_id})
+
+        async def post(self, request):
+            return JSONResponse({})
+
+    async def plain(request):
+        return JSONResponse({})
+
+    app = Starlette(
+        routes=[
+            Route("/items", items),
+            Route("/eager", eager),
+            Route("/plain", plain),
+            Mount("/api", routes=[Route("/users", Users)]),
+        ]
+    )
+    results = warmup(app, max_workers=max_workers)
+    assert [(result.path, result.built_now) for result in results] == [
+        ("/items", True),
+        ("/eager", False),
+        ("/api/users", True),
+    ]
+    assert results[2].handler.endswith("Users.get")
+    assert all(result.build_time > 0 for result in results)
+    assert items.__webargs_starlette_annotations__.schema is not None
+    # Already built
+    assert not any(result.built_now for result in warmup(app))
@@ -0,0 +1,155 @@
+from unittest import mock
+
+import marshmallow as ma
+import pytest
+from starlette.applications import Starlette
+from starlette.endpoints import WebSocketEndpoint
+from starlette.routing import WebSocketRoute
+from starlette.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from webargs import fields
+
+from webargs_starlette import StarletteParser
+
+parser = StarletteParser()
+message_args = {"id": fields.Int(required=True), "text": fields.Str()}
+messages = parser.message_parser(message_args)
+closing_messages = parser.message_parser(message_args, error_close_code=4000)
+
+
+@parser.use_args({"room": fields.Str(required=True)}, location="query")
+async def echo(websocket, args):
+    await websocket.accept()
+    await websocket.send_json({"room": args["room"]})
+    async for message in messages.iter_messages(websocket):
+        await websocket.send_json(message)
+
+
+async def echo_closing(websocket):
+    await websocket.accept()
+    while True:
+        try:
+            message = await closing_messages.receive(websocket)
+        except WebSocketDisconnect:
+            return
+        await websocket.send_json(message)
+
+
+class EchoEndpoint(WebSocketEndpoint):
+    encoding = "json"
+
+    @parser.use_message_args(message_args)
+    async def on_receive(self, websocket, data):
+        await websocket.send_json({"endpoint": data})
+
+
+app = Starlette(
+    routes=[
+        WebSocketRoute("/echo", echo),
+        WebSocketRoute("/echo_closing", echo_closing),
+        WebSocketRoute("/echo_endpoint", EchoEndpoint),
+    ]
+)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def test_handshake_and_messages(client):
+    with client.websocket_connect("/echo?room=lobby") as ws:
+        assert ws.receive_json() == {"room": "lobby"}
+        ws.send_json({"id": "1", "text": "hi"})
+        assert ws.receive_json() == {"id": 1, "text": "hi"}
+        ws.send_json({"id": "x"})
+        assert ws.receive_json() == {"message": {"id": ["Not a valid integer."]}}
+        ws.send_bytes(b'{"id": 2}')
+        assert ws.receive_json() == {"id": 2}
+        ws.send_text("{not json")
+        assert ws.receive_json() == {"message": ["Invalid JSON."]}
+
+
+def test_invalid_handshake_closes_connection(client):
+    with pytest.raises(WebSocketDisconnect) as excinfo:
+        with client.websocket_connect("/echo") as ws:
+            ws.receive_json()
+    assert excinfo.value.code == 1008
+    assert excinfo.value.reason == (
+        '{"query":{"room":["Missing data for required field."]}}'
+    )
+
+
+def test_error_close_code(client):
+    with client.websocket_connect("/echo_closing") as ws:
+        ws.send_json({"id": 1})
+        assert ws.receive_json() == {"id": 1}
+        ws.send_json({})
+        message = ws.receive()
+        assert message["type"] == "websocket.close"
+        assert message["code"] == 4000
+
+
+def test_endpoint_on_receive(client):
+    with client.websocket_connect("/echo_endpoint") as ws:
+        ws.send_json({"id": "3"})
+        assert ws.receive_json() == {"endpoint": {"id": 3}}
+        ws.send_json({"id": None})
+        assert ws.receive_json() == {"message": {"id": ["Field may not be null."]}}
+
+
+def test_valid_messages_use_compiled_loader():
+    with mock.patch.object(ma.Schema, "_do_load", side_effect=AssertionError):
+        assert messages.load(b'{"id": "1", "text": "hi"}') == {"id": 1, "text": "hi"}
+    with pytest.raises(ma.ValidationError):
+        messages.load({"id": "x"})
+
+
+def test_text_frames_are_decoded_as_bytes():
+    json_loads = mock.Mock(return_value={"id": 1})
+    decoding = StarletteParser(json_loads=json_loads).message_parser(message_args)
+    assert decoding.load('{"id": 1}') == {"id": 1}
+    json_loads.assert_called_once_with(b'{"id": 1}')
+
+
+def test_load_errors_are_not_reported_as_invalid_json():
+    def fail(value):
+        raise ValueError("not a JSON error")
+
+    failing = parser.message_parser({"id": fields.Int(validate=fail)})
+    app = Starlette(routes=[WebSocketRoute("/ws", _echo_messages(failing))])
+    with pytest.raises(ValueError, match="not a JSON error"):
+        with TestClient(app).websocket_connect("/ws") as ws:
+            ws.send_json({"id": 1})
+            ws.receive_json()
+
+
+def test_coroutine_validators():
+    async def positive(value):
+        return value > 0
+
+    async def not_empty(message):
+        return bool(message["ids"])
+
+    validated = parser.message_parser(
+        {"ids": fields.List(fields.Int(validate=positive))}, validate=not_empty
+    )
+    app = Starlette(routes=[WebSocketRoute("/ws", _echo_messages(validated))])
+    with TestClient(app).websocket_connect("/ws") as ws:
+        ws.send_json({"ids": [1, -2]})
+        assert ws.receive_json() == {"message": {"ids": {"1": ["Invalid value."]}}}
+        ws.send_json({"ids": []})
+        assert ws.receive_json() == {"message": ["Invalid value."]}
+        ws.send_json({"ids": [1]})
+        assert ws.receive_json() == {"ids": [1]}
+    with pytest.raises(ValueError):
+        validated.load({"ids": [1]})
+
+
+def _echo_messages(message_parser):
+    async def endpoint(websocket):
+        await websocket.accept()
+        async for message in message_parser.iter_messages(websocket):
+            await websocket.send_json(message)
+
+    return endpoint
@@ -0,0 +1,47 @@
+import asyncio
+import typing
+
+from starlette.requests import Request
+
+
+def make_request(
+    method: str = "GET",
+    path: str = "/",
+    *,
+    query_string: bytes = b"",
+    headers: typing.Optional[typing.Mapping[str, str]] = None,
+    body: typing.Union[bytes, typing.Iterable[bytes]] = b"",
+    path_params: typing.Optional[dict] = None,
+) -> Request:
+    """Build a `Request` without going through an ASGI app.
+
+    ``body`` may be passed as an iterable of chunks to simulate a streamed
+    (chunked) request body.
+    """
+    chunks = [body] if isinstance(body, bytes) else list(body)
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": [
+            (key.lower().encode("latin-1"), value.encode("latin-1"))
+            for key, value in (headers or {}).items()
+        ],
+        "path_params": path_params or {},
+    }
+    return Request(scope, receive)
+
+
+def run(coro: typing.Coroutine[typing.Any, typing.Any, typing.Any]) -> typing.Any:
+    return asyncio.run(coro)
@@ -6,6 +6,13 @@ from .starletteparser import (
     use_annotations,
     WebargsHTTPException,
 )
+from .cache import ResultCache
+from .errors import webargs_exception_handler
+from .multipart import MultipartLimits
+from .offload import OffloadPolicy
+from .metrics import ParseMetrics, ParseMetricsMiddleware, ParseStats
+from .warmup import WarmupResult, warmup
+from .websockets import MessageParser, WebargsWebSocketException
 
 __version__ = "2.1.0"
 __all__ = [
@@ -15,4 +22,15 @@ __all__ = [
     "use_kwargs",
     "use_annotations",
     "WebargsHTTPException",
+    "webargs_exception_handler",
+    "MultipartLimits",
+    "OffloadPolicy",
+    "ParseMetrics",
+    "ParseMetricsMiddleware",
+    "ParseStats",
+    "ResultCache",
+    "WarmupResult",
+    "warmup",
+    "MessageParser",
+    "WebargsWebSocketException",
 ]
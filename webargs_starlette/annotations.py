@@ -1,11 +1,20 @@
+import dataclasses
+import enum
+import sys
+import threading
+import types
 import typing
 import inspect
+import weakref
 from collections import abc
 
-from starlette.requests import Request
+from starlette.requests import HTTPConnection
 from marshmallow import Schema, fields
 from marshmallow.fields import Field
 
+from .cache import LRUCache
+from .compiler import _FALLBACK, compile_loader
+
 
 DEFAULT_TYPE_MAPPING = Schema.TYPE_MAPPING.copy()
 DEFAULT_TYPE_MAPPING.update(
@@ -30,6 +39,12 @@ DEFAULT_TYPE_MAPPING.update(
 # Marshmallow type mapping
 TypeMapping = typing.Mapping[typing.Type, typing.Type[Field]]
 
+# Type of ``X | Y`` unions (Python>=3.10)
+_UnionType = getattr(types, "UnionType", None)
+
+# Field of Enum types (marshmallow>=3.18)
+_EnumField: typing.Optional[typing.Type[Field]] = getattr(fields, "Enum", None)
+
 
 class TypeMappingError(TypeError):
     def __init__(self, param: str, cls: type) -> None:
@@ -40,6 +55,293 @@ class TypeMappingError(TypeError):
         )
 
 
+# Fields and schema classes generated from annotations are shared between
+# functions with the same parameters. Schemas copy their declared fields on
+# instantiation, so the shared objects are never mutated.
+_field_cache: "weakref.WeakValueDictionary[typing.Hashable, Field]" = (
+    weakref.WeakValueDictionary()
+)
+_schema_cache: "weakref.WeakValueDictionary[typing.Hashable, typing.Type[Schema]]" = (
+    weakref.WeakValueDictionary()
+)
+# Types of the field arguments that can be compared by value. Fields are
+# compared by identity, which is enough since generated fields are interned.
+_INTERNABLE_TYPES = (type(None), bool, int, float, str, bytes, Field, type)
+
+
+# Field classes resolved from types, by (id of the type mapping, type). Entries
+# keep a reference to their mapping, and are discarded if it changes size.
+_resolved_field_classes = LRUCache(maxsize=1024)
+
+
+def _lookup_field_class(
+    cls: typing.Any, type_mapping: TypeMapping
+) -> typing.Optional[typing.Type[Field]]:
+    try:
+        return type_mapping[cls]
+    except KeyError:
+        pass
+    if isinstance(cls, type) and issubclass(cls, enum.Enum):
+        # Enums are loaded as their members, never as their mixin type (e.g.
+        # the int of an IntEnum), which would accept any value of that type
+        for base in cls.__mro__[1:]:
+            if issubclass(base, enum.Enum) and base in type_mapping:
+                return type_mapping[base]
+        return _EnumField
+    # Subclasses of mapped types, e.g. a str subclass -> str
+    for base in getattr(cls, "__mro__", ())[1:]:
+        if base in type_mapping:
+            return type_mapping[base]
+    return None
+
+
+def resolve_field_class(
+    cls: typing.Any, type_mapping: TypeMapping
+) -> typing.Optional[typing.Type[Field]]:
+    """Return the field class for ``cls`` in ``type_mapping``, or `None`.
+
+    If ``cls`` itself is not in the mapping, the classes of its MRO are looked
+    up in order. `enum.Enum` subclasses resolve to `marshmallow.fields.Enum`
+    (marshmallow>=3.18), unless an Enum base class is mapped. Results are
+    memoized per type and mapping.
+    """
+    key = (id(type_mapping), cls)
+    try:
+        entry = _resolved_field_classes.get(key)
+    except TypeError:
+        # Unhashable type
+        return _lookup_field_class(cls, type_mapping)
+    if entry is not None and entry[0] is type_mapping and entry[1] == len(type_mapping):
+        return entry[2]
+    field_cls = _lookup_field_class(cls, type_mapping)
+    _resolved_field_classes.set(key, (type_mapping, len(type_mapping), field_cls))
+    return field_cls
+
+
+def _intern_field(
+    field_cls: typing.Type[Field], field_kwargs: typing.Dict[str, typing.Any]
+) -> Field:
+    """Return a ``field_cls(**field_kwargs)`` field, shared with previous calls
+    made with the same arguments.
+    """
+    if not all(isinstance(value, _INTERNABLE_TYPES) for value in field_kwargs.values()):
+        return field_cls(**field_kwargs)
+    # The type is part of the key so that e.g. 1, 1.0 and True are distinct
+    key = (
+        field_cls,
+        tuple(
+            (name, type(value), value) for name, value in sorted(field_kwargs.items())
+        ),
+    )
+    field = _field_cache.get(key)
+    if field is None:
+        field = _field_cache[key] = field_cls(**field_kwargs)
+    return field
+
+
+class StructuredSchema(Schema):
+    """Base class of the schemas generated for dataclass, TypedDict and
+    NamedTuple annotations. ``load`` returns instances of the annotated type.
+
+    Data is loaded with a compiled loader, falling back to marshmallow. When
+    ``load_target`` is set (dataclasses with ``slots=True`` and no
+    ``__post_init__``), the compiled loader sets the attributes of a new
+    instance directly, without building an intermediate dict. Partial loads
+    return a dict of the loaded values.
+    """
+
+    #: Class loaded directly by the compiled loader, if any
+    load_target: typing.ClassVar[typing.Optional[type]] = None
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._compiled_loader = compile_loader(self, partial=self.partial)
+
+    @staticmethod
+    def build(data: typing.Dict[str, typing.Any]) -> typing.Any:
+        """Return the instance of the annotated type for the loaded ``data``."""
+        return data
+
+    def load(self, data, *, many=None, partial=None, unknown=None):
+        many = self.many if many is None else many
+        loader = self._compiled_loader
+        if loader is not None and not many and partial is None:
+            result = loader(data, unknown or self.unknown)
+            if result is not _FALLBACK:
+                if self.partial or self.load_target is not None:
+                    return result
+                return self.build(result)
+        result = super().load(data, many=many, partial=partial, unknown=unknown)
+        if partial or (partial is None and self.partial):
+            return result
+        if many:
+            return [self.build(item) for item in result]
+        return self.build(result)
+
+
+def _is_typeddict(cls: type) -> bool:
+    is_typeddict = getattr(typing, "is_typeddict", None)
+    if is_typeddict is not None and is_typeddict(cls):
+        return True
+    # TypedDicts of typing_extensions, or of Python<3.10
+    return issubclass(cls, dict) and hasattr(cls, "__total__")
+
+
+def _get_type_hints(cls: type) -> typing.Dict[str, typing.Any]:
+    if sys.version_info >= (3, 9):
+        # Keep typing.Annotated metadata
+        return typing.get_type_hints(cls, include_extras=True)
+    return typing.get_type_hints(cls)
+
+
+def _structured_signature(
+    cls: typing.Any,
+) -> typing.Optional[typing.Tuple[inspect.Signature, typing.FrozenSet[str]]]:
+    """Return the members of a dataclass, TypedDict or NamedTuple ``cls`` as a
+    signature of keyword-only parameters, with the names of the members that
+    may be left out without a default, or `None` if ``cls`` is none of these.
+    """
+    if not isinstance(cls, type):
+        return None
+    empty = inspect.Parameter.empty
+    optional: typing.FrozenSet[str] = frozenset()
+    if dataclasses.is_dataclass(cls):
+        hints = _get_type_hints(cls)
+        members = []
+        for field in dataclasses.fields(cls):
+            if not field.init:
+                continue
+            if field.default is not dataclasses.MISSING:
+                default = field.default
+            elif field.default_factory is not dataclasses.MISSING:
+                # Callable defaults are called by marshmallow on each load
+                default = field.default_factory
+            else:
+                default = empty
+            members.append((field.name, hints[field.name], default))
+    elif issubclass(cls, tuple) and hasattr(cls, "_fields"):
+        hints = _get_type_hints(cls)
+        names: typing.Tuple[str, ...] = typing.cast(typing.Any, cls)._fields
+        if not hints.keys() >= set(names):
+            # collections.namedtuple, without types
+            return None
+        defaults = typing.cast(typing.Any, cls)._field_defaults
+        members = [(name, hints[name], defaults.get(name, empty)) for name in names]
+    elif _is_typeddict(cls):
+        hints = _get_type_hints(cls)
+        total: bool = typing.cast(typing.Any, cls).__total__
+        optional = getattr(
+            cls, "__optional_keys__", frozenset() if total else frozenset(hints)
+        )
+        members = [(name, hint, empty) for name, hint in hints.items()]
+    else:
+        return None
+    signature = inspect.Signature(
+        [
+            inspect.Parameter(
+                name, inspect.Parameter.KEYWORD_ONLY, default=default, annotation=hint
+            )
+            for name, hint, default in members
+        ]
+    )
+    return signature, frozenset(optional)
+
+
+def _structured_builder(
+    cls: type,
+) -> typing.Tuple[typing.Callable, typing.Optional[type]]:
+    # Return the ``build`` function and the ``load_target`` of the schema of cls
+    if _is_typeddict(cls):
+        return StructuredSchema.build, None
+    if (
+        dataclasses.is_dataclass(cls)
+        and "__slots__" in vars(cls)
+        and not hasattr(cls, "__post_init__")
+        and all(field.init for field in dataclasses.fields(cls))
+    ):
+        target: typing.Optional[type] = cls
+    else:
+        target = None
+
+    def build(data: typing.Dict[str, typing.Any]) -> typing.Any:
+        return cls(**data)
+
+    return build, target
+
+
+# Schema classes generated for structured types, by (id of the type mapping,
+# type), as for `resolve_field_class`
+_structured_schemas = LRUCache(maxsize=1024)
+# Types whose schema is being generated, by thread: a type referring to itself
+# is nested lazily
+_building = threading.local()
+
+
+def structured_schema(
+    cls: type, type_mapping: typing.Optional[TypeMapping] = None
+) -> typing.Optional[typing.Type[StructuredSchema]]:
+    """Return the `StructuredSchema` class loading the dataclass, TypedDict or
+    NamedTuple ``cls``, or `None` if ``cls`` is none of these. Schemas are
+    generated once per type and type mapping.
+    """
+    type_mapping = type_mapping or DEFAULT_TYPE_MAPPING
+    key = (id(type_mapping), cls)
+    entry = _structured_schemas.get(key)
+    if entry is not None and entry[0] is type_mapping and entry[1] == len(type_mapping):
+        return entry[2]
+    members = _structured_signature(cls)
+    schema_cls = None
+    if members is not None:
+        schema_cls = _make_structured_schema(cls, *members, type_mapping)
+    # Other types are remembered as well, as they are looked up on every build
+    _structured_schemas.set(key, (type_mapping, len(type_mapping), schema_cls))
+    return schema_cls
+
+
+def _make_structured_schema(
+    cls: type,
+    signature: inspect.Signature,
+    optional: typing.FrozenSet[str],
+    type_mapping: TypeMapping,
+) -> typing.Type[StructuredSchema]:
+    building = getattr(_building, "types", None)
+    if building is None:
+        building = _building.types = set()
+    building.add(cls)
+    try:
+        fields_dict = {
+            name: _type2field(
+                name,
+                parameter.annotation,
+                signature,
+                type_mapping,
+                **({"required": False} if name in optional else {}),
+            )
+            for name, parameter in signature.parameters.items()
+        }
+    finally:
+        building.discard(cls)
+    build, target = _structured_builder(cls)
+    schema_cls = typing.cast(
+        typing.Type[StructuredSchema],
+        StructuredSchema.from_dict(fields_dict, name=f"{cls.__name__}Schema"),
+    )
+    schema_cls.build = staticmethod(build)  # type: ignore[assignment]
+    schema_cls.load_target = target
+    return schema_cls
+
+
+def _structured_nested(
+    cls: type, type_mapping: TypeMapping
+) -> typing.Optional[typing.Union[type, typing.Callable[[], Schema]]]:
+    # The ``nested`` argument of the field of a structured type, or None
+    if cls in getattr(_building, "types", ()):
+        return lambda: typing.cast(
+            typing.Type[StructuredSchema], structured_schema(cls, type_mapping)
+        )()
+    return structured_schema(cls, type_mapping)
+
+
 def _type2field(
     name: str,
     type_: type,
@@ -49,19 +351,40 @@ def _type2field(
 ) -> Field:
     if isinstance(type_, Field):
         return type_
+    metadata = getattr(type_, "__metadata__", None)
+    if metadata is not None:
+        # typing.Annotated[T, ...]: use a field passed as metadata, if any,
+        # otherwise the field for T
+        for item in metadata:
+            if isinstance(item, Field):
+                return item
+        origin = typing.cast(typing.Any, type_).__origin__
+        return _type2field(name, origin, signature, type_mapping, **kwargs)
     else:
         default = signature.parameters[name].default
         required = default is inspect.Parameter.empty
-        field_kwargs = {"required": required}
+        field_kwargs: typing.Dict[str, typing.Any] = {"required": required}
         args = getattr(type_, "__args__", [])
 
         if not required:
             field_kwargs["load_default"] = default
 
-        origin_cls = getattr(type_, "__origin__", None) or type_
-        try:
-            field_cls = type_mapping[origin_cls]
-        except KeyError as key_err:
+        origin_cls: typing.Any
+        if _UnionType is not None and isinstance(type_, _UnionType):
+            # X | Y is the same as typing.Union[X, Y]
+            origin_cls = typing.Union
+        else:
+            origin_cls = getattr(type_, "__origin__", None) or type_
+        # Dataclasses, TypedDicts and NamedTuples are loaded by a nested schema,
+        # unless the mapping has a field for them
+        if origin_cls not in type_mapping and isinstance(origin_cls, type):
+            nested = _structured_nested(origin_cls, type_mapping)
+            if nested is not None:
+                field_kwargs["nested"] = nested
+                field_kwargs.update(kwargs)
+                return _intern_field(fields.Nested, field_kwargs)
+        field_cls = resolve_field_class(origin_cls, type_mapping)
+        if field_cls is None:
             if type(type_) is typing.TypeVar:
                 field_cls = fields.Field
             # typing.Optional[T] or typing.Union[T, None] -> fields.Field(allow_none=True)
@@ -73,17 +396,21 @@ def _type2field(
                 # If only one other type is passed, get the proper field for that type
                 # e.g. typing.Union[int, None] -> fields.Int(allow_none=True)
                 if len(non_none_args) == 1:
-                    try:
-                        field_cls = type_mapping[non_none_args[0]]
-                    except KeyError as err:
-                        raise TypeMappingError(name, origin_cls) from err
-                else:
-                    field_cls = fields.Field
+                    return _type2field(
+                        name,
+                        non_none_args[0],
+                        signature,
+                        type_mapping,
+                        **{"allow_none": True, **kwargs},
+                    )
+                field_cls = fields.Field
             else:
-                raise TypeMappingError(name, origin_cls) from key_err
+                raise TypeMappingError(name, origin_cls)
 
+        if _EnumField is not None and issubclass(field_cls, _EnumField):
+            field_kwargs["enum"] = origin_cls
         # Handle container fields
-        if issubclass(field_cls, fields.List):
+        elif issubclass(field_cls, fields.List):
             args = getattr(type_, "__args__", [])
             if args:
                 inner_type = args[0]
@@ -99,7 +426,7 @@ def _type2field(
                 value_container = _type2field(name, val_type, signature, type_mapping)
                 field_kwargs["values"] = value_container
         field_kwargs.update(kwargs)
-        return field_cls(**field_kwargs)
+        return _intern_field(field_cls, field_kwargs)
 
 
 def annotations2schema(
@@ -110,13 +437,59 @@ def annotations2schema(
     signature = inspect.signature(func)
     fields_dict = {}
     for name, annotation in annotations.items():
-        # Skip over request argument and return annotation
+        # Skip over request (or websocket) argument and return annotation
         if name == "return" or (
-            isinstance(annotation, type) and issubclass(annotation, Request)
+            isinstance(annotation, type) and issubclass(annotation, HTTPConnection)
         ):
             continue
 
         fields_dict[name] = _type2field(name, annotation, signature, type_mapping)
 
-    schema_class = Schema.from_dict(fields_dict)
+    # Fields are interned, so identical parameters give identical keys
+    key = tuple(fields_dict.items())
+    schema_class = _schema_cache.get(key)
+    if schema_class is None:
+        schema_class = _schema_cache[key] = Schema.from_dict(fields_dict)
     return typing.cast(typing.Type[Schema], schema_class)
+
+
+# Generic types whose schema argument is dumped as a list of objects
+_SEQUENCE_ORIGINS = (list, tuple, abc.Sequence, abc.Iterable, abc.MutableSequence)
+
+
+def return_annotation2schema(
+    func: typing.Callable,
+) -> typing.Optional[typing.Tuple[typing.Union[Schema, typing.Type[Schema]], bool]]:
+    """Return the schema (a `Schema` class or instance) described by the return
+    annotation of ``func`` and whether it dumps a list of objects, or `None` if
+    the return value is not described by a schema.
+
+    ``-> UserSchema`` dumps one object; ``-> typing.List[UserSchema]`` (or
+    another sequence type) dumps a list. ``-> typing.Annotated[T, UserSchema]``
+    describes the returned objects as ``T`` for type checkers, and dumps a list
+    if ``T`` is a sequence type.
+    """
+    annotation = getattr(func, "__annotations__", {}).get("return")
+    metadata = getattr(annotation, "__metadata__", None)
+    if metadata is not None:
+        returned = typing.cast(typing.Any, annotation).__origin__
+        for item in metadata:
+            if isinstance(item, Schema):
+                return item, bool(item.many)
+            if isinstance(item, type) and issubclass(item, Schema):
+                origin = getattr(returned, "__origin__", None) or returned
+                return item, origin in _SEQUENCE_ORIGINS
+        return None
+    if isinstance(annotation, Schema):
+        return annotation, bool(annotation.many)
+    if isinstance(annotation, type):
+        if issubclass(annotation, Schema):
+            return annotation, False
+        return None
+    args = getattr(annotation, "__args__", ())
+    origin = getattr(annotation, "__origin__", None)
+    if origin in _SEQUENCE_ORIGINS and args:
+        item = args[0]
+        if isinstance(item, type) and issubclass(item, Schema):
+            return item, True
+    return None
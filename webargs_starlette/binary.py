@@ -0,0 +1,54 @@
+"""Decoding of msgpack and CBOR request bodies.
+
+msgpack and cbor2 are optional dependencies, installed with the ``msgpack``
+and ``cbor`` extras.
+"""
+import io
+import typing
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover
+    cbor2 = None
+
+#: Content types of msgpack bodies
+MSGPACK_MIMETYPES: typing.FrozenSet[str] = frozenset(
+    ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+)
+#: Content types of CBOR bodies
+CBOR_MIMETYPES: typing.FrozenSet[str] = frozenset(("application/cbor",))
+
+
+def msgpack_loads(body: bytes) -> typing.Any:
+    """Decode a msgpack body. Strings are decoded as UTF-8 and binary values
+    are returned as `bytes`.
+
+    Raises a `ValueError` if ``body`` is not a single valid msgpack value.
+    """
+    if msgpack is None:  # pragma: no cover
+        raise RuntimeError("Decoding msgpack bodies requires msgpack")
+    # The unpacker reads from the body's buffer directly
+    return msgpack.unpackb(body, raw=False)
+
+
+def cbor_loads(body: bytes) -> typing.Any:
+    """Decode a CBOR body. Byte strings are returned as `bytes`.
+
+    Raises a `ValueError` if ``body`` is not a single valid CBOR value.
+    """
+    if cbor2 is None:  # pragma: no cover
+        raise RuntimeError("Decoding CBOR bodies requires cbor2")
+    # BytesIO shares the body's buffer until it is written to
+    fp = io.BytesIO(body)
+    try:
+        data = cbor2.CBORDecoder(fp).decode()
+    except cbor2.CBORDecodeError as exc:
+        raise ValueError(str(exc)) from exc
+    if fp.tell() != len(body):
+        raise ValueError("Extra data after the CBOR value")
+    return data
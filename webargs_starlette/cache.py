@@ -0,0 +1,146 @@
+import copy
+import datetime
+import decimal
+import threading
+import time
+import typing
+import uuid
+from collections import OrderedDict
+
+CacheInfo = typing.NamedTuple(
+    "CacheInfo",
+    [
+        ("hits", int),
+        ("misses", int),
+        ("maxsize", typing.Optional[int]),
+        ("currsize", int),
+    ],
+)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """A small, thread-safe least-recently-used cache.
+
+    :param maxsize: Maximum number of entries to keep. ``None`` means unbounded;
+        ``0`` disables caching entirely.
+    :param ttl: Time, in seconds, after which an entry expires. ``None`` means
+        entries never expire.
+    :param timer: Clock used to expire entries.
+    """
+
+    def __init__(
+        self,
+        maxsize: typing.Optional[int] = 128,
+        ttl: typing.Optional[float] = None,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[typing.Hashable, typing.Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is not _MISSING and self.ttl is not None:
+                expires, value = value
+                if self.timer() >= expires:
+                    del self._data[key]
+                    value = _MISSING
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: typing.Hashable, value: typing.Any) -> None:
+        if self.maxsize == 0:
+            return
+        if self.ttl is not None:
+            value = (self.timer() + self.ttl, value)
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.maxsize is not None:
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Return hit/miss statistics, in the same shape as
+        `functools.lru_cache`.
+        """
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+    def __contains__(self, key: typing.Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+#: Types whose values cannot be mutated
+IMMUTABLE_TYPES: typing.Tuple[type, ...] = (
+    str,
+    bytes,
+    int,
+    float,
+    bool,
+    type(None),
+    decimal.Decimal,
+    datetime.date,
+    datetime.time,
+    datetime.timedelta,
+    uuid.UUID,
+)
+
+
+def copy_result(value: typing.Any) -> typing.Any:
+    """Return a copy of parsed arguments that can be mutated without affecting
+    ``value``. Dicts of immutable values are copied shallowly.
+    """
+    if isinstance(value, IMMUTABLE_TYPES):
+        return value
+    if type(value) is dict and all(
+        isinstance(item, IMMUTABLE_TYPES) for item in value.values()
+    ):
+        return dict(value)
+    return copy.deepcopy(value)
+
+
+class ResultCache(LRUCache):
+    """Cache of parsed arguments, passed as ``cache`` to ``use_args``,
+    ``use_kwargs``, ``use_annotations`` or ``parse``.
+
+    Results are only cached for ``GET`` and ``HEAD`` requests, for locations
+    that do not read the request body. They are keyed by route, schema and the
+    values of the arguments the schema loads (all arguments, if the schema does
+    not exclude unknown ones). Each lookup returns a copy of the cached result.
+
+    :param maxsize: Maximum number of results to keep. ``None`` means unbounded.
+    :param ttl: Time, in seconds, after which a result expires. ``None`` means
+        results never expire.
+    :param timer: Clock used to expire results.
+    """
+
+    def __init__(
+        self,
+        maxsize: typing.Optional[int] = 1024,
+        ttl: typing.Optional[float] = None,
+        timer: typing.Callable[[], float] = time.monotonic,
+    ) -> None:
+        super().__init__(maxsize=maxsize, ttl=ttl, timer=timer)
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        value = super().get(key, _MISSING)
+        return default if value is _MISSING else copy_result(value)
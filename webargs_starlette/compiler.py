@@ -0,0 +1,360 @@
+"""Compiled fast-path loaders and dumpers for flat schemas.
+
+`compile_schema` returns a subclass of a schema whose ``load`` first runs a
+loader specialized for the schema's fields. The loader only handles the common,
+valid case; whenever it meets a value it cannot convert with certainty (or any
+invalid value), it falls back to the regular marshmallow ``load``. Results and
+error messages are therefore identical to those of the original schema.
+
+`compile_dumper` does the same for ``dump``: values of the exact types of
+scalar fields are copied as is, and anything else is left to marshmallow.
+"""
+import functools
+import math
+import typing
+from collections.abc import Mapping
+
+import marshmallow as ma
+from marshmallow import fields
+from marshmallow.fields import Field
+
+# Returned by compiled converters and loaders to request a fallback to marshmallow
+_FALLBACK = object()
+
+Converter = typing.Callable[[typing.Any], typing.Any]
+
+
+def _compile_integer(field: fields.Integer) -> Converter:
+    strict = field.strict
+
+    def convert(value: typing.Any) -> typing.Any:
+        if type(value) is int:
+            return value
+        if type(value) is str and not strict:
+            try:
+                return int(value)
+            except ValueError:
+                return _FALLBACK
+        return _FALLBACK
+
+    return convert
+
+
+def _compile_float(field: fields.Float) -> Converter:
+    allow_nan = field.allow_nan
+
+    def convert(value: typing.Any) -> typing.Any:
+        if type(value) in (float, int, str):
+            try:
+                result = float(value)
+            except (ValueError, OverflowError):
+                return _FALLBACK
+            if allow_nan or math.isfinite(result):
+                return result
+        return _FALLBACK
+
+    return convert
+
+
+def _compile_string(field: fields.String) -> Converter:
+    def convert(value: typing.Any) -> typing.Any:
+        return value if type(value) is str else _FALLBACK
+
+    return convert
+
+
+def _compile_boolean(field: fields.Boolean) -> typing.Optional[Converter]:
+    truthy, falsy = field.truthy, field.falsy
+    if not truthy:
+        # Any value is coerced with bool(); leave it to marshmallow
+        return None
+
+    def convert(value: typing.Any) -> typing.Any:
+        if type(value) in (str, int, bool):
+            if value in truthy:
+                return True
+            if value in falsy:
+                return False
+        return _FALLBACK
+
+    return convert
+
+
+def _compile_list(field: fields.List) -> typing.Optional[Converter]:
+    compiled_inner = compile_field(field.inner)
+    if compiled_inner is None:
+        return None
+    convert_inner: Converter = compiled_inner
+
+    def convert(value: typing.Any) -> typing.Any:
+        if type(value) not in (list, tuple):
+            return _FALLBACK
+        result = []
+        for item in value:
+            item = convert_inner(item)
+            if item is _FALLBACK:
+                return _FALLBACK
+            result.append(item)
+        return result
+
+    return convert
+
+
+_FIELD_COMPILERS: typing.Dict[
+    typing.Type[Field], typing.Callable[[typing.Any], typing.Optional[Converter]]
+] = {
+    fields.Integer: _compile_integer,
+    fields.Float: _compile_float,
+    fields.String: _compile_string,
+    fields.Boolean: _compile_boolean,
+    fields.List: _compile_list,
+}
+
+
+def compile_field(field: Field) -> typing.Optional[Converter]:
+    """Return a function converting a present (non-missing) raw value for
+    ``field``, or `None` if the field cannot be compiled.
+
+    The function returns ``_FALLBACK`` for values it cannot convert.
+    """
+    # Exact type check: subclasses may override deserialization
+    compiler = _FIELD_COMPILERS.get(type(field))
+    if compiler is None or field.validators:
+        return None
+    compiled = compiler(field)
+    if compiled is None:
+        return None
+    convert: Converter = compiled
+    allow_none = field.allow_none
+
+    def convert_field(value: typing.Any) -> typing.Any:
+        if value is None:
+            return None if allow_none else _FALLBACK
+        return convert(value)
+
+    return convert_field
+
+
+def _deserializer(
+    field: Field, data_key: str, **kwargs
+) -> typing.Callable[[typing.Any, typing.Any], typing.Any]:
+    # Used for fields that could not be compiled
+    def convert(value: typing.Any, data: typing.Any = None) -> typing.Any:
+        try:
+            return field.deserialize(value, data_key, data, **kwargs)
+        except ma.ValidationError:
+            return _FALLBACK
+
+    return convert
+
+
+def _sub_partial(
+    partial: typing.Union[bool, typing.Collection[str], None], data_key: str
+) -> typing.Dict[str, typing.Any]:
+    # The ``partial`` argument marshmallow passes to the field, as in
+    # `marshmallow.Schema._deserialize`
+    if partial is None or isinstance(partial, bool):
+        return {} if partial is None else {"partial": partial}
+    prefix = data_key + "."
+    return {
+        "partial": [name[len(prefix) :] for name in partial if name.startswith(prefix)]
+    }
+
+
+def compile_loader(
+    schema: ma.Schema,
+    partial: typing.Union[bool, typing.Collection[str], None] = None,
+) -> typing.Optional[typing.Callable[[typing.Any, typing.Optional[str]], typing.Any]]:
+    """Return a function that loads data with ``schema``'s fields, or `None` if the
+    schema cannot be compiled (e.g. it has processors or schema-level validators).
+
+    The loader receives ``(data, unknown)`` and returns ``_FALLBACK`` whenever the
+    data must be loaded by marshmallow instead. With ``partial``, it loads data
+    as ``schema.load(data, partial=partial)`` does.
+    """
+    if schema.many or any(schema._hooks.values()):
+        return None
+    # (data key, result key, field, converter, whether the converter receives
+    # the data, whether missing values are skipped)
+    plan: typing.List[
+        typing.Tuple[str, str, Field, typing.Callable[..., typing.Any], bool, bool]
+    ] = []
+    for attr_name, field in schema.load_fields.items():
+        data_key = field.data_key if field.data_key is not None else attr_name
+        key = field.attribute or attr_name
+        if "." in key:
+            return None
+        # Missing fields of a partial load are skipped, without their default
+        if partial is None or isinstance(partial, bool):
+            skip_missing = partial is True
+        else:
+            skip_missing = attr_name in partial
+        convert = compile_field(field)
+        if convert is None:
+            deserialize = _deserializer(
+                field, data_key, **_sub_partial(partial, data_key)
+            )
+            plan.append((data_key, key, field, deserialize, True, skip_missing))
+        else:
+            plan.append((data_key, key, field, convert, False, skip_missing))
+    data_keys = {data_key for data_key, *_ in plan}
+    dict_class = schema.dict_class
+    target = None if partial else getattr(schema, "load_target", None)
+    set_attribute = object.__setattr__
+    new = dict_class if target is None else functools.partial(object.__new__, target)
+
+    def load(data: typing.Any, unknown: typing.Optional[str]) -> typing.Any:
+        if not isinstance(data, Mapping):
+            return _FALLBACK
+        result = new()
+        for data_key, key, field, convert, needs_data, skip_missing in plan:
+            raw_value = data.get(data_key, ma.missing)
+            if raw_value is ma.missing:
+                if skip_missing:
+                    continue
+                if field.required:
+                    return _FALLBACK
+                value = field.load_default
+                if value is ma.missing:
+                    continue
+                if callable(value):
+                    value = value()
+            else:
+                value = convert(raw_value, data) if needs_data else convert(raw_value)
+                if value is _FALLBACK:
+                    return _FALLBACK
+            if target is None:
+                result[key] = value
+            else:
+                set_attribute(result, key, value)
+        # Unknown keys are either included or raise an error: let marshmallow
+        # handle both
+        if unknown != ma.EXCLUDE and not data_keys.issuperset(data):
+            return _FALLBACK
+        return result
+
+    return load
+
+
+class _CompiledLoadMixin:
+    _compiled_loader: typing.Optional[typing.Callable] = None
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._compiled_loader = compile_loader(
+            typing.cast(ma.Schema, self), partial=self.partial  # type: ignore
+        )
+
+    def load(self, data, *, many=None, partial=None, unknown=None):
+        # The loader is compiled for the schema's own ``partial``
+        loader = self._compiled_loader
+        if loader is not None and not many and partial is None:
+            result = loader(data, unknown or self.unknown)
+            if result is not _FALLBACK:
+                return result
+        return super().load(  # type: ignore[misc]
+            data, many=many, partial=partial, unknown=unknown
+        )
+
+
+def compile_schema(schema_cls: typing.Type[ma.Schema]) -> typing.Type[ma.Schema]:
+    """Return a subclass of ``schema_cls`` that loads data with a compiled loader,
+    falling back to marshmallow for anything the loader cannot handle.
+    """
+    return typing.cast(
+        typing.Type[ma.Schema],
+        type(schema_cls.__name__, (_CompiledLoadMixin, schema_cls), {}),
+    )
+
+
+# Types of the values that scalar fields dump unchanged, by field class
+_DUMP_AS_IS: typing.Dict[typing.Type[Field], typing.Tuple[type, ...]] = {
+    fields.String: (str,),
+    fields.Integer: (int,),
+    fields.Float: (float,),
+    fields.Boolean: (bool,),
+}
+
+
+def _get_dump_value(obj: typing.Any, key: str) -> typing.Any:
+    """Return the value of ``key`` in ``obj``, as `marshmallow.utils.get_value`
+    would, or ``_FALLBACK`` for objects it does not handle.
+    """
+    if type(obj) is dict:
+        value = obj.get(key, ma.missing)
+        # A missing key is looked up as an attribute by marshmallow
+        if value is ma.missing and hasattr(dict, key):
+            return _FALLBACK
+        return value
+    if hasattr(type(obj), "__getitem__"):
+        return _FALLBACK
+    return getattr(obj, key, ma.missing)
+
+
+def compile_dumper(
+    schema: ma.Schema,
+) -> typing.Optional[typing.Callable[[typing.Any, bool], typing.Any]]:
+    """Return a function that dumps objects with ``schema``, or `None` if the
+    schema cannot be compiled (e.g. it has processors).
+
+    The dumper receives ``(obj, many)`` and returns the same data as
+    ``schema.dump(obj, many=many)``. Fields other than flat scalar fields are
+    serialized by marshmallow, field by field.
+    """
+    if any(schema._hooks.values()) or (
+        type(schema).get_attribute is not ma.Schema.get_attribute
+    ):
+        return None
+    # (data key, attribute name or key, field, types dumped as is or `None` for
+    # fields serialized by marshmallow)
+    plan: typing.List[
+        typing.Tuple[str, str, Field, typing.Optional[typing.Tuple[type, ...]]]
+    ] = []
+    for attr_name, field in schema.dump_fields.items():
+        data_key = field.data_key if field.data_key is not None else attr_name
+        key = field.attribute or attr_name
+        as_is = _DUMP_AS_IS.get(type(field))
+        if (
+            as_is is None
+            or "." in key
+            or field.dump_default is not ma.missing
+            or getattr(field, "as_string", False)
+        ):
+            plan.append((data_key, attr_name, field, None))
+        else:
+            plan.append((data_key, key, field, as_is))
+    dict_class = schema.dict_class
+    get_attribute = schema.get_attribute
+
+    def dump_one(obj: typing.Any) -> typing.Any:
+        result = dict_class()
+        for data_key, key, field, as_is in plan:
+            if as_is is None:
+                value = field.serialize(key, obj, accessor=get_attribute)
+            else:
+                value = _get_dump_value(obj, key)
+                if value is _FALLBACK:
+                    return _FALLBACK
+                if value is not None and value is not ma.missing:
+                    if type(value) not in as_is:
+                        return _FALLBACK
+            if value is not ma.missing:
+                result[data_key] = value
+        return result
+
+    def dump(obj: typing.Any, many: bool) -> typing.Any:
+        if not many:
+            result = dump_one(obj)
+            return schema.dump(obj, many=False) if result is _FALLBACK else result
+        if obj is None:
+            return schema.dump(obj, many=True)
+        items = obj if isinstance(obj, (list, tuple)) else list(obj)
+        results = []
+        for item in items:
+            result = dump_one(item)
+            if result is _FALLBACK:
+                return schema.dump(items, many=True)
+            results.append(result)
+        return results
+
+    return dump
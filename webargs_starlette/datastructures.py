@@ -0,0 +1,283 @@
+"""Read-only views of request data, built for schema-driven lookups."""
+import re
+import typing
+from collections.abc import Mapping
+from http import cookies as http_cookies
+from urllib.parse import unquote_to_bytes
+
+from starlette.types import Scope
+
+HEADER_INDEX_SCOPE_KEY = "webargs_starlette.header_index"
+COOKIES_SCOPE_KEY = "webargs_starlette.cookies"
+
+
+class HeaderIndex(Mapping):
+    """Case-insensitive view of raw ASGI headers, indexed by name.
+
+    The index is built with a single pass over the headers; values are decoded
+    when they are looked up. Lookups return the first value of a header, like
+    `starlette.datastructures.Headers`; `getlist` returns all of them. As
+    required by the ASGI spec, raw header names are expected to be lowercase.
+    """
+
+    __slots__ = ("_raw", "_index")
+
+    def __init__(self, raw: typing.Iterable[typing.Tuple[bytes, bytes]]) -> None:
+        if not isinstance(raw, (list, tuple)):
+            raw = list(raw)
+        self._raw = raw
+        # Later duplicates are overwritten by earlier ones: the first value wins
+        self._index: typing.Dict[bytes, bytes] = dict(reversed(raw))
+
+    @classmethod
+    def from_scope(cls, scope: Scope) -> "HeaderIndex":
+        """Return the index of the headers of ``scope``, built once per scope."""
+        index = scope.get(HEADER_INDEX_SCOPE_KEY)
+        if index is None:
+            index = scope[HEADER_INDEX_SCOPE_KEY] = cls(scope.get("headers", ()))
+        return index
+
+    def __getitem__(self, key: str) -> str:
+        return self._index[key.lower().encode("latin-1")].decode("latin-1")
+
+    def get(self, key: str, default: typing.Any = None) -> typing.Any:
+        value = self._index.get(key.lower().encode("latin-1"))
+        return default if value is None else value.decode("latin-1")
+
+    def getlist(self, key: str) -> typing.List[str]:
+        raw_key = key.lower().encode("latin-1")
+        if raw_key not in self._index:
+            return []
+        return [
+            value.decode("latin-1")
+            for header_key, value in self._raw
+            if header_key == raw_key
+        ]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and key.lower().encode("latin-1") in self._index
+
+    def __iter__(self) -> typing.Iterator[str]:
+        # In the order of the headers
+        return iter(dict.fromkeys(key.decode("latin-1") for key, _ in self._raw))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+
+class LazyCookies(Mapping):
+    """View of the cookies of a ``Cookie`` header.
+
+    The header is split on first access, and a cookie value is only unquoted
+    when it is looked up, so loading a few cookies does not pay for all of
+    them. Parsing follows `starlette.requests.cookie_parser`.
+    """
+
+    __slots__ = ("_header", "_raw", "_values")
+
+    def __init__(self, header: str) -> None:
+        self._header = header
+        self._raw: typing.Optional[typing.Dict[str, str]] = None
+        self._values: typing.Dict[str, str] = {}
+
+    @classmethod
+    def from_scope(cls, scope: Scope) -> "LazyCookies":
+        """Return the cookies of ``scope``, created once per scope."""
+        cookies = scope.get(COOKIES_SCOPE_KEY)
+        if cookies is None:
+            header = HeaderIndex.from_scope(scope).get("cookie", "")
+            cookies = scope[COOKIES_SCOPE_KEY] = cls(header)
+        return cookies
+
+    def _split(self) -> typing.Dict[str, str]:
+        if self._raw is None:
+            raw = {}
+            for chunk in self._header.split(";"):
+                if "=" in chunk:
+                    key, value = chunk.split("=", 1)
+                else:
+                    # Assume an empty name per
+                    # https://bugzilla.mozilla.org/show_bug.cgi?id=169091
+                    key, value = "", chunk
+                key, value = key.strip(), value.strip()
+                if key or value:
+                    raw[key] = value
+            self._raw = raw
+        return self._raw
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = http_cookies._unquote(  # type: ignore
+            self._split()[key]
+        )
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._split()
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._split())
+
+    def __len__(self) -> int:
+        return len(self._split())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._header!r})"
+
+
+# A query string parameter whose key is percent-encoded, in a query string
+# prefixed with "&"
+_ENCODED_KEY_RE = re.compile(rb"&([^&=%+]*[%+][^&=]*)(?:=([^&]*))?")
+
+
+def _unquote_plus(raw: bytes) -> str:
+    """Decode a percent-encoded query string key or value, like
+    `urllib.parse.unquote_plus`.
+    """
+    if b"%" in raw or b"+" in raw:
+        raw = unquote_to_bytes(raw.replace(b"+", b" "))
+    return raw.decode("utf-8", "replace")
+
+
+class QueryParams(Mapping):
+    """View of a raw query string that only decodes the parameters it is asked
+    for.
+
+    On first lookup, the query string is searched for each of the parameters
+    named ``keys``, so other parameters are skipped without being split or
+    decoded. Values are decoded when they are looked up. Iterating decodes every
+    key. Parsing follows `urllib.parse.parse_qsl`, with blank values kept.
+
+    :param bytes raw: The raw query string, e.g. ``scope["query_string"]``.
+    :param keys: Names of the parameters to index.
+    :param bytes list_delimiter: When set, `getlist` also splits each value on
+        this delimiter. Encoded delimiters (e.g. ``%2C``) are not split.
+    :param int max_params: Maximum number of parameters to scan. Parameters
+        past the limit are ignored.
+    """
+
+    __slots__ = (
+        "_raw",
+        "_names",
+        "_list_delimiter",
+        "_max_params",
+        "_index",
+    )
+
+    def __init__(
+        self,
+        raw: bytes,
+        keys: typing.Iterable[str],
+        *,
+        list_delimiter: typing.Optional[bytes] = None,
+        max_params: typing.Optional[int] = None,
+    ) -> None:
+        self._raw = raw
+        self._names = keys if isinstance(keys, frozenset) else frozenset(keys)
+        self._list_delimiter = list_delimiter
+        self._max_params = max_params
+        self._index: typing.Optional[typing.Dict[str, typing.List[bytes]]] = None
+
+    def _pairs(self) -> typing.Iterator[typing.Tuple[bytes, bytes]]:
+        max_params = self._max_params
+        count = 0
+        for pair in self._raw.split(b"&"):
+            if not pair:
+                continue
+            if max_params is not None and count >= max_params:
+                return
+            count += 1
+            key, _, value = pair.partition(b"=")
+            yield key, value
+
+    def _scanned(self) -> bytes:
+        """Return the part of the query string within ``max_params``."""
+        raw, max_params = self._raw, self._max_params
+        if max_params is None or raw.count(b"&") < max_params:
+            return raw
+        end = -1
+        count = 0
+        while count < max_params:
+            end = raw.find(b"&", end + 1)
+            if end == -1:
+                return raw
+            # Empty parameters do not count
+            if end > 0 and raw[end - 1 : end] != b"&":
+                count += 1
+        return raw[:end]
+
+    def _get_index(self) -> typing.Dict[str, typing.List[bytes]]:
+        if self._index is None:
+            # Each parameter is preceded by "&"
+            raw = b"&" + self._scanned()
+            size = len(raw)
+            found: typing.List[typing.Tuple[int, str, bytes]] = []
+            for name in self._names:
+                if "%" in name or "+" in name:
+                    # Only found in their encoded form, below
+                    continue
+                needle = b"&" + name.encode("utf-8")
+                start = raw.find(needle)
+                while start != -1:
+                    key_end = start + len(needle)
+                    end = raw.find(b"&", key_end)
+                    if end == -1:
+                        end = size
+                    if key_end == end:
+                        found.append((start, name, b""))
+                    elif raw[key_end] == 0x3D:  # "="
+                        found.append((start, name, raw[key_end + 1 : end]))
+                    start = raw.find(needle, end)
+            # Percent-encoded keys must be decoded to be matched
+            if b"%" in raw or b"+" in raw:
+                for match in _ENCODED_KEY_RE.finditer(raw):
+                    name = _unquote_plus(match.group(1))
+                    if name in self._names:
+                        found.append((match.start(), name, match.group(2) or b""))
+            found.sort(key=lambda item: item[0])
+            index: typing.Dict[str, typing.List[bytes]] = {}
+            for _, name, value in found:
+                index.setdefault(name, []).append(value)
+            self._index = index
+        return self._index
+
+    def _lookup(self, key: str) -> typing.List[bytes]:
+        """Return the raw values of ``key``."""
+        if key in self._names:
+            return self._get_index().get(key, [])
+        # Keys that are not indexed are looked up in the whole query string
+        return [
+            value for raw_key, value in self._pairs() if _unquote_plus(raw_key) == key
+        ]
+
+    def __getitem__(self, key: str) -> str:
+        values = self._lookup(key)
+        if not values:
+            raise KeyError(key)
+        # The last value wins, as in `starlette.datastructures.QueryParams`
+        return _unquote_plus(values[-1])
+
+    def getlist(self, key: str) -> typing.List[str]:
+        values = self._lookup(key)
+        delimiter = self._list_delimiter
+        if delimiter is not None:
+            values = [item for value in values for item in value.split(delimiter)]
+        return [_unquote_plus(value) for value in values]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and bool(self._lookup(key))
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(dict.fromkeys(_unquote_plus(key) for key, _ in self._pairs()))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._raw!r})"
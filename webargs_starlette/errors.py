@@ -0,0 +1,101 @@
+"""Encoding of validation error responses."""
+import json
+import typing
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .cache import LRUCache
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from .starletteparser import WebargsHTTPException
+
+#: Bodies larger than this, in bytes, are not kept in an `ErrorBodyCache`
+MAX_CACHED_BODY_SIZE = 4096
+
+
+def encode_messages(messages: typing.Any) -> bytes:
+    """Encode validation messages as a JSON response body, the same way as
+    `starlette.responses.JSONResponse`.
+    """
+    return json.dumps(
+        messages, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def _truncate(messages: typing.Any, budget: int) -> typing.Tuple[typing.Any, int]:
+    # Return the first ``budget`` messages, and the budget left
+    if isinstance(messages, dict):
+        truncated_dict = {}
+        for key, value in messages.items():
+            if budget <= 0:
+                break
+            truncated_dict[key], budget = _truncate(value, budget)
+        return truncated_dict, budget
+    if isinstance(messages, (list, tuple)):
+        truncated_list = []
+        for value in messages:
+            if budget <= 0:
+                break
+            value, budget = _truncate(value, budget)
+            truncated_list.append(value)
+        return truncated_list, budget
+    return messages, budget - 1
+
+
+def truncate_messages(messages: typing.Any, limit: typing.Optional[int]) -> typing.Any:
+    """Return (nested) validation messages with at most ``limit`` messages,
+    keeping the first ones. Return ``messages`` itself if there are fewer.
+    """
+    if limit is None:
+        return messages
+    truncated, budget = _truncate(messages, limit + 1)
+    return messages if budget > 0 else _truncate(truncated, limit)[0]
+
+
+#: Pre-encoded body of the invalid JSON error
+INVALID_JSON_BODY = encode_messages({"json": ["Invalid JSON body."]})
+
+
+class ErrorBodyCache:
+    """Cache of encoded error bodies, keyed by the content of the messages.
+
+    Error shapes repeat: the same missing or invalid arguments on the same
+    schema produce the same messages, which are then only encoded once. The
+    ``repr`` of the messages is used as key; it is much cheaper to compute than
+    a hashable copy of nested messages, and keeps key order.
+
+    :param maxsize: Maximum number of bodies to keep.
+    """
+
+    def __init__(self, maxsize: typing.Optional[int] = 256) -> None:
+        self.cache = LRUCache(maxsize=maxsize)
+
+    def encode(self, messages: typing.Any) -> bytes:
+        key = repr(messages)
+        body = self.cache.get(key)
+        if body is None:
+            body = encode_messages(messages)
+            if len(body) <= MAX_CACHED_BODY_SIZE:
+                self.cache.set(key, body)
+        return body
+
+
+async def webargs_exception_handler(
+    request: Request, exc: "WebargsHTTPException"
+) -> Response:
+    """Starlette exception handler that responds with the validation messages of
+    a `WebargsHTTPException` as JSON.
+
+    Uses the pre-encoded body of exceptions raised with ``lightweight_errors``.
+    ::
+
+        app.add_exception_handler(WebargsHTTPException, webargs_exception_handler)
+    """
+    body = exc.body if exc.body is not None else encode_messages(exc.messages)
+    return Response(
+        body,
+        status_code=exc.status_code,
+        headers=exc.headers,
+        media_type="application/json",
+    )
@@ -0,0 +1,141 @@
+"""Fail-fast loading, which stops at the first validation error.
+
+marshmallow collects the errors of every field, and of every item of
+containers. `fail_fast_schema` returns a copy of a schema whose fields raise
+the first error instead of storing it, and whose `List`, `Tuple`, `Dict` and
+`Nested` fields stop at their first invalid item. The error keeps the path of
+the invalid value, e.g. ``{"ids": {0: ["Not a valid integer."]}}``.
+
+Subclasses of these container fields that override deserialization (other
+than `webargs.fields.DelimitedList`) load all their items, as usual.
+"""
+import copy
+import functools
+import typing
+
+from marshmallow import Schema, ValidationError, fields, utils
+from marshmallow.fields import Field
+from webargs.fields import DelimitedList
+
+from .compiler import compile_loader
+
+
+def _call_and_store(getter_func, data, *, field_name, error_store, index=None):
+    # Replaces `Schema._call_and_store`, which stores the error and moves on
+    try:
+        return getter_func(data)
+    except ValidationError as error:
+        messages = {field_name: error.messages}
+        if index is not None:
+            messages = {index: messages}
+        raise ValidationError(messages) from error
+
+
+def _deserialize_list(
+    field: fields.List, value: typing.Any, attr, data, **kwargs
+) -> typing.List[typing.Any]:
+    if isinstance(field, DelimitedList):
+        if not isinstance(value, (str, bytes)):
+            raise field.make_error("invalid")
+        items: typing.List[typing.Any] = value.split(field.delimiter) if value else []
+        value = [item or field.empty_value for item in items]
+    elif not utils.is_collection(value):
+        raise field.make_error("invalid")
+    result: typing.List[typing.Any] = []
+    for index, item in enumerate(value):
+        try:
+            result.append(field.inner.deserialize(item, **kwargs))
+        except ValidationError as error:
+            raise ValidationError({index: error.messages}) from error
+    return result
+
+
+def _deserialize_mapping(
+    field: fields.Mapping, value: typing.Any, attr, data, **kwargs
+) -> typing.Any:
+    if not isinstance(value, typing.Mapping):
+        raise field.make_error("invalid")
+    key_field, value_field = field.key_field, field.value_field
+    result = field.mapping_type()
+    for key, item in value.items():
+        loaded_key = key
+        if key_field is not None:
+            try:
+                loaded_key = key_field.deserialize(key, **kwargs)
+            except ValidationError as error:
+                raise ValidationError({key: {"key": error.messages}}) from error
+        if value_field is not None:
+            try:
+                item = value_field.deserialize(item, **kwargs)
+            except ValidationError as error:
+                raise ValidationError({key: {"value": error.messages}}) from error
+        result[loaded_key] = item
+    return result
+
+
+def _deserialize_nested(
+    field: fields.Nested, value: typing.Any, attr, data, partial=None, **kwargs
+) -> typing.Any:
+    field._test_collection(value)
+    # Built on first use, as schemas may nest themselves
+    schema = field.__dict__.get("_fail_fast_schema")
+    if schema is None:
+        schema = field._fail_fast_schema = fail_fast_schema(field.schema)
+    return schema.load(value, unknown=field.unknown, partial=partial)
+
+
+def _fail_fast_field(field: Field) -> Field:
+    """Return a fail-fast copy of ``field``."""
+    field_class = type(field)
+    if field_class not in (
+        fields.List,
+        DelimitedList,
+        fields.Tuple,
+        fields.Dict,
+        fields.Mapping,
+        fields.Nested,
+    ):
+        return field
+    field = copy.copy(field)
+    if field_class is fields.Nested:
+        field._deserialize = functools.partial(_deserialize_nested, field)
+    elif field_class is fields.Tuple:
+        # The items of a tuple are few: only its item fields need to fail fast
+        field.tuple_fields = [_fail_fast_field(item) for item in field.tuple_fields]
+    elif issubclass(field_class, fields.List):
+        field.inner = _fail_fast_field(field.inner)
+        field._deserialize = functools.partial(_deserialize_list, field)
+    elif field.value_field is not None or field.key_field is not None:
+        if field.key_field is not None:
+            field.key_field = _fail_fast_field(field.key_field)
+        if field.value_field is not None:
+            field.value_field = _fail_fast_field(field.value_field)
+        field._deserialize = functools.partial(_deserialize_mapping, field)
+    return field
+
+
+def fail_fast_schema(schema: Schema) -> Schema:
+    """Return a copy of ``schema`` whose ``load`` raises a `ValidationError`
+    with the first error it meets. ``schema`` is left unchanged.
+    """
+    fail_fast = copy.deepcopy(schema)
+    # The first error is that of the first declared field: marshmallow<3.20
+    # does not keep the fields of unordered schemas in declaration order
+    load_fields = fail_fast.load_fields
+    fail_fast.load_fields = fail_fast.dict_class(
+        (name, load_fields[name])
+        for name in fail_fast.declared_fields
+        if name in load_fields
+    )
+    for name, field in fail_fast.load_fields.items():
+        fail_fast_field = _fail_fast_field(field)
+        if fail_fast_field is not field:
+            for field_dict in (fail_fast.fields, fail_fast.load_fields):
+                field_dict[name] = fail_fast_field
+            if fail_fast.dump_fields.get(name) is field:
+                fail_fast.dump_fields[name] = fail_fast_field
+    fail_fast._call_and_store = _call_and_store  # type: ignore[assignment]
+    # The loader of a compiled schema must load with the fail-fast fields
+    if getattr(fail_fast, "_compiled_loader", None) is not None:
+        fail_fast._compiled_loader = compile_loader(fail_fast)
+    return fail_fast
@@ -0,0 +1,218 @@
+"""Per-request parse timing and metrics."""
+import bisect
+import typing
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+#: Default histogram buckets for parse durations, in seconds
+DEFAULT_BUCKETS: typing.Tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+# Scope key under which ParseMetricsMiddleware collects the metrics of a request
+SCOPE_KEY = "webargs_starlette.metrics"
+
+
+class ParseMetrics:
+    """Timing and size information about a single ``parse`` call.
+
+    ``phases`` maps phase names to the time spent in them, in seconds. Phases are
+    the name of the location loader (e.g. ``"load_json"``), ``"schema"`` (schema
+    load and validation) and ``"handle_error"``.
+    """
+
+    __slots__ = (
+        "route",
+        "method",
+        "location",
+        "phases",
+        "duration",
+        "payload_size",
+        "error_count",
+        "data",
+    )
+
+    def __init__(self, route: str, method: str, location: str) -> None:
+        self.route = route
+        self.method = method
+        self.location = location
+        self.phases: typing.Dict[str, float] = {}
+        self.duration = 0.0
+        self.payload_size: typing.Optional[int] = None
+        self.error_count = 0
+        #: The data loaded from the location, if any
+        self.data: typing.Any = None
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def __repr__(self) -> str:
+        return (
+            f"<ParseMetrics(route={self.route!r}, location={self.location!r}, "
+            f"duration={self.duration!r}, error_count={self.error_count!r})>"
+        )
+
+
+def get_route_name(scope: Scope) -> str:
+    """Return a name identifying the route that handles ``scope``."""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return scope.get("path", "")
+    # Older Starlette versions do not set scope["route"]: find it by its endpoint
+    router = scope.get("router")
+    for candidate in getattr(router, "routes", ()):
+        if getattr(candidate, "endpoint", None) is endpoint:
+            return candidate.path
+    return f"{endpoint.__module__}.{endpoint.__qualname__}"
+
+
+def count_messages(messages: typing.Any) -> int:
+    """Return the number of error messages in a (nested) messages structure."""
+    if isinstance(messages, dict):
+        return sum(count_messages(value) for value in messages.values())
+    if isinstance(messages, (list, tuple)):
+        return sum(count_messages(value) for value in messages)
+    return 1
+
+
+def _describe_value(value: typing.Any) -> str:
+    if isinstance(value, typing.Mapping):
+        return f"dict[{len(value)}]"
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def describe_shape(data: typing.Any, max_keys: int = 20) -> typing.Any:
+    """Return a compact description of the shape of loaded data, for logging.
+    Values themselves are not included.
+    """
+    if not isinstance(data, typing.Mapping):
+        return _describe_value(data)
+    keys = list(data)
+    shape = {key: _describe_value(data[key]) for key in keys[:max_keys]}
+    if len(keys) > max_keys:
+        shape["..."] = f"{len(keys) - max_keys} more keys"
+    return shape
+
+
+class Histogram:
+    """Cumulative histogram, in the style of Prometheus."""
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        # One extra bucket for values above the last bound (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> typing.List[typing.Tuple[float, int]]:
+        """Return ``(upper bound, count)`` pairs, the last bound being infinity."""
+        result, total = [], 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RouteStats:
+    """Aggregated parse metrics for a route."""
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.count = 0
+        self.error_count = 0
+        self.payload_bytes = 0
+        self.duration = Histogram(buckets)
+        self.phases: typing.Dict[str, Histogram] = {}
+
+    def record(self, metrics: ParseMetrics) -> None:
+        self.count += 1
+        self.error_count += metrics.error_count
+        self.payload_bytes += metrics.payload_size or 0
+        self.duration.observe(metrics.duration)
+        for name, seconds in metrics.phases.items():
+            histogram = self.phases.get(name)
+            if histogram is None:
+                histogram = self.phases[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+
+class ParseStats:
+    """Parse metrics aggregated by route, as collected by `ParseMetricsMiddleware`."""
+
+    def __init__(self, buckets: typing.Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.routes: typing.Dict[str, RouteStats] = {}
+
+    def record(self, metrics: ParseMetrics) -> None:
+        key = f"{metrics.method} {metrics.route}"
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats(self.buckets)
+        stats.record(metrics)
+
+
+def collect_into_scope(metrics: ParseMetrics, req: typing.Any) -> None:
+    """Metrics callback that stores metrics on the request's scope, for
+    `ParseMetricsMiddleware`.
+    """
+    collected = req.scope.get(SCOPE_KEY)
+    if collected is not None:
+        collected.append(metrics)
+
+
+class ParseMetricsMiddleware:
+    """ASGI middleware that aggregates the parse metrics of each request by route.
+
+    ::
+
+        stats = ParseStats()
+        app.add_middleware(ParseMetricsMiddleware, parser=parser, stats=stats)
+
+    :param parser: The `StarletteParser` to collect metrics from.
+    :param stats: The `ParseStats` to aggregate into.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        parser: typing.Any,
+        stats: typing.Optional[ParseStats] = None,
+    ) -> None:
+        self.app = app
+        self.stats = stats if stats is not None else ParseStats()
+        if collect_into_scope not in parser.metrics_callbacks:
+            parser.metrics_callback(collect_into_scope)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        collected: typing.List[ParseMetrics] = []
+        scope[SCOPE_KEY] = collected
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            for metrics in collected:
+                self.stats.record(metrics)
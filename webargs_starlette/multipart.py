@@ -0,0 +1,214 @@
+"""Streaming ``multipart/form-data`` parsing with per-part limits."""
+import typing
+from tempfile import SpooledTemporaryFile
+
+from starlette.datastructures import FormData, Headers, UploadFile
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # pragma: no cover
+    try:
+        import multipart  # type: ignore[no-redef]
+        from multipart.multipart import parse_options_header  # type: ignore[no-redef]
+    except ModuleNotFoundError:
+        multipart = None  # type: ignore[assignment]
+        parse_options_header = None
+
+
+class MultipartLimits(typing.NamedTuple):
+    """Limits applied while streaming a ``multipart/form-data`` body."""
+
+    #: Size, in bytes, above which an uploaded file is spooled to disk
+    spool_max_size: int = 1024 * 1024
+    #: Maximum size, in bytes, of a non-file part
+    max_part_size: int = 1024 * 1024
+    #: Maximum size, in bytes, of a file part. ``None`` means unlimited.
+    max_file_size: typing.Optional[int] = None
+    #: Maximum number of non-file parts
+    max_fields: int = 1000
+    #: Maximum number of file parts
+    max_files: int = 1000
+
+
+class MultipartError(ValueError):
+    """Raised when a multipart body is malformed."""
+
+
+class MultipartLimitError(MultipartError):
+    """Raised when a multipart body exceeds one of the `MultipartLimits`."""
+
+
+def _safe_decode(src: bytes, charset: str) -> str:
+    try:
+        return src.decode(charset)
+    except (UnicodeDecodeError, LookupError):
+        return src.decode("latin-1")
+
+
+class _Part:
+    __slots__ = ("name", "disposition", "headers", "data", "file", "size")
+
+    def __init__(self) -> None:
+        self.name = ""
+        self.disposition = b""
+        self.headers: typing.List[typing.Tuple[bytes, bytes]] = []
+        self.data = bytearray()
+        self.file: typing.Optional[UploadFile] = None
+        self.size = 0
+
+
+class StreamingMultipartParser:
+    """Parse a ``multipart/form-data`` body as it is received.
+
+    :param headers: The request headers.
+    :param stream: Async iterator over the body chunks.
+    :param limits: The `MultipartLimits` to enforce.
+    :param on_field: Called with ``(name, value)`` as soon as each non-file part
+        has been received. Exceptions raised by the callback abort parsing.
+
+    File parts are written to a `SpooledTemporaryFile` and returned as
+    `UploadFile` objects positioned at the start of the file.
+    """
+
+    def __init__(
+        self,
+        headers: Headers,
+        stream: typing.AsyncIterator[bytes],
+        *,
+        limits: typing.Optional[MultipartLimits] = None,
+        on_field: typing.Optional[typing.Callable[[str, str], None]] = None,
+    ) -> None:
+        assert (
+            multipart is not None
+        ), "The `python-multipart` library must be installed to parse multipart bodies."
+        self.headers = headers
+        self.stream = stream
+        self.limits = limits or MultipartLimits()
+        self.on_field = on_field
+        self.items: typing.List[typing.Tuple[str, typing.Union[str, UploadFile]]] = []
+        self._charset = "utf-8"
+        self._part = _Part()
+        self._header_name = b""
+        self._header_value = b""
+        self._fields = 0
+        self._files: typing.List[UploadFile] = []
+        # Work queued by the (synchronous) parser callbacks, processed after
+        # each chunk so that file writes can be awaited
+        self._file_writes: typing.List[typing.Tuple[_Part, bytes]] = []
+        self._finished_parts: typing.List[_Part] = []
+
+    def on_part_begin(self) -> None:
+        self._part = _Part()
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self._part
+        part.size += end - start
+        if part.file is None:
+            if part.size > self.limits.max_part_size:
+                raise MultipartLimitError(
+                    f'Part "{part.name}" exceeds the maximum size of '
+                    f"{self.limits.max_part_size} bytes."
+                )
+            part.data += data[start:end]
+        else:
+            max_file_size = self.limits.max_file_size
+            if max_file_size is not None and part.size > max_file_size:
+                raise MultipartLimitError(
+                    f'File "{part.name}" exceeds the maximum size of '
+                    f"{max_file_size} bytes."
+                )
+            self._file_writes.append((part, data[start:end]))
+
+    def on_part_end(self) -> None:
+        self._finished_parts.append(self._part)
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        name = self._header_name.lower()
+        if name == b"content-disposition":
+            self._part.disposition = self._header_value
+        self._part.headers.append((name, self._header_value))
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        part = self._part
+        _, options = parse_options_header(part.disposition)
+        try:
+            part.name = _safe_decode(options[b"name"], self._charset)
+        except KeyError:
+            raise MultipartError(
+                'The Content-Disposition header field "name" must be provided.'
+            ) from None
+        if b"filename" in options:
+            if len(self._files) >= self.limits.max_files:
+                raise MultipartLimitError(
+                    f"Too many files. Maximum number of files is {self.limits.max_files}."
+                )
+            tempfile = SpooledTemporaryFile(max_size=self.limits.spool_max_size)
+            part.file = UploadFile(
+                file=tempfile,  # type: ignore[arg-type]
+                filename=_safe_decode(options[b"filename"], self._charset),
+                headers=Headers(raw=part.headers),
+            )
+            self._files.append(part.file)
+        else:
+            self._fields += 1
+            if self._fields > self.limits.max_fields:
+                raise MultipartLimitError(
+                    f"Too many fields. Maximum number of fields is {self.limits.max_fields}."
+                )
+
+    async def _flush(self) -> None:
+        for part, data in self._file_writes:
+            await part.file.write(data)  # type: ignore[union-attr]
+        self._file_writes.clear()
+        for part in self._finished_parts:
+            if part.file is None:
+                value = _safe_decode(bytes(part.data), self._charset)
+                if self.on_field is not None:
+                    self.on_field(part.name, value)
+                self.items.append((part.name, value))
+            else:
+                await part.file.seek(0)
+                part.file.size = part.size
+                self.items.append((part.name, part.file))
+        self._finished_parts.clear()
+
+    async def parse(self) -> FormData:
+        _, params = parse_options_header(self.headers["Content-Type"])
+        charset = params.get(b"charset", b"utf-8")
+        self._charset = (
+            charset.decode("latin-1") if isinstance(charset, bytes) else charset
+        )
+        try:
+            boundary = params[b"boundary"]
+        except KeyError:
+            raise MultipartError("Missing boundary in multipart.") from None
+        callbacks = {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+        parser = multipart.MultipartParser(boundary, callbacks)
+        try:
+            async for chunk in self.stream:
+                parser.write(chunk)
+                await self._flush()
+            parser.finalize()
+            await self._flush()
+        except BaseException:
+            for upload in self._files:
+                await upload.close()
+            raise
+        return FormData(self.items)
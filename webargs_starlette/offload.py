@@ -0,0 +1,120 @@
+"""Offloading of schema loading to a thread or process pool."""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import pickle
+import threading
+import typing
+import weakref
+
+from marshmallow import Schema
+
+THREAD = "thread"
+PROCESS = "process"
+
+
+def load_with_schema(
+    schema: Schema, data: typing.Any, load_kwargs: typing.Mapping[str, typing.Any]
+) -> typing.Any:
+    """Load ``data`` with ``schema``. Runs in the worker processes."""
+    return schema.load(data, **load_kwargs)
+
+
+class OffloadPolicy:
+    """Decides when the loading and validation of arguments runs in a pool
+    rather than on the event loop.
+
+    Loading is offloaded when the request payload is at least ``min_size``
+    bytes, or when the schema sets ``offload = True`` in its ``Meta`` options.
+    Smaller payloads are loaded inline.
+
+    ::
+
+        parser = StarletteParser(offload=OffloadPolicy(min_size=64 * 1024))
+
+    :param str mode: ``"thread"`` or ``"process"``. Thread pools can run any
+        schema, but only help if validation releases the GIL or to keep the
+        event loop responsive. Process pools require the schema and loaded data
+        to be picklable, so schemas must be importable classes; schemas that
+        cannot be pickled are loaded inline.
+    :param int min_size: Payload size, in bytes, from which loading is
+        offloaded. ``None`` means that only schemas flagged with
+        ``Meta.offload`` are offloaded.
+    :param int max_workers: Size of the pool. Defaults to the
+        `concurrent.futures` default.
+    """
+
+    def __init__(
+        self,
+        mode: str = THREAD,
+        *,
+        min_size: typing.Optional[int] = None,
+        max_workers: typing.Optional[int] = None,
+    ) -> None:
+        if mode not in (THREAD, PROCESS):
+            raise ValueError(f"Invalid offload mode: {mode!r}")
+        self.mode = mode
+        self.min_size = min_size
+        self.max_workers = max_workers
+        self._executor: typing.Optional[concurrent.futures.Executor] = None
+        self._lock = threading.Lock()
+        self._picklable: "weakref.WeakKeyDictionary[Schema, bool]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @property
+    def executor(self) -> concurrent.futures.Executor:
+        """The pool, created on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    executor_cls = (
+                        concurrent.futures.ThreadPoolExecutor
+                        if self.mode == THREAD
+                        else concurrent.futures.ProcessPoolExecutor
+                    )
+                    self._executor = executor_cls(max_workers=self.max_workers)
+        return self._executor
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the pool. A new pool is created if the policy is used again."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def should_offload(
+        self, schema: Schema, payload_size: typing.Optional[int]
+    ) -> bool:
+        if getattr(schema.Meta, "offload", False):
+            return self._can_run(schema)
+        if self.min_size is None or payload_size is None:
+            return False
+        return payload_size >= self.min_size and self._can_run(schema)
+
+    def _can_run(self, schema: Schema) -> bool:
+        if self.mode == THREAD:
+            return True
+        picklable = self._picklable.get(schema)
+        if picklable is None:
+            try:
+                pickle.dumps(schema)
+            except Exception:
+                picklable = False
+            else:
+                picklable = True
+            self._picklable[schema] = picklable
+        return picklable
+
+    async def run(self, func: typing.Callable, *args) -> typing.Any:
+        """Run ``func(*args)`` in the pool. In thread mode, the function runs in a
+        copy of the current context.
+        """
+        loop = asyncio.get_running_loop()
+        if self.mode == THREAD:
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, func, *args)
+        else:
+            call = functools.partial(func, *args)
+        return await loop.run_in_executor(self.executor, call)
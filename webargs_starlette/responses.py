@@ -0,0 +1,48 @@
+"""Serialization of handler results with an output schema."""
+import typing
+
+from marshmallow import Schema
+from starlette.responses import Response
+
+from .compiler import compile_dumper
+from .errors import encode_messages
+
+
+class ResponseSerializer:
+    """Turns the results of a handler into JSON responses, by dumping them with
+    ``schema`` and encoding the dumped data with ``json_dumps``.
+
+    The dumper is compiled once, when the serializer is created. Results that
+    already are a `Response` are returned unchanged.
+
+    :param Schema schema: The output schema.
+    :param bool many: Whether results are lists of objects.
+    :param callable json_dumps: Function encoding the dumped data to `bytes`,
+        e.g. ``orjson.dumps``.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        schema: Schema,
+        many: bool = False,
+        json_dumps: typing.Callable[[typing.Any], bytes] = encode_messages,
+    ) -> None:
+        self.schema = schema
+        self.many = many
+        self.json_dumps = json_dumps
+        self._dump = compile_dumper(schema) or self._marshmallow_dump
+
+    def _marshmallow_dump(self, obj: typing.Any, many: bool) -> typing.Any:
+        return self.schema.dump(obj, many=many)
+
+    def dump(self, result: typing.Any) -> typing.Any:
+        """Return the data dumped from ``result``."""
+        return self._dump(result, self.many)
+
+    def render(self, result: typing.Any) -> Response:
+        """Return the response for ``result``."""
+        if isinstance(result, Response):
+            return result
+        return Response(self.json_dumps(self.dump(result)), media_type=self.media_type)
@@ -1,15 +1,90 @@
 import typing
 import functools
+import inspect
 import json
+import logging
+import time
+import threading
+import contextvars
+import copy
+import weakref
+from collections import abc
 
-from marshmallow import Schema, ValidationError
-from starlette.requests import Request
+from marshmallow import EXCLUDE, Schema, ValidationError
+from marshmallow.fields import Field
+from starlette.requests import HTTPConnection, Request
+from starlette.websockets import WebSocket
 from starlette.exceptions import HTTPException
 from starlette.endpoints import HTTPEndpoint
 from webargs.asyncparser import AsyncParser
 from webargs import core
 from webargs.multidictproxy import MultiDictProxy
-from .annotations import TypeMapping, DEFAULT_TYPE_MAPPING, annotations2schema
+from .annotations import (
+    TypeMapping,
+    DEFAULT_TYPE_MAPPING,
+    annotations2schema,
+    return_annotation2schema,
+)
+from .cache import LRUCache, ResultCache, copy_result
+from .compiler import compile_loader, compile_schema
+from .datastructures import HeaderIndex, LazyCookies, QueryParams
+from .errors import (
+    INVALID_JSON_BODY,
+    ErrorBodyCache,
+    encode_messages,
+    truncate_messages,
+)
+from .failfast import fail_fast_schema
+from .metrics import ParseMetrics, count_messages, describe_shape, get_route_name
+from .streaming import (
+    NDJSON_MIMETYPES,
+    RecordTooLargeError,
+    iter_json_array,
+    iter_ndjson,
+)
+from .offload import PROCESS, OffloadPolicy, load_with_schema
+from .responses import ResponseSerializer
+from .websockets import MessageParser, WebargsWebSocketException, close_reason
+from . import binary
+from .validation import (
+    SCHEMA_KEY,
+    AsyncValidation,
+    Collector,
+    is_async_callable,
+    run_validations,
+    split_async_validations,
+)
+from .multipart import (
+    MultipartLimitError,
+    MultipartLimits,
+    StreamingMultipartParser,
+)
+
+ArgMap = typing.Union[
+    Schema,
+    typing.Type[Schema],
+    typing.Mapping[str, Field],
+    typing.Callable[[Request], Schema],
+]
+ValidateArg = typing.Union[None, typing.Callable, typing.Iterable[typing.Callable]]
+
+# Options passed to a single ``parse`` call (or set on a single decorator), read
+# by the location loaders
+_parse_options: "contextvars.ContextVar[typing.Mapping[str, typing.Any]]" = (
+    contextvars.ContextVar("webargs_starlette_parse_options", default={})
+)
+# Metrics of the ``parse`` call in progress, when metrics are enabled
+_current_metrics: "contextvars.ContextVar[typing.Optional[ParseMetrics]]" = (
+    contextvars.ContextVar("webargs_starlette_metrics", default=None)
+)
+# Validation errors collected while parsing the arguments of stacked decorators
+_deferred_errors: "contextvars.ContextVar[typing.Optional[list]]" = (
+    contextvars.ContextVar("webargs_starlette_deferred_errors", default=None)
+)
+
+logger = logging.getLogger("webargs_starlette")
+
+MetricsCallback = typing.Callable[[ParseMetrics, Request], None]
 
 HTTP_METHOD_NAMES: typing.List[str] = [
     "get",
@@ -27,7 +102,8 @@ class WebargsHTTPException(HTTPException):
     """
     Same as `starlette.exceptions.HTTPException` but stores validation
     messages, the underlying exception, the `marshmallow.Schema`
-    used to parse the request, headers.
+    used to parse the request, headers and, for lightweight errors,
+    the pre-encoded JSON body of the messages.
     """
 
     def __init__(
@@ -38,12 +114,131 @@ class WebargsHTTPException(HTTPException):
         exception: typing.Optional[Exception] = None,
         headers: typing.Optional[dict] = None,
         schema: typing.Optional[Schema] = None,
+        body: typing.Optional[bytes] = None,
     ) -> None:
         super().__init__(status_code, detail)
         self.messages = messages
         self.exception = exception
         self.headers = headers
         self.schema = schema
+        self.body = body
+
+
+class _DeferredValidationError(Exception):
+    """Aborts one of several parses whose errors are reported together."""
+
+
+PartialArg = typing.Union[bool, typing.Collection[str], None]
+
+
+class _ArgsSpec(typing.NamedTuple):
+    """Arguments of a `StarletteParser.use_args` decorator."""
+
+    argmap: typing.Any
+    location: str
+    unknown: typing.Optional[str]
+    as_kwargs: bool
+    arg_name: typing.Optional[str]
+    validate: typing.Any
+    error_status_code: typing.Optional[int]
+    error_headers: typing.Optional[typing.Mapping[str, str]]
+    max_body_size: typing.Optional[int]
+    offload: typing.Optional[OffloadPolicy]
+    cache: typing.Optional[ResultCache]
+    fail_fast: typing.Optional[bool]
+    partial: PartialArg
+
+
+class _ArgsStack(typing.NamedTuple):
+    """Parsing plan of a handler decorated with (possibly stacked) ``use_args``
+    decorators, stored on the wrapper.
+    """
+
+    wrapper: typing.Callable
+    parser: "StarletteParser"
+    handler: typing.Callable
+    specs: typing.Tuple[_ArgsSpec, ...]
+
+
+class _AnnotationsPlan:
+    """Schema and response serializer of a handler decorated with
+    ``use_annotations``, stored on the wrapper. They are built by `build`, at
+    decoration time or, for lazy decorators, on first use.
+    """
+
+    def __init__(
+        self,
+        parser: "StarletteParser",
+        func: typing.Callable,
+        type_mapping: TypeMapping,
+        compiled: bool,
+        response_schema: typing.Any,
+    ) -> None:
+        self.parser = parser
+        self.func = func
+        self.type_mapping = type_mapping
+        self.compiled = compiled
+        self.response_schema = response_schema
+        self.schema: typing.Optional[Schema] = None
+        self.serializer: typing.Optional[ResponseSerializer] = None
+        #: Time spent building the plan, in seconds, once it is built
+        self.build_time: typing.Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_built(self) -> bool:
+        return self.build_time is not None
+
+    def build(self) -> "_AnnotationsPlan":
+        if self.build_time is not None:
+            return self
+        with self._lock:
+            if self.build_time is None:
+                start = time.perf_counter()
+                schema_cls = annotations2schema(
+                    self.func, type_mapping=self.type_mapping
+                )
+                if self.compiled:
+                    schema_cls = compile_schema(schema_cls)
+                self.schema = self.parser.get_schema(schema_cls)
+                self.serializer = self.parser._get_response_serializer(
+                    self.func, self.response_schema
+                )
+                self.build_time = time.perf_counter() - start
+        return self
+
+
+def _is_cacheable_argmap(argmap: typing.Any) -> bool:
+    return isinstance(argmap, abc.Mapping) or (
+        isinstance(argmap, type) and issubclass(argmap, Schema)
+    )
+
+
+class LocationPlan(typing.NamedTuple):
+    """What the parser needs to do to load a location for a given schema."""
+
+    #: The location's loader function
+    loader: typing.Callable
+    #: Whether the loader reads the request body
+    reads_body: bool
+    #: Keys of the data the schema loads
+    data_keys: typing.FrozenSet[str]
+
+
+FORM_MIMETYPES = frozenset(("application/x-www-form-urlencoded", "multipart/form-data"))
+
+
+def may_have_body(req: Request) -> bool:
+    """Return whether the request may carry a body. ``GET`` and ``HEAD`` requests
+    only have one if they declare it with ``Content-Length`` or
+    ``Transfer-Encoding``. WebSocket handshakes never have one.
+    """
+    if req.scope["type"] != "http":
+        return False
+    if req.method not in ("GET", "HEAD"):
+        return True
+    headers = req.headers
+    return headers.get("content-length", "0") != "0" or "transfer-encoding" in headers
 
 
 def is_json_request(req: Request) -> bool:
@@ -52,78 +247,1329 @@ def is_json_request(req: Request) -> bool:
 
 
 class StarletteParser(AsyncParser):
-    """Starlette request argument parser."""
+    """Starlette request argument parser.
+
+    :param int schema_cache_size: Maximum number of schemas built from dict
+        argmaps and `Schema` classes to keep around. Pass ``None`` for an
+        unbounded cache or ``0`` to disable caching.
+    :param callable json_loads: Function used to decode JSON request bodies.
+        Receives the raw body as `bytes`, e.g. ``orjson.loads``. Defaults to
+        `json.loads`.
+    :param callable json_dumps: Function used to encode responses serialized
+        by ``use_annotations``. Returns `bytes`, e.g. ``orjson.dumps``. Defaults
+        to the encoding of `starlette.responses.JSONResponse`.
+    :param callable msgpack_loads: Function used to decode msgpack request
+        bodies. Receives the raw body as `bytes`. Defaults to
+        `msgpack.unpackb`.
+    :param callable cbor_loads: Function used to decode CBOR request bodies.
+        Receives the raw body as `bytes`. Defaults to `cbor2.loads`.
+    :param int max_body_size: Maximum size of a request body, in bytes.
+        Larger bodies are rejected with a 413 error before they are fully read.
+        May be overridden per ``parse`` call or decorator.
+    :param MultipartLimits multipart_limits: Spooling thresholds and size limits
+        for the ``multipart`` location.
+    :param float slow_parse_threshold: Duration, in seconds, above which a
+        ``parse`` call is logged as slow, with its route, payload shape and
+        the time spent in each phase.
+    :param OffloadPolicy offload: When to load and validate arguments in a
+        thread or process pool instead of on the event loop. May be overridden
+        per ``parse`` call or decorator.
+    :param bool lightweight_errors: Raise errors without the underlying
+        exception and schema, and with their JSON body pre-encoded. Bodies of
+        recurring error shapes are encoded once and reused. See
+        `webargs_exception_handler`.
+    :param bool lazy_annotations: Build the schemas of ``use_annotations``
+        handlers on first use instead of at decoration time. See `warmup`.
+        May be overridden per decorator.
+    :param bool fail_fast: Stop loading at the first validation error, including
+        inside `List`, `Tuple`, `Dict` and `Nested` fields, and report only
+        that error. May be overridden per ``parse`` call or decorator.
+    :param int max_error_messages: Maximum number of validation messages
+        reported in an error. Further messages are dropped. Pass ``None`` to
+        report all of them.
+    :param int max_stream_record_size: Maximum size, in bytes, of a record of
+        the ``json_stream`` location (counted in characters for JSON arrays).
+        Larger records are rejected with a 413 error once that much of them
+        has been received. Pass ``None`` to allow records of any size.
+    :param int async_validation_concurrency: Maximum number of coroutine
+        validators of a ``parse`` call awaited at once.
+    :param float async_validation_timeout: Time, in seconds, the coroutine
+        validators of a ``parse`` call may take. Those still running after it
+        fail with "Validation timed out.".
+    :param str query_list_delimiter: When set, values of `List` and `Tuple`
+        fields of the ``query`` location are also split on this delimiter, so
+        ``?ids=1,2&ids=3`` loads as ``[1, 2, 3]``.
+    :param int max_query_params: Maximum number of query parameters scanned.
+        Parameters past the limit are ignored.
+    :param int max_query_string_length: Maximum length of a query string, in
+        bytes. Longer query strings are rejected with a 414 error.
+
+    Receives the same keyword arguments as `webargs.core.Parser`.
+    """
 
     TYPE_MAPPING: TypeMapping = DEFAULT_TYPE_MAPPING
+    #: Default maximum size of the schema cache
+    DEFAULT_SCHEMA_CACHE_SIZE: typing.Optional[int] = 256
+    #: Default maximum number of messages reported in a validation error
+    DEFAULT_MAX_ERROR_MESSAGES: typing.Optional[int] = 100
+    #: Default maximum size of a ``json_stream`` record, in bytes
+    DEFAULT_MAX_STREAM_RECORD_SIZE: typing.Optional[int] = 1024 * 1024
+    #: Maximum number of encoded error bodies kept with ``lightweight_errors``
+    ERROR_BODY_CACHE_SIZE: typing.Optional[int] = 256
+    #: Locations whose loaders read the request body
+    BODY_LOCATIONS: typing.FrozenSet[str] = frozenset(
+        (
+            "json",
+            "form",
+            "json_or_form",
+            "multipart",
+            "files",
+            "msgpack",
+            "cbor",
+            "body",
+        )
+    )
+    #: Locations whose parse results may be cached with a `ResultCache`
+    CACHEABLE_LOCATIONS: typing.FrozenSet[str] = frozenset(
+        ("query", "querystring", "path_params", "headers", "cookies")
+    )
+    #: Close code of WebSocket connections with invalid handshake arguments
+    WEBSOCKET_ERROR_CLOSE_CODE: int = 1008
+    #: Exceptions raised by ``json_loads`` that signal an invalid JSON body
+    JSON_DECODE_ERRORS: typing.Tuple[typing.Type[Exception], ...] = (ValueError,)
+    #: Exceptions raised by ``msgpack_loads`` and ``cbor_loads`` that signal an
+    #: invalid body
+    BINARY_DECODE_ERRORS: typing.Tuple[typing.Type[Exception], ...] = (ValueError,)
 
     __location_map__: typing.Dict[str, typing.Union[str, typing.Callable]] = dict(
-        path_params="load_path_params", **core.Parser.__location_map__
+        path_params="load_path_params",
+        multipart="load_multipart",
+        msgpack="load_msgpack",
+        cbor="load_cbor",
+        body="load_body",
+        **core.Parser.__location_map__,
     )
 
+    def __init__(
+        self,
+        location: typing.Optional[str] = None,
+        *,
+        schema_cache_size: typing.Optional[int] = DEFAULT_SCHEMA_CACHE_SIZE,
+        json_loads: typing.Optional[typing.Callable[[bytes], typing.Any]] = None,
+        json_dumps: typing.Optional[typing.Callable[[typing.Any], bytes]] = None,
+        msgpack_loads: typing.Optional[typing.Callable[[bytes], typing.Any]] = None,
+        cbor_loads: typing.Optional[typing.Callable[[bytes], typing.Any]] = None,
+        max_body_size: typing.Optional[int] = None,
+        multipart_limits: typing.Optional[MultipartLimits] = None,
+        slow_parse_threshold: typing.Optional[float] = None,
+        lightweight_errors: bool = False,
+        offload: typing.Optional[OffloadPolicy] = None,
+        query_list_delimiter: typing.Optional[str] = None,
+        max_query_params: typing.Optional[int] = None,
+        max_query_string_length: typing.Optional[int] = None,
+        lazy_annotations: bool = False,
+        async_validation_concurrency: typing.Optional[int] = None,
+        async_validation_timeout: typing.Optional[float] = None,
+        fail_fast: bool = False,
+        max_error_messages: typing.Optional[int] = DEFAULT_MAX_ERROR_MESSAGES,
+        max_stream_record_size: typing.Optional[int] = DEFAULT_MAX_STREAM_RECORD_SIZE,
+        **kwargs,
+    ) -> None:
+        super().__init__(location, **kwargs)
+        self.schema_cache = LRUCache(maxsize=schema_cache_size)
+        self._location_plans = LRUCache(maxsize=schema_cache_size)
+        # Schemas built by argmap factories, and the copies derived from them.
+        # They are usually new on each request, so what is computed for them is
+        # not cached.
+        self._factory_schemas: "weakref.WeakSet[Schema]" = weakref.WeakSet()
+        self.json_loads = json_loads or json.loads
+        self.json_dumps = json_dumps or encode_messages
+        self.msgpack_loads = msgpack_loads or binary.msgpack_loads
+        self.cbor_loads = cbor_loads or binary.cbor_loads
+        self.max_body_size = max_body_size
+        self.multipart_limits = multipart_limits or MultipartLimits()
+        self.slow_parse_threshold = slow_parse_threshold
+        self.metrics_callbacks: typing.List[MetricsCallback] = []
+        self.lightweight_errors = lightweight_errors
+        self.offload = offload
+        self.error_bodies = ErrorBodyCache(maxsize=self.ERROR_BODY_CACHE_SIZE)
+        self.query_list_delimiter = query_list_delimiter
+        self.max_query_params = max_query_params
+        self.max_query_string_length = max_query_string_length
+        self.lazy_annotations = lazy_annotations
+        self.async_validation_concurrency = async_validation_concurrency
+        self.async_validation_timeout = async_validation_timeout
+        self.fail_fast = fail_fast
+        self.max_error_messages = max_error_messages
+        self.max_stream_record_size = max_stream_record_size
+        self._fail_fast_schemas = LRUCache(maxsize=schema_cache_size)
+        self._partial_schemas = LRUCache(maxsize=schema_cache_size)
+
+    def _get_option(self, name: str) -> typing.Any:
+        """Return the value of a per-call option, falling back to the parser's
+        setting.
+        """
+        value = _parse_options.get().get(name)
+        return value if value is not None else getattr(self, name)
+
+    def get_schema(
+        self, argmap: typing.Union[typing.Mapping, typing.Type[Schema], Schema]
+    ) -> Schema:
+        """Return a ready-to-load `Schema` instance for ``argmap``.
+
+        Schemas built from dicts and `Schema` classes are cached by the
+        identity of ``argmap``, so the same argmap always yields the same
+        instance. Argmaps should therefore not be mutated after first use.
+        """
+        if isinstance(argmap, Schema):
+            return argmap
+        key = (id(argmap), self.schema_class)
+        entry = self.schema_cache.get(key)
+        # The cache entry keeps a reference to the argmap, so its id cannot be
+        # reused while the entry exists
+        if entry is not None and entry[0] is argmap:
+            return entry[1]
+        if isinstance(argmap, type) and issubclass(argmap, Schema):
+            schema = argmap()
+        else:
+            argmap_dict = (
+                argmap
+                if isinstance(argmap, dict)
+                else dict(typing.cast(typing.Mapping, argmap))
+            )
+            schema = self.schema_class.from_dict(argmap_dict)()
+        self.schema_cache.set(key, (argmap, schema))
+        return schema
+
+    def get_fail_fast_schema(self, schema: Schema) -> Schema:
+        """Return the fail-fast copy of ``schema``, which stops loading at the
+        first validation error. Copies are cached by the identity of ``schema``.
+        """
+        if schema in self._factory_schemas:
+            return self._derive_factory_schema(fail_fast_schema(schema))
+        entry = self._fail_fast_schemas.get(id(schema))
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+        fail_fast = fail_fast_schema(schema)
+        self._fail_fast_schemas.set(id(schema), (schema, fail_fast))
+        return fail_fast
+
+    def get_partial_schema(
+        self, schema: Schema, partial: typing.Union[bool, typing.Collection[str]]
+    ) -> Schema:
+        """Return a copy of ``schema`` that loads data as
+        ``schema.load(data, partial=partial)`` does. Copies are cached by the
+        identity of ``schema`` and the value of ``partial``, and compiled
+        schemas are compiled for ``partial``.
+        """
+        if partial == schema.partial or not (partial or schema.partial):
+            return schema
+        partial_key = partial if isinstance(partial, bool) else frozenset(partial)
+        key = (id(schema), partial_key)
+        from_factory = schema in self._factory_schemas
+        entry = None if from_factory else self._partial_schemas.get(key)
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+        partial_schema = copy.copy(schema)
+        partial_schema.partial = partial
+        if getattr(schema, "_compiled_loader", None) is not None:
+            partial_schema._compiled_loader = compile_loader(  # type: ignore
+                partial_schema, partial=partial
+            )
+        if from_factory:
+            return self._derive_factory_schema(partial_schema)
+        self._partial_schemas.set(key, (schema, partial_schema))
+        return partial_schema
+
+    def _derive_factory_schema(self, schema: Schema) -> Schema:
+        # A copy of a schema built by an argmap factory is not cached either
+        self._factory_schemas.add(schema)
+        return schema
+
+    def _get_schema(self, argmap: ArgMap, req: Request) -> Schema:
+        if _is_cacheable_argmap(argmap):
+            return self.get_schema(argmap)
+        schema = super()._get_schema(argmap, req)
+        if schema is not argmap:
+            self._factory_schemas.add(schema)
+        return schema
+
+    def _get_location_plan(self, schema: Schema, location: str) -> LocationPlan:
+        """Return the `LocationPlan` for loading ``location`` with ``schema``.
+
+        Plans are computed once per schema and location, except for schemas
+        built by argmap factories, which are usually new on each request.
+        """
+        if schema in self._factory_schemas:
+            return self._make_location_plan(schema, location)
+        key = (id(schema), location)
+        entry = self._location_plans.get(key)
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+        plan = self._make_location_plan(schema, location)
+        self._location_plans.set(key, (schema, plan))
+        return plan
+
+    def _make_location_plan(self, schema: Schema, location: str) -> LocationPlan:
+        return LocationPlan(
+            loader=self._get_loader(location),
+            reads_body=location in self.BODY_LOCATIONS,
+            data_keys=frozenset(
+                field.data_key if field.data_key is not None else name
+                for name, field in schema.load_fields.items()
+            ),
+        )
+
+    def _split_async_validations(
+        self, schema: Schema
+    ) -> typing.Tuple[Schema, typing.Optional[Collector]]:
+        """Return the schema loading the data of ``schema`` without its
+        coroutine validators, and the collector of their validations (see
+        `split_async_validations`). Computed once per schema, except for schemas
+        built by argmap factories.
+        """
+        if schema in self._factory_schemas:
+            split_schema, collect = split_async_validations(schema)
+            return self._derive_factory_schema(split_schema), collect
+        key = (id(schema), None)
+        entry = self._location_plans.get(key)
+        if entry is not None and entry[0] is schema:
+            return entry[1]
+        split = split_async_validations(schema)
+        self._location_plans.set(key, (schema, split))
+        return split
+
+    async def _async_load_location_data(
+        self, schema: Schema, req: Request, location: str
+    ) -> typing.Any:
+        plan = self._get_location_plan(schema, location)
+        if plan.reads_body and not may_have_body(req):
+            return core.missing
+        metrics = _current_metrics.get()
+        start = time.perf_counter() if metrics is not None else 0.0
+        try:
+            data = plan.loader(req, schema)
+            if inspect.isawaitable(data):
+                data = await data
+        finally:
+            if metrics is not None:
+                metrics.add_phase(
+                    getattr(plan.loader, "__name__", location),
+                    time.perf_counter() - start,
+                )
+        return data
+
+    def _process_location_data(
+        self,
+        location_data: typing.Any,
+        schema: Schema,
+        req: Request,
+        location: str,
+        unknown: typing.Optional[str],
+        validators: typing.List[typing.Callable],
+    ) -> typing.Any:
+        metrics = _current_metrics.get()
+        if metrics is None:
+            return super()._process_location_data(
+                location_data, schema, req, location, unknown, validators
+            )
+        metrics.data = location_data
+        start = time.perf_counter()
+        try:
+            return super()._process_location_data(
+                location_data, schema, req, location, unknown, validators
+            )
+        finally:
+            metrics.add_phase("schema", time.perf_counter() - start)
+
+    def _get_unknown(
+        self, unknown: typing.Optional[str], location: str
+    ) -> typing.Optional[str]:
+        # precedence order: explicit, instance setting, default per location
+        if unknown != core._UNKNOWN_DEFAULT_PARAM:
+            return unknown
+        if self.unknown != core._UNKNOWN_DEFAULT_PARAM:
+            return self.unknown
+        return self.DEFAULT_UNKNOWN_BY_LOCATION.get(location)
+
+    async def _async_process_location_data(
+        self,
+        location_data: typing.Any,
+        schema: Schema,
+        req: Request,
+        location: str,
+        unknown: typing.Optional[str],
+        validators: typing.List[typing.Callable],
+    ) -> typing.Any:
+        """Coroutine variant of ``_process_location_data``, which runs it in the
+        pool of the offload policy when the policy requires it.
+        """
+        policy: typing.Optional[OffloadPolicy] = self._get_option("offload")
+        if policy is None or not policy.should_offload(
+            schema, self._get_payload_size(req, location)
+        ):
+            return self._process_location_data(
+                location_data, schema, req, location, unknown, validators
+            )
+        if policy.mode != PROCESS:
+            return await policy.run(
+                self._process_location_data,
+                location_data,
+                schema,
+                req,
+                location,
+                unknown,
+                validators,
+            )
+        # Only the schema load runs in the worker process: the request, the
+        # hooks and the validators stay here
+        if location_data is core.missing:
+            location_data = {}
+        unknown = self._get_unknown(unknown, location)
+        load_kwargs = {"unknown": unknown} if unknown else {}
+        data = self.pre_load(location_data, schema=schema, req=req, location=location)
+        if isinstance(data, MultiDictProxy):
+            # Plain data can be sent to the worker
+            data = {key: data[key] for key in data}
+        metrics = _current_metrics.get()
+        start = time.perf_counter()
+        try:
+            data = await policy.run(load_with_schema, schema, data, load_kwargs)
+        finally:
+            if metrics is not None:
+                metrics.add_phase("schema", time.perf_counter() - start)
+        self._validate_arguments(data, validators)
+        return data
+
+    async def _async_parse(
+        self,
+        argmap: ArgMap,
+        req: typing.Optional[Request] = None,
+        *,
+        location: typing.Optional[str] = None,
+        unknown: typing.Optional[str] = core._UNKNOWN_DEFAULT_PARAM,
+        validate: ValidateArg = None,
+        error_status_code: typing.Optional[int] = None,
+        error_headers: typing.Optional[typing.Mapping[str, str]] = None,
+    ) -> typing.Any:
+        # Same as `webargs.asyncparser.AsyncParser.async_parse`, with the location
+        # data processed by `_async_process_location_data`, and coroutine
+        # validators awaited once it has been loaded
+        _, req, location, validators, schema = self._prepare_for_parse(
+            argmap, req, location, unknown, validate
+        )
+        # The parser's location is used when none is passed
+        assert location is not None
+        schema, collect = self._split_async_validations(schema)
+        partial = _parse_options.get().get("partial")
+        if partial is not None:
+            schema = self.get_partial_schema(schema, partial)
+        if self._get_option("fail_fast"):
+            schema = self.get_fail_fast_schema(schema)
+        async_validators = [v for v in validators if is_async_callable(v)]
+        if async_validators:
+            validators = [v for v in validators if not is_async_callable(v)]
+        cache: typing.Optional[ResultCache] = _parse_options.get().get("cache")
+        cache_key = None
+        if cache is not None and req.scope.get("method") in ("GET", "HEAD"):
+            cache_key = self._get_result_cache_key(schema, req, location, unknown)
+        if cache_key is not None:
+            result = cache.get(cache_key, core.missing)  # type: ignore[union-attr]
+            if result is not core.missing:
+                return result
+        try:
+            location_data = await self._async_load_location_data(
+                schema=schema, req=req, location=location
+            )
+            result = await self._async_process_location_data(
+                location_data, schema, req, location, unknown, validators
+            )
+            await self._await_validators(result, collect, async_validators)
+        except ValidationError as error:
+            await self._async_on_validation_error(
+                error,
+                req,
+                schema,
+                location,
+                error_status_code=error_status_code,
+                error_headers=error_headers,
+            )
+            raise ValueError(
+                "_on_validation_error hook did not raise an exception"
+            ) from error
+        if cache_key is None:
+            return result
+        cache.set(cache_key, result)  # type: ignore[union-attr]
+        # The cached result must not be mutated by the handler
+        return copy_result(result)
+
+    async def _await_validators(
+        self,
+        data: typing.Any,
+        collect: typing.Optional[Collector],
+        validators: typing.List[typing.Callable],
+    ) -> None:
+        """Await the coroutine validators found by ``collect`` and the coroutine
+        ``validate`` functions concurrently, raising a single `ValidationError`
+        with the messages of all that failed.
+        """
+        if collect is None and not validators:
+            return
+        validations: typing.List[AsyncValidation] = []
+        if collect is not None:
+            collect(data, (), validations)
+        validations.extend(
+            AsyncValidation(
+                (SCHEMA_KEY,), validator, data, self.DEFAULT_VALIDATION_MESSAGE
+            )
+            for validator in validators
+        )
+        errors = await run_validations(
+            validations,
+            concurrency=self.async_validation_concurrency,
+            timeout=self.async_validation_timeout,
+        )
+        if not errors:
+            return
+        schema_errors = errors.pop(SCHEMA_KEY, None)
+        if not errors:
+            raise ValidationError(schema_errors)
+        if schema_errors:
+            errors[SCHEMA_KEY] = schema_errors
+        raise ValidationError(errors)
+
+    def _get_result_cache_key(
+        self,
+        schema: Schema,
+        req: Request,
+        location: str,
+        unknown: typing.Optional[str],
+    ) -> typing.Optional[typing.Hashable]:
+        """Return the key of the parse result in a `ResultCache`: the route, the
+        schema and the values of the location's arguments. Return ``None`` if
+        the values cannot be hashed, or if ``schema`` was built by an argmap
+        factory, as results would never be found again.
+        """
+        if schema in self._factory_schemas:
+            return None
+        plan = self._get_location_plan(schema, location)
+        data = plan.loader(req, schema)
+        if data is core.missing:
+            data = {}
+        # Unknown arguments change the result, or the error, unless excluded
+        unknown = self._get_unknown(unknown, location) or schema.unknown
+        keys = plan.data_keys if unknown == EXCLUDE else data
+        getlist = getattr(data, "getlist", None)
+        values = []
+        for key in keys:
+            if getlist is not None:
+                values.append((key, tuple(getlist(key))))
+            elif key in data:
+                values.append((key, data[key]))
+        cache_key = (get_route_name(req.scope), schema, location, tuple(values))
+        try:
+            hash(cache_key)
+        except TypeError:
+            return None
+        return cache_key
+
+    async def _async_on_validation_error(
+        self, error: ValidationError, *args, **kwargs
+    ) -> typing.NoReturn:
+        metrics = _current_metrics.get()
+        if metrics is not None:
+            metrics.error_count = count_messages(error.messages)
+        deferred = _deferred_errors.get()
+        if deferred is not None:
+            deferred.append((error, args, kwargs))
+            raise _DeferredValidationError()
+        if metrics is None:
+            await super()._async_on_validation_error(error, *args, **kwargs)
+        else:
+            start = time.perf_counter()
+            try:
+                await super()._async_on_validation_error(error, *args, **kwargs)
+            finally:
+                metrics.add_phase("handle_error", time.perf_counter() - start)
+        raise ValueError("_on_validation_error hook did not raise an exception")
+
+    def metrics_callback(self, func: MetricsCallback) -> MetricsCallback:
+        """Decorator that registers a function called with the `ParseMetrics` of
+        each ``parse`` call and the request, once the call is over.
+
+        Example: ::
+
+            @parser.metrics_callback
+            def report(metrics, request):
+                statsd.timing(f"parse.{metrics.route}", metrics.duration)
+        """
+        self.metrics_callbacks.append(func)
+        return func
+
+    def _get_payload_size(self, req: Request, location: str) -> typing.Optional[int]:
+        """Return the size of the request payload, in bytes, if known."""
+        if hasattr(req, "_body"):
+            return len(req._body)
+        if location in ("query", "querystring"):
+            return len(req.scope.get("query_string", b""))
+        content_length = req.headers.get("content-length", "")
+        return int(content_length) if content_length.isdigit() else None
+
+    def _emit_metrics(self, metrics: ParseMetrics, req: Request) -> None:
+        metrics.payload_size = self._get_payload_size(req, metrics.location)
+        for callback in self.metrics_callbacks:
+            callback(metrics, req)
+        threshold = self.slow_parse_threshold
+        if threshold is not None and metrics.duration >= threshold:
+            logger.warning(
+                "Slow parse on %s %s: %.1fms (location=%s, payload_size=%s, "
+                "shape=%s, phases=%s)",
+                metrics.method,
+                metrics.route,
+                metrics.duration * 1000,
+                metrics.location,
+                metrics.payload_size,
+                describe_shape(metrics.data),
+                {
+                    name: f"{seconds * 1000:.1f}ms"
+                    for name, seconds in metrics.phases.items()
+                },
+            )
+
+    async def parse(
+        self, argmap: ArgMap, req: typing.Optional[Request] = None, **kwargs
+    ) -> typing.Any:
+        """Coroutine variant of `webargs.core.Parser.parse`.
+
+        Receives the same arguments as `webargs.core.Parser.parse`, in addition to
+        ``max_body_size``, ``offload`` and ``fail_fast``, which override the
+        parser's settings for this call, ``cache``, a `ResultCache` in which to
+        cache the results of ``GET`` and ``HEAD`` requests, and ``partial``, passed
+        to the schema's ``load`` (see `get_partial_schema`).
+
+        With ``location="json_stream"``, returns an async iterator over the
+        records of a JSON array or NDJSON body, each validated as it is received.
+        ``fail_fast`` and ``partial`` apply to each record; records are never
+        offloaded, and passing ``offload`` raises a `ValueError`.
+        """
+        return await self.async_parse(argmap, req, **kwargs)
+
+    async def async_parse(
+        self,
+        argmap: ArgMap,
+        req: typing.Optional[Request] = None,
+        *,
+        max_body_size: typing.Optional[int] = None,
+        offload: typing.Optional[OffloadPolicy] = None,
+        cache: typing.Optional[ResultCache] = None,
+        fail_fast: typing.Optional[bool] = None,
+        partial: PartialArg = None,
+        **kwargs,
+    ) -> typing.Any:
+        if cache is not None:
+            self._check_cacheable_location(kwargs.get("location") or self.location)
+        if (kwargs.get("location") or self.location) == "json_stream":
+            if offload is not None:
+                self._check_offloadable_location("json_stream")
+            return self._parse_json_stream(
+                argmap,
+                req,
+                max_body_size=max_body_size,
+                fail_fast=fail_fast,
+                partial=partial,
+                **kwargs,
+            )
+        token = _parse_options.set(
+            {
+                "max_body_size": max_body_size,
+                "offload": offload,
+                "cache": cache,
+                "fail_fast": fail_fast,
+                "partial": partial,
+            }
+        )
+        if req is None or not (
+            self.metrics_callbacks or self.slow_parse_threshold is not None
+        ):
+            try:
+                return await self._async_parse(argmap, req, **kwargs)
+            finally:
+                _parse_options.reset(token)
+        metrics = ParseMetrics(
+            route=get_route_name(req.scope),
+            method=req.scope.get("method", ""),
+            location=kwargs.get("location") or self.location,
+        )
+        metrics_token = _current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            return await self._async_parse(argmap, req, **kwargs)
+        except Exception:
+            metrics.error_count = metrics.error_count or 1
+            raise
+        finally:
+            metrics.duration = time.perf_counter() - start
+            _current_metrics.reset(metrics_token)
+            _parse_options.reset(token)
+            self._emit_metrics(metrics, req)
+
+    def _check_offloadable_location(self, location: str) -> None:
+        if location == "json_stream":
+            raise ValueError(
+                "Records of the 'json_stream' location are loaded as they are "
+                "received and cannot be offloaded."
+            )
+
+    def _check_cacheable_location(self, location: str) -> None:
+        if location not in self.CACHEABLE_LOCATIONS:
+            raise ValueError(
+                f"Results of the {location!r} location cannot be cached. Cacheable "
+                f"locations: {', '.join(sorted(self.CACHEABLE_LOCATIONS))}."
+            )
+
+    def _parse_json_stream(
+        self,
+        argmap: ArgMap,
+        req: typing.Optional[Request] = None,
+        *,
+        location: typing.Optional[str] = None,
+        unknown: typing.Optional[str] = core._UNKNOWN_DEFAULT_PARAM,
+        validate: ValidateArg = None,
+        error_status_code: typing.Optional[int] = None,
+        error_headers: typing.Optional[typing.Mapping[str, str]] = None,
+        max_body_size: typing.Optional[int] = None,
+        fail_fast: typing.Optional[bool] = None,
+        partial: PartialArg = None,
+    ) -> typing.AsyncIterator[typing.Any]:
+        """Return an async iterator over the records of a JSON array or NDJSON
+        body, each loaded with the (single-record) schema as soon as it has been
+        received. ``fail_fast`` and ``partial`` apply to each record.
+        """
+        _, req, location, validators, schema = self._prepare_for_parse(
+            argmap, req, location, unknown, validate
+        )
+        # The parser's location is used when none is passed
+        assert location is not None
+        return self._iter_json_stream(
+            req,
+            schema,
+            location,
+            self._get_unknown(unknown, location),
+            validators,
+            error_status_code=error_status_code,
+            error_headers=error_headers,
+            max_body_size=(
+                max_body_size if max_body_size is not None else self.max_body_size
+            ),
+            fail_fast=self.fail_fast if fail_fast is None else fail_fast,
+            partial=partial,
+        )
+
+    async def _iter_json_stream(
+        self,
+        req: Request,
+        schema: Schema,
+        location: str,
+        unknown: typing.Optional[str],
+        validators: typing.List[typing.Callable],
+        *,
+        error_status_code: typing.Optional[int],
+        error_headers: typing.Optional[typing.Mapping[str, str]],
+        max_body_size: typing.Optional[int],
+        fail_fast: bool,
+        partial: PartialArg,
+    ) -> typing.AsyncIterator[typing.Any]:
+        content_type = req.headers.get("content-type", "")
+        chunks = self._iter_body(req, max_body_size)
+        max_record_size = self.max_stream_record_size
+        if core.is_json(content_type):
+            records = iter_json_array(chunks, max_record_size)
+        elif core.get_mimetype(content_type) in NDJSON_MIMETYPES:
+            records = iter_ndjson(chunks, self.json_loads, max_record_size)
+        else:
+            return
+        load_kwargs = {"unknown": unknown} if unknown else {}
+        schema, collect = self._split_async_validations(schema)
+        if partial is not None:
+            schema = self.get_partial_schema(schema, partial)
+        if fail_fast:
+            schema = self.get_fail_fast_schema(schema)
+        async_validators = [v for v in validators if is_async_callable(v)]
+        if async_validators:
+            validators = [v for v in validators if not is_async_callable(v)]
+        index = 0
+        while True:
+            try:
+                record = await records.__anext__()
+            except StopAsyncIteration:
+                return
+            except RecordTooLargeError as exc:
+                self._handle_record_too_large_error(exc, req, location)
+            except self.JSON_DECODE_ERRORS as exc:
+                self._handle_invalid_json_error(exc, req)
+            try:
+                record = self.pre_load(
+                    record, schema=schema, req=req, location=location
+                )
+                data = schema.load(record, many=False, **load_kwargs)
+                self._validate_arguments(data, validators)
+                await self._await_validators(data, collect, async_validators)
+            except ValidationError as error:
+                # Errors are reported under the index of the invalid record
+                await self._async_on_validation_error(
+                    ValidationError({index: error.messages}),
+                    req,
+                    schema,
+                    location,
+                    error_status_code=error_status_code,
+                    error_headers=error_headers,
+                )
+            yield data
+            index += 1
+
+    def use_args(
+        self,
+        argmap: ArgMap,
+        req: typing.Optional[Request] = None,
+        *,
+        location: typing.Optional[str] = None,
+        unknown: typing.Optional[str] = core._UNKNOWN_DEFAULT_PARAM,
+        as_kwargs: bool = False,
+        arg_name: typing.Optional[str] = None,
+        validate: ValidateArg = None,
+        error_status_code: typing.Optional[int] = None,
+        error_headers: typing.Optional[typing.Mapping[str, str]] = None,
+        max_body_size: typing.Optional[int] = None,
+        offload: typing.Optional[OffloadPolicy] = None,
+        cache: typing.Optional[ResultCache] = None,
+        fail_fast: typing.Optional[bool] = None,
+        partial: PartialArg = None,
+    ) -> typing.Callable[..., typing.Callable]:
+        """Decorator that injects parsed arguments into a view function or method.
+
+        Receives the same arguments as `webargs.core.Parser.use_args`, in addition
+        to ``max_body_size``, ``offload``, ``cache``, ``fail_fast`` and
+        ``partial``. Dict and `Schema` class argmaps are turned into a cached
+        schema instance once, at decoration time, as are their partial copies.
+        Stacked ``use_args`` and ``use_kwargs`` decorators of the same parser are
+        fused: the handler is called through a single wrapper, which parses all
+        the arguments, then reports the validation errors of every location in
+        a single error.
+        """
+        location = location or self.location
+        if cache is not None:
+            self._check_cacheable_location(location)
+        if offload is not None:
+            self._check_offloadable_location(location)
+        if _is_cacheable_argmap(argmap):
+            argmap = self.get_schema(argmap)
+        if partial and isinstance(argmap, Schema):
+            # The partial copy is used for every request
+            argmap, partial = self.get_partial_schema(argmap, partial), None
+        if arg_name is not None and as_kwargs:
+            raise ValueError("arg_name and as_kwargs are mutually exclusive")
+        if arg_name is None and not self.USE_ARGS_POSITIONAL:
+            arg_name = self.get_default_arg_name(location, argmap)
+        spec = _ArgsSpec(
+            argmap,
+            location,
+            unknown,
+            as_kwargs,
+            arg_name,
+            validate,
+            error_status_code,
+            error_headers,
+            max_body_size,
+            offload,
+            cache,
+            fail_fast,
+            partial,
+        )
+
+        def decorator(func: typing.Callable) -> typing.Callable:
+            # check at decoration time that a unique name is being used
+            if arg_name is not None and not as_kwargs:
+                if arg_name in getattr(func, "__webargs_argnames__", ()):
+                    raise ValueError(
+                        f"Attempted to pass `arg_name='{arg_name}'` via use_args() but "
+                        "that name was already used. If this came from stacked webargs "
+                        "decorators, try setting `arg_name` to distinguish usages."
+                    )
+            handler, specs = func, (spec,)
+            # Fuse with a use_args decorator of this parser applied directly
+            # below, so that the handler is called through a single wrapper
+            stack = getattr(func, "__webargs_starlette_stack__", None)
+            if (
+                req is None
+                and stack is not None
+                and stack.wrapper is func
+                and stack.parser is self
+            ):
+                handler, specs = stack.handler, (spec,) + stack.specs
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                req_obj = req or self.get_request_from_view_args(handler, args, kwargs)
+                if len(specs) == 1:
+                    parsed = [
+                        await self.async_parse(
+                            argmap,
+                            req=req_obj,
+                            location=location,
+                            unknown=unknown,
+                            validate=validate,
+                            error_status_code=error_status_code,
+                            error_headers=error_headers,
+                            max_body_size=max_body_size,
+                            offload=offload,
+                            cache=cache,
+                            fail_fast=fail_fast,
+                            partial=partial,
+                        )
+                    ]
+                else:
+                    parsed = await self._async_parse_specs(specs, req_obj)
+                for parsed_spec, parsed_args in zip(specs, parsed):
+                    args, kwargs = self._update_args_kwargs(
+                        args,
+                        kwargs,
+                        parsed_args,
+                        parsed_spec.as_kwargs,
+                        parsed_spec.arg_name,
+                    )
+                return await handler(*args, **kwargs)
+
+            wrapper.__webargs_starlette_stack__ = _ArgsStack(  # type: ignore
+                wrapper, self, handler, specs
+            )
+            core._record_arg_name(wrapper, arg_name)
+            return wrapper
+
+        return decorator
+
+    async def _async_parse_specs(
+        self,
+        specs: typing.Sequence[_ArgsSpec],
+        req: Request,
+    ) -> typing.List[typing.Any]:
+        """Parse the arguments of stacked ``use_args`` decorators, reporting the
+        validation errors of all of them in a single error. With ``fail_fast``,
+        the decorators after the first invalid one are not parsed.
+        """
+        errors: typing.List[typing.Tuple[ValidationError, tuple, dict]] = []
+        results = []
+        token = _deferred_errors.set(errors)
+        try:
+            for spec in specs:
+                try:
+                    result = await self.async_parse(
+                        spec.argmap,
+                        req=req,
+                        location=spec.location,
+                        unknown=spec.unknown,
+                        validate=spec.validate,
+                        error_status_code=spec.error_status_code,
+                        error_headers=spec.error_headers,
+                        max_body_size=spec.max_body_size,
+                        offload=spec.offload,
+                        cache=spec.cache,
+                        fail_fast=spec.fail_fast,
+                        partial=spec.partial,
+                    )
+                except _DeferredValidationError:
+                    result = None
+                    fail_fast = (
+                        self.fail_fast if spec.fail_fast is None else spec.fail_fast
+                    )
+                    if fail_fast:
+                        break
+                results.append(result)
+        finally:
+            _deferred_errors.reset(token)
+        if errors:
+            await self._async_on_validation_errors(errors)
+        return results
+
+    async def _async_on_validation_errors(
+        self, errors: typing.List[typing.Tuple[ValidationError, tuple, dict]]
+    ) -> typing.NoReturn:
+        # Namespace messages under their location, as in
+        # `webargs.core.Parser._async_on_validation_error`, merging messages of
+        # the same location
+        messages: typing.Dict[str, typing.Any] = {}
+        for error, (_, _, location), _ in errors:
+            existing = messages.get(location)
+            if isinstance(existing, dict) and isinstance(error.messages, dict):
+                messages[location] = {**existing, **error.messages}
+            else:
+                messages[location] = error.messages
+        first_error, (req, schema, _), kwargs = errors[0]
+        error = ValidationError(messages)
+        error_handler = self.error_callback or self.handle_error
+        result = error_handler(error, req, schema, **kwargs)
+        if inspect.isawaitable(result):
+            await result
+        raise ValueError(
+            "_on_validation_error hook did not raise an exception"
+        ) from first_error
+
+    def use_kwargs(
+        self, argmap: ArgMap, req: typing.Optional[Request] = None, **kwargs
+    ) -> typing.Callable[..., typing.Callable]:
+        """Decorator that injects parsed arguments into a view function or method
+        as keyword arguments.
+
+        Receives the same arguments as :meth:`use_args`, except ``as_kwargs`` and
+        ``arg_name``.
+        """
+        return self.use_args(argmap, req, as_kwargs=True, **kwargs)
+
+    def message_parser(
+        self,
+        argmap: typing.Union[Schema, typing.Type[Schema], typing.Mapping[str, Field]],
+        *,
+        unknown: typing.Optional[str] = core._UNKNOWN_DEFAULT_PARAM,
+        validate: ValidateArg = None,
+        compile: bool = True,
+        error_close_code: typing.Optional[int] = None,
+    ) -> MessageParser:
+        """Return a `MessageParser` that loads WebSocket messages with ``argmap``.
+
+        The schema is built once, here, and is reused for every message of
+        every connection: create message parsers at import time, not per
+        connection. ::
+
+            messages = parser.message_parser({"text": fields.Str(required=True)})
+
+
+            async def chat(websocket):
+                await websocket.accept()
+                async for message in messages.iter_messages(websocket):
+                    await websocket.send_json({"echo": message["text"]})
+
+        :param bool compile: Load dict argmaps and `Schema` classes with a
+            compiled loader (see ``use_annotations``).
+        :param int error_close_code: Close the connection with this code when a
+            message is invalid, instead of answering with an error frame.
+        """
+        if compile and _is_cacheable_argmap(argmap):
+            if isinstance(argmap, type):
+                schema_cls = argmap
+            else:
+                schema_cls = self.schema_class.from_dict(dict(argmap))  # type: ignore
+            schema = compile_schema(schema_cls)()
+        else:
+            schema = self.get_schema(argmap)
+        return MessageParser(
+            self,
+            schema,
+            unknown=self._get_unknown(unknown, "message"),
+            validators=core._ensure_list_of_callables(validate),
+            error_close_code=error_close_code,
+        )
+
+    def use_message_args(
+        self,
+        argmap: typing.Union[Schema, typing.Type[Schema], typing.Mapping[str, Field]],
+        **kwargs,
+    ) -> typing.Callable[[typing.Callable], typing.Callable]:
+        """Decorator that loads the message passed to a WebSocket message
+        handler, e.g. `starlette.endpoints.WebSocketEndpoint.on_receive`.
+        The message is the last positional argument of the handler. Invalid
+        messages are handled as described in `MessageParser`, and are not
+        passed to the handler.
+
+        Receives the same arguments as :meth:`message_parser`.
+        """
+        return self.message_parser(argmap, **kwargs).use
+
     def load_path_params(self, req: Request, schema: Schema) -> typing.Any:
         """Return the request's ``path_params`` or ``missing`` if there are none."""
         return req.path_params or core.missing
 
     def load_querystring(self, req: Request, schema: Schema) -> MultiDictProxy:
-        """Return query params from the request as a MultiDictProxy."""
-        return MultiDictProxy(req.query_params, schema)
+        """Return query params from the request as a MultiDictProxy.
+
+        The raw query string is scanned for the keys of the schema, and only
+        their values are decoded.
+        """
+        query_string = req.scope.get("query_string", b"")
+        max_length = self.max_query_string_length
+        if max_length is not None and len(query_string) > max_length:
+            self._handle_query_too_long_error(req, max_length)
+        delimiter = self.query_list_delimiter
+        query_params = QueryParams(
+            query_string,
+            self._get_location_plan(schema, "query").data_keys,
+            list_delimiter=delimiter.encode("utf-8") if delimiter else None,
+            max_params=self.max_query_params,
+        )
+        return MultiDictProxy(query_params, schema)
 
     def load_headers(self, req: Request, schema: Schema) -> MultiDictProxy:
-        """Return headers from the request as a MultiDictProxy."""
-        return MultiDictProxy(req.headers, schema)
+        """Return headers from the request as a MultiDictProxy.
 
-    def load_cookies(self, req: Request, schema: Schema):
-        """Return cookies from the request."""
-        return req.cookies
+        Headers are looked up in a case-insensitive index, built once per request.
+        """
+        return MultiDictProxy(HeaderIndex.from_scope(req.scope), schema)
+
+    def load_cookies(self, req: Request, schema: Schema) -> LazyCookies:
+        """Return cookies from the request. Only the cookies that are looked up
+        are decoded.
+        """
+        return LazyCookies.from_scope(req.scope)
+
+    async def _read_body(self, req: Request) -> bytes:
+        """Return the request body, enforcing ``max_body_size``.
+
+        When a limit is set, the body is read from ``req.stream()`` and the read
+        is aborted as soon as the limit is exceeded.
+        """
+        max_body_size = self._get_option("max_body_size")
+        if max_body_size is None or hasattr(req, "_body"):
+            body = await req.body()
+            if max_body_size is not None and len(body) > max_body_size:
+                self._handle_body_too_large_error(req, max_body_size)
+            return body
+        chunks = [chunk async for chunk in self._iter_body(req, max_body_size)]
+        body = b"".join(chunks)
+        # Starlette reads the cached body in ``req.body()``, ``req.json()`` and
+        # ``req.form()``
+        req._body = body
+        return body
+
+    async def _iter_body(
+        self, req: Request, max_body_size: typing.Optional[int]
+    ) -> typing.AsyncIterator[bytes]:
+        """Yield chunks of the request body, aborting with a 413 error once
+        ``max_body_size`` is exceeded.
+        """
+        if max_body_size is not None:
+            content_length = req.headers.get("content-length", "")
+            if content_length.isdigit() and int(content_length) > max_body_size:
+                self._handle_body_too_large_error(req, max_body_size)
+        size = 0
+        async for chunk in req.stream():
+            size += len(chunk)
+            if max_body_size is not None and size > max_body_size:
+                self._handle_body_too_large_error(req, max_body_size)
+            yield chunk
 
     async def load_json(self, req: Request, schema: Schema) -> typing.Dict:
         """Return a parsed json payload from the request."""
         if not is_json_request(req):
             return core.missing
+        body = await self._read_body(req)
+        if not body:
+            return core.missing
         try:
-            json_data = await req.json()
-        except json.JSONDecodeError as exc:
-            if exc.doc == "":
-                return core.missing
-            else:
-                return self._handle_invalid_json_error(exc, req)
-        except UnicodeDecodeError as exc:
+            return self.json_loads(body)
+        except self.JSON_DECODE_ERRORS as exc:
             return self._handle_invalid_json_error(exc, req)
-        return json_data
+
+    async def _load_binary(
+        self,
+        req: Request,
+        location: str,
+        mimetypes: typing.FrozenSet[str],
+        loads: typing.Callable[[bytes], typing.Any],
+    ) -> typing.Any:
+        # The body is decoded from the bytes it was received as, without an
+        # intermediate copy or text decoding
+        if core.get_mimetype(req.headers.get("content-type", "")) not in mimetypes:
+            return core.missing
+        body = await self._read_body(req)
+        if not body:
+            return core.missing
+        try:
+            return loads(body)
+        except self.BINARY_DECODE_ERRORS as exc:
+            return self._handle_invalid_body_error(exc, req, location)
+
+    async def load_msgpack(self, req: Request, schema: Schema) -> typing.Any:
+        """Return a parsed msgpack payload from the request. Binary values are
+        loaded as `bytes`.
+        """
+        return await self._load_binary(
+            req, "msgpack", binary.MSGPACK_MIMETYPES, self.msgpack_loads
+        )
+
+    async def load_cbor(self, req: Request, schema: Schema) -> typing.Any:
+        """Return a parsed CBOR payload from the request. Byte strings are
+        loaded as `bytes`.
+        """
+        return await self._load_binary(
+            req, "cbor", binary.CBOR_MIMETYPES, self.cbor_loads
+        )
 
     async def load_form(self, req: Request, schema: Schema) -> MultiDictProxy:
         """Return form values from the request as a MultiDictProxy."""
+        if self._get_option("max_body_size") is not None:
+            # Buffer the body within the limit; req.form() then parses the
+            # buffered body
+            await self._read_body(req)
         post_data = await req.form()
         return MultiDictProxy(post_data, schema)
 
     async def load_json_or_form(
         self, req: Request, schema: Schema
     ) -> typing.Union[typing.Dict, MultiDictProxy]:
-        data = await self.load_json(req, schema)
-        if data is not core.missing:
-            return data
-        return await self.load_form(req, schema)
+        """Return a parsed json payload or form values from the request, depending
+        on its content type.
+        """
+        content_type = req.headers.get("content-type")
+        if core.is_json(content_type):
+            return await self.load_json(req, schema)
+        if content_type and core.get_mimetype(content_type) in FORM_MIMETYPES:
+            return await self.load_form(req, schema)
+        return core.missing
+
+    async def load_body(self, req: Request, schema: Schema) -> typing.Any:
+        """Return a parsed JSON, msgpack or CBOR payload, or form values, from
+        the request, depending on its content type.
+        """
+        mimetype = core.get_mimetype(req.headers.get("content-type", ""))
+        if mimetype in binary.MSGPACK_MIMETYPES:
+            return await self.load_msgpack(req, schema)
+        if mimetype in binary.CBOR_MIMETYPES:
+            return await self.load_cbor(req, schema)
+        return await self.load_json_or_form(req, schema)
+
+    async def load_multipart(self, req: Request, schema: Schema) -> MultiDictProxy:
+        """Return ``multipart/form-data`` values from the request as a
+        MultiDictProxy, parsing the body as it is received.
+
+        Each non-file part is validated against its field as soon as it arrives,
+        so an invalid value fails the request before the rest of the body is read.
+        Files are spooled according to ``multipart_limits`` and returned as
+        unread `UploadFile` objects.
+        """
+        content_type = req.headers.get("content-type", "")
+        if core.get_mimetype(content_type) != "multipart/form-data":
+            return core.missing
+        multipart_parser = StreamingMultipartParser(
+            req.headers,
+            self._iter_body(req, self._get_option("max_body_size")),
+            limits=self.multipart_limits,
+            on_field=self._make_part_validator(schema),
+        )
+        try:
+            form = await multipart_parser.parse()
+        except MultipartLimitError as exc:
+            raise WebargsHTTPException(
+                413, exception=exc, messages={"multipart": [str(exc)]}
+            ) from exc
+        except ValueError as exc:
+            raise WebargsHTTPException(
+                400, exception=exc, messages={"multipart": [str(exc)]}
+            ) from exc
+        return self._makeproxy(form, schema)
+
+    def _make_part_validator(self, schema: Schema) -> typing.Callable[[str, str], None]:
+        """Return a callback that deserializes a single multipart value with its
+        field, raising a `ValidationError` keyed by the field's name.
+        """
+        multi_fields = tuple(self.KNOWN_MULTI_FIELDS)
+        # The field that checks each value: the items of multi-value fields are
+        # checked one by one, and delimited lists (``is_multiple = False``)
+        # with the field itself, as in `webargs.multidictproxy.MultiDictProxy`
+        part_fields: typing.Dict[str, typing.Optional[Field]] = {}
+        for name, field in schema.load_fields.items():
+            is_multiple = getattr(field, "is_multiple", None)
+            if is_multiple is None:
+                is_multiple = isinstance(field, multi_fields)
+            data_key = field.data_key if field.data_key is not None else name
+            part_fields[data_key] = (
+                getattr(field, "inner", None) if is_multiple else field
+            )
+
+        def validate_part(name: str, value: str) -> None:
+            field = part_fields.get(name)
+            if field is None:
+                return
+            try:
+                field.deserialize(value)
+            except ValidationError as error:
+                raise ValidationError({name: error.messages}) from error
+
+        return validate_part
 
     def _handle_invalid_json_error(
         self, error: Exception, req: Request, *args, **kwargs
     ) -> typing.NoReturn:
+        if self.lightweight_errors:
+            raise WebargsHTTPException(
+                400, messages={"json": ["Invalid JSON body."]}, body=INVALID_JSON_BODY
+            )
         raise WebargsHTTPException(
             400, exception=error, messages={"json": ["Invalid JSON body."]}
         )
 
+    def _handle_invalid_body_error(
+        self, error: Exception, req: Request, location: str
+    ) -> typing.NoReturn:
+        name = "CBOR" if location == "cbor" else location
+        messages = {location: [f"Invalid {name} body."]}
+        if self.lightweight_errors:
+            raise WebargsHTTPException(
+                400, messages=messages, body=self.error_bodies.encode(messages)
+            )
+        raise WebargsHTTPException(400, exception=error, messages=messages)
+
+    def _handle_body_too_large_error(
+        self, req: Request, max_body_size: int
+    ) -> typing.NoReturn:
+        messages = {
+            "body": [f"Request body exceeds the maximum size of {max_body_size} bytes."]
+        }
+        raise WebargsHTTPException(
+            413,
+            messages=messages,
+            body=self.error_bodies.encode(messages)
+            if self.lightweight_errors
+            else None,
+        )
+
+    def _handle_record_too_large_error(
+        self, error: RecordTooLargeError, req: Request, location: str
+    ) -> typing.NoReturn:
+        messages = {location: [str(error)]}
+        if self.lightweight_errors:
+            raise WebargsHTTPException(
+                413, messages=messages, body=self.error_bodies.encode(messages)
+            )
+        raise WebargsHTTPException(413, exception=error, messages=messages)
+
+    def _handle_query_too_long_error(
+        self, req: Request, max_length: int
+    ) -> typing.NoReturn:
+        messages = {
+            "query": [f"Query string exceeds the maximum length of {max_length} bytes."]
+        }
+        raise WebargsHTTPException(
+            414,
+            messages=messages,
+            body=self.error_bodies.encode(messages)
+            if self.lightweight_errors
+            else None,
+        )
+
     def get_request_from_view_args(
         self, view: typing.Callable, args: tuple, kwargs: dict
     ) -> Request:
         """Get request object from a handler function or method. Used internally by
         ``use_args`` and ``use_kwargs``.
+
+        The request may be a `WebSocket`, whose handshake arguments can be
+        parsed from any location that does not read a body.
         """
         req = None
         for arg in args:
-            if isinstance(arg, Request):
+            if isinstance(arg, HTTPConnection):
                 req = arg
                 break
-        assert isinstance(req, Request), "Request argument not found for handler"
-        return req
+        assert isinstance(req, HTTPConnection), "Request argument not found for handler"
+        return typing.cast(Request, req)
 
     def handle_error(
         self,
@@ -135,12 +1581,33 @@ class StarletteParser(AsyncParser):
     ) -> typing.NoReturn:
         """Handles errors during parsing. Aborts the current HTTP request and
         responds with a 422 error.
+
+        At most ``max_error_messages`` messages are reported.
+
+        Invalid handshake arguments of a WebSocket connection raise a
+        `WebargsWebSocketException` instead, which closes the connection with
+        code 1008 (policy violation).
         """
+        messages = truncate_messages(error.messages, self.max_error_messages)
+        if isinstance(req, WebSocket):
+            raise WebargsWebSocketException(
+                self.WEBSOCKET_ERROR_CLOSE_CODE,
+                close_reason(self.error_bodies.encode(messages), "Invalid arguments."),
+                messages=messages,
+                exception=None if self.lightweight_errors else error,
+            )
         status_code = error_status_code or self.DEFAULT_VALIDATION_STATUS
+        if self.lightweight_errors:
+            raise WebargsHTTPException(
+                status_code,
+                messages=messages,
+                headers=error_headers,
+                body=self.error_bodies.encode(messages),
+            )
         raise WebargsHTTPException(
             status_code,
             exception=error,
-            messages=error.messages,
+            messages=messages,
             schema=schema,
             headers=error_headers,
         )
@@ -150,25 +1617,67 @@ class StarletteParser(AsyncParser):
         fn: typing.Union[typing.Callable, typing.Type[HTTPEndpoint], None] = None,
         *,
         type_mapping: TypeMapping = None,
+        compile: bool = False,
+        response_schema: typing.Union[
+            Schema, typing.Type[Schema], typing.Mapping[str, Field], None
+        ] = None,
+        lazy: typing.Optional[bool] = None,
         **kwargs,
     ) -> typing.Union[typing.Callable[..., typing.Callable], typing.Type[HTTPEndpoint]]:
+        """Decorator that parses the request using the handler's type annotations
+        and injects the parsed arguments as keyword arguments.
+
+        If ``response_schema`` is passed, or if the handler's return annotation
+        describes a schema (e.g. ``typing.Annotated[dict, UserSchema]``), the
+        values returned by the handler are dumped with the schema and sent as a
+        JSON response encoded with ``json_dumps``. Returned `Response` objects
+        are sent as is.
+
+        :param type_mapping: Mapping of types to marshmallow field classes.
+        :param bool compile: Load arguments with a loader compiled for the
+            generated schema. Gives the same results and error messages as the
+            regular marshmallow load, with less overhead for flat scalar arguments.
+        :param response_schema: Schema, `Schema` class or dict of fields used to
+            dump the values returned by the handler. Takes precedence over the
+            return annotation.
+        :param bool lazy: Build the schemas on first use instead of at
+            decoration time. Defaults to the parser's ``lazy_annotations``.
+            Lazy handlers can be prepared ahead of requests with `warmup`.
+
+        Other keyword arguments are passed to :meth:`parse`. With ``partial``,
+        arguments left out of the request are not passed to the handler, so its
+        parameters need defaults.
+        """
         # Allow using this as either a decorator or a decorator factory.
         if fn is None:
             return functools.partial(
-                use_annotations, type_mapping=type_mapping, **kwargs
+                self.use_annotations,
+                type_mapping=type_mapping,
+                compile=compile,
+                response_schema=response_schema,
+                lazy=lazy,
+                **kwargs,
             )
-        type_mapping = type_mapping or self.TYPE_MAPPING
+        mapping = type_mapping or self.TYPE_MAPPING
+        if lazy is None:
+            lazy = self.lazy_annotations
 
         def decorator(func: typing.Callable) -> typing.Callable:
-            schema = annotations2schema(func, type_mapping=type_mapping)
+            plan = _AnnotationsPlan(self, func, mapping, compile, response_schema)
+            if not lazy:
+                plan.build()
 
             @functools.wraps(func)
             async def wrapper(*a, **kw):
+                plan.build()
                 request = self.get_request_from_view_args(func, a, kw)
-                parsed = await self.parse(schema, request, **kwargs)
+                parsed = await self.parse(plan.schema, request, **kwargs)
                 kw.update(parsed)
-                return await func(*a, **kw)
+                if plan.serializer is None:
+                    return await func(*a, **kw)
+                return plan.serializer.render(await func(*a, **kw))
 
+            wrapper.__webargs_starlette_annotations__ = plan  # type: ignore
             return wrapper
 
         if isinstance(fn, type) and issubclass(fn, HTTPEndpoint):
@@ -182,6 +1691,26 @@ class StarletteParser(AsyncParser):
         else:
             return decorator(fn)
 
+    def _get_response_serializer(
+        self,
+        func: typing.Callable,
+        response_schema: typing.Union[
+            Schema, typing.Type[Schema], typing.Mapping[str, Field], None
+        ],
+    ) -> typing.Optional[ResponseSerializer]:
+        """Return the serializer of the values returned by ``func``, if they are
+        described by ``response_schema`` or by its return annotation.
+        """
+        if response_schema is not None:
+            output_schema = self.get_schema(response_schema)
+            many = bool(output_schema.many)
+        else:
+            described = return_annotation2schema(func)
+            if described is None:
+                return None
+            output_schema, many = self.get_schema(described[0]), described[1]
+        return ResponseSerializer(output_schema, many=many, json_dumps=self.json_dumps)
+
 
 parser = StarletteParser()
 use_args = parser.use_args
@@ -0,0 +1,202 @@
+"""Incremental decoding of JSON array and NDJSON request bodies."""
+import codecs
+import json
+import typing
+
+#: Content types of newline-delimited JSON bodies
+NDJSON_MIMETYPES: typing.FrozenSet[str] = frozenset(
+    (
+        "application/x-ndjson",
+        "application/ndjson",
+        "application/jsonl",
+        "application/x-jsonlines",
+    )
+)
+
+_WHITESPACE = " \t\n\r"
+_decoder = json.JSONDecoder()
+# Decode errors this close to the end of the buffer may be caused by a value
+# cut by the end of a chunk, e.g. a truncated literal or escape sequence
+_TRUNCATION_MARGIN = 12
+# Characters that may continue a number, e.g. "0." or "1e-" before "5"
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+class RecordTooLargeError(ValueError):
+    """Raised when a record of a streamed body exceeds the maximum size."""
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__(f"Record exceeds the maximum size of {max_size} bytes.")
+        self.max_size = max_size
+
+
+class _TextReader:
+    """Text buffer over an async iterator of UTF-8 encoded chunks. Consumed text
+    is dropped each time chunks are read, so the buffer only ever holds the
+    value being decoded.
+    """
+
+    def __init__(
+        self,
+        chunks: typing.AsyncIterable[bytes],
+        max_record_size: typing.Optional[int] = None,
+    ) -> None:
+        self._chunks = chunks.__aiter__()
+        self._decode = codecs.getincrementaldecoder("utf-8")().decode
+        self.max_record_size = max_record_size
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    async def _read(self) -> typing.Optional[str]:
+        if self.eof:
+            return None
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self.eof = True
+            return self._decode(b"", final=True)
+        return self._decode(chunk)
+
+    async def fill(self, min_size: int = 0) -> bool:
+        """Append chunks to the buffer, until it holds at least ``min_size``
+        characters past the current position or the body is fully read. Return
+        `False` if the body was already fully read.
+        """
+        parts = [self.text[self.pos :]]
+        size = len(parts[0])
+        read = False
+        while True:
+            new_text = await self._read()
+            if new_text is None:
+                break
+            read = True
+            parts.append(new_text)
+            size += len(new_text)
+            if size >= min_size:
+                break
+        self.text = "".join(parts)
+        self.pos = 0
+        return read
+
+    async def peek(self) -> str:
+        """Skip whitespace and return the next character, or ``""`` at the end of
+        the body.
+        """
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in _WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not await self.fill():
+                return ""
+
+    async def _fill_record(self) -> bool:
+        # The value at the current position spans the whole buffer: check its
+        # size, then (at least) double the buffer, so that a value spanning many
+        # chunks is only decoded a logarithmic number of times
+        size = len(self.text) - self.pos
+        max_size = self.max_record_size
+        if max_size is not None and size > max_size:
+            raise RecordTooLargeError(max_size)
+        min_size = 2 * size
+        if max_size is not None:
+            min_size = min(min_size, max_size + 1)
+        return await self.fill(min_size)
+
+    async def decode_value(self) -> typing.Any:
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError as error:
+                # The value may be incomplete: retry once more text is available,
+                # unless the error is in the text already received
+                truncated = error.msg.startswith("Unterminated string") or (
+                    error.pos >= len(self.text) - _TRUNCATION_MARGIN
+                )
+                if not truncated or not await self._fill_record():
+                    raise
+                continue
+            # A number at the end of the buffer may continue in the next chunk,
+            # including when its end so far is not a valid number
+            if _NUMBER_CHARS.issuperset(self.text[end:]) and (
+                await self._fill_record()
+            ):
+                continue
+            self.pos = end
+            return value
+
+
+async def iter_json_array(
+    chunks: typing.AsyncIterable[bytes],
+    max_record_size: typing.Optional[int] = None,
+) -> typing.AsyncIterator[typing.Any]:
+    """Yield the items of the top-level JSON array encoded in ``chunks``, as
+    soon as each item has been received. An empty body yields nothing.
+
+    Raises `ValueError` if the body is not a valid JSON array, and
+    `RecordTooLargeError` if an item is longer than ``max_record_size``
+    characters.
+    """
+    reader = _TextReader(chunks, max_record_size)
+    char = await reader.peek()
+    if char == "":
+        return
+    if char != "[":
+        raise ValueError("Expected a JSON array.")
+    reader.pos += 1
+    if await reader.peek() == "]":
+        reader.pos += 1
+    else:
+        while True:
+            yield await reader.decode_value()
+            char = await reader.peek()
+            reader.pos += 1
+            if char == "]":
+                break
+            if char != ",":
+                raise ValueError("Expected ',' or ']' after array item.")
+            await reader.peek()
+    if await reader.peek() != "":
+        raise ValueError("Extra data after JSON array.")
+
+
+async def iter_ndjson(
+    chunks: typing.AsyncIterable[bytes],
+    loads: typing.Callable[[bytes], typing.Any],
+    max_record_size: typing.Optional[int] = None,
+) -> typing.AsyncIterator[typing.Any]:
+    """Yield the values of a newline-delimited JSON body, decoding each line with
+    ``loads`` as soon as it has been received. Blank lines are skipped.
+
+    Raises `RecordTooLargeError` if a line is longer than ``max_record_size``
+    bytes.
+    """
+    # Pieces of the line being received, joined once its end is received
+    pending: typing.List[bytes] = []
+    pending_size = 0
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end == -1:
+                break
+            line = chunk[start:end]
+            if pending:
+                line = b"".join(pending) + line
+                pending, pending_size = [], 0
+            if max_record_size is not None and len(line) > max_record_size:
+                raise RecordTooLargeError(max_record_size)
+            if line.strip():
+                yield loads(line)
+            start = end + 1
+        if start < len(chunk):
+            pending.append(chunk[start:])
+            pending_size += len(chunk) - start
+            if max_record_size is not None and pending_size > max_record_size:
+                raise RecordTooLargeError(max_record_size)
+    line = b"".join(pending)
+    if line.strip():
+        yield loads(line)
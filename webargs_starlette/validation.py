@@ -0,0 +1,304 @@
+"""Concurrent execution of coroutine validators.
+
+marshmallow calls validators synchronously, so schemas with coroutine
+validators are loaded through a copy whose fields do not have them
+(`split_async_validations`), and the coroutine validators are then awaited on
+the loaded data (`run_validations`). Fields nested in ``List``, ``Tuple``,
+``Dict`` and ``Nested`` fields are validated as well, and their errors are
+reported at the path of the invalid value, as marshmallow does. The fields of
+the original schema are left unchanged.
+"""
+import asyncio
+import copy
+import functools
+import inspect
+import typing
+
+from marshmallow import Schema, ValidationError, fields
+from marshmallow.fields import Field
+
+from .compiler import compile_loader
+
+#: Key of the errors of validators of the whole arguments, as in marshmallow
+SCHEMA_KEY = "_schema"
+#: Error message of validators that did not finish in time
+TIMEOUT_MESSAGE = "Validation timed out."
+
+
+def is_async_callable(obj: typing.Any) -> bool:
+    """Return whether calling ``obj`` returns a coroutine."""
+    while isinstance(obj, functools.partial):
+        obj = obj.func
+    return inspect.iscoroutinefunction(obj) or inspect.iscoroutinefunction(
+        getattr(obj, "__call__", None)
+    )
+
+
+class AsyncValidation(typing.NamedTuple):
+    """A coroutine validator to run on a value."""
+
+    #: Path of the errors of the validator, e.g. ``("ids", 0)``
+    path: typing.Tuple[typing.Hashable, ...]
+    validator: typing.Callable[[typing.Any], typing.Awaitable[typing.Any]]
+    value: typing.Any
+    #: Error message used when the validator returns ``False``
+    failed_message: str
+
+
+#: Appends the validations of a loaded value, found at a path, to a list
+Collector = typing.Callable[
+    [typing.Any, typing.Tuple[typing.Hashable, ...], typing.List[AsyncValidation]],
+    None,
+]
+
+# A field or schema without coroutine validators (the original one if it had
+# none), and the collector of its validations
+_FieldSplit = typing.Tuple[Field, typing.Optional[Collector]]
+_SchemaSplit = typing.Tuple[Schema, typing.Optional[Collector]]
+# Schemas being split, by class and options, to resolve schemas nested in
+# themselves: the copy without coroutine validators and its collector, once built
+_Pending = typing.Dict[typing.Hashable, typing.List[typing.Any]]
+
+
+def _items_collector(collect: Collector) -> Collector:
+    # Validations of the items of a list, reported under their index
+    def collect_items(value, path, out):
+        if isinstance(value, (list, tuple)):
+            for index, item in enumerate(value):
+                collect(item, path + (index,), out)
+
+    return collect_items
+
+
+def _tuple_collector(
+    item_collectors: typing.List[typing.Optional[Collector]],
+) -> typing.Optional[Collector]:
+    if not any(item_collectors):
+        return None
+
+    def collect_tuple(value, path, out):
+        for index, (collect, item) in enumerate(zip(item_collectors, value)):
+            if collect is not None:
+                collect(item, path + (index,), out)
+
+    return collect_tuple
+
+
+def _mapping_collector(
+    collect_key: typing.Optional[Collector], collect_value: typing.Optional[Collector]
+) -> typing.Optional[Collector]:
+    # Errors are reported as marshmallow does, e.g. ``{"a": {"value": [...]}}``
+    if collect_key is None and collect_value is None:
+        return None
+
+    def collect_mapping(value, path, out):
+        for key, item in value.items():
+            if collect_key is not None:
+                collect_key(key, path + (key, "key"), out)
+            if collect_value is not None:
+                collect_value(item, path + (key, "value"), out)
+
+    return collect_mapping
+
+
+def _split_optional_field(
+    field: typing.Optional[Field], pending: _Pending
+) -> typing.Tuple[typing.Optional[Field], typing.Optional[Collector]]:
+    return (None, None) if field is None else _split_field(field, pending)
+
+
+def _split_field(field: Field, pending: _Pending) -> _FieldSplit:
+    validators = tuple(v for v in field.validators if is_async_callable(v))
+    # Attributes of the copy of the field, if it needs one
+    changes: typing.Dict[str, typing.Any] = {}
+    inner: typing.Optional[Collector] = None
+    if isinstance(field, fields.Nested) and not isinstance(field, fields.Pluck):
+        nested_schema = field.schema
+        split_schema, inner = _split_schema(nested_schema, pending)
+        if split_schema is not nested_schema:
+            # The copy loads with the split schema, instead of one built from
+            # the declared fields of its class
+            changes.update(nested=split_schema, _schema=None)
+        if inner is not None and (field.many or nested_schema.many):
+            inner = _items_collector(inner)
+    elif isinstance(field, fields.List):
+        split_inner, inner = _split_field(field.inner, pending)
+        if split_inner is not field.inner:
+            changes["inner"] = split_inner
+        if inner is not None:
+            inner = _items_collector(inner)
+    elif isinstance(field, fields.Tuple):
+        splits = [_split_field(item, pending) for item in field.tuple_fields]
+        if any(
+            item is not split for item, (split, _) in zip(field.tuple_fields, splits)
+        ):
+            changes["tuple_fields"] = [split for split, _ in splits]
+        inner = _tuple_collector([collect for _, collect in splits])
+    elif isinstance(field, fields.Mapping):
+        key_field, collect_key = _split_optional_field(field.key_field, pending)
+        value_field, collect_value = _split_optional_field(field.value_field, pending)
+        if key_field is not field.key_field:
+            changes["key_field"] = key_field
+        if value_field is not field.value_field:
+            changes["value_field"] = value_field
+        inner = _mapping_collector(collect_key, collect_value)
+    if not validators and not changes:
+        return field, None
+    split = copy.copy(field)
+    split.validators = [v for v in field.validators if v not in validators]
+    for name, value in changes.items():
+        setattr(split, name, value)
+    message = field.error_messages["validator_failed"]
+
+    def collect(value, path, out):
+        # Like marshmallow, missing and null values are not validated
+        if value is None:
+            return
+        out.extend(
+            AsyncValidation(path, validator, value, message) for validator in validators
+        )
+        if inner is not None:
+            inner(value, path, out)
+
+    return split, collect
+
+
+def _split_schema(schema: Schema, pending: _Pending) -> _SchemaSplit:
+    key = (type(schema), tuple(schema.fields), bool(schema.many))
+    cell = pending.get(key)
+    if cell is not None:
+        # A schema nested in itself: it is being split
+        building = cell
+
+        def collect_nested(value, path, out):
+            collect = building[1]
+            if collect is not None:
+                collect(value, path, out)
+
+        return building[0], collect_nested
+    split = copy.copy(schema)
+    cell = pending[key] = [split, None]
+    splits = [
+        (name, field, *_split_field(field, pending))
+        for name, field in schema.declared_fields.items()
+    ]
+    if all(split_field is field for _, field, split_field, _ in splits):
+        return schema, None
+    # Binding the unchanged fields to the copy would change their parent
+    split.declared_fields = schema.dict_class(
+        (name, copy.deepcopy(field) if split_field is field else split_field)
+        for name, field, split_field, _ in splits
+    )
+    collectors = [
+        (
+            field.attribute or name,
+            field.data_key if field.data_key is not None else name,
+            collect,
+        )
+        for name, field, _, collect in splits
+        if collect is not None and name in schema.load_fields
+    ]
+    split._init_fields()
+    # The loader of a compiled schema must load with the split fields
+    if getattr(split, "_compiled_loader", None) is not None:
+        split._compiled_loader = compile_loader(  # type: ignore[attr-defined]
+            split, partial=split.partial
+        )
+    if not collectors:
+        return split, None
+
+    def collect_schema(value, path, out):
+        if isinstance(value, typing.Mapping):
+            for attribute, data_key, collect in collectors:
+                collect(value.get(attribute), path + (data_key,), out)
+
+    cell[1] = collect_schema
+    return split, collect_schema
+
+
+def split_async_validations(
+    schema: Schema,
+) -> typing.Tuple[Schema, typing.Optional[Collector]]:
+    """Return a copy of ``schema`` whose fields, including the fields nested in
+    its container and ``Nested`` fields, do not have coroutine validators, and
+    a function collecting the `AsyncValidation` of the data it loads.
+
+    If there are no coroutine validators, ``schema`` itself is returned, with
+    `None`. The collector is called with the loaded data, an empty path and the
+    list to which validations are appended.
+    """
+    return _split_schema(schema, {})
+
+
+def _add_messages(
+    errors: typing.Dict[typing.Hashable, typing.Any],
+    path: typing.Tuple[typing.Hashable, ...],
+    messages: typing.List[typing.Any],
+) -> None:
+    node = errors
+    for key in path[:-1]:
+        child = node.setdefault(key, {})
+        if isinstance(child, list):
+            # Errors of a value and of its items: as in marshmallow, the
+            # value's own errors go under ``_schema``
+            child = node[key] = {SCHEMA_KEY: child}
+        node = child
+    key = path[-1]
+    existing = node.get(key)
+    if isinstance(existing, dict):
+        existing.setdefault(SCHEMA_KEY, []).extend(messages)
+    else:
+        node.setdefault(key, []).extend(messages)
+
+
+async def run_validations(
+    validations: typing.Sequence[AsyncValidation],
+    *,
+    concurrency: typing.Optional[int] = None,
+    timeout: typing.Optional[float] = None,
+) -> typing.Dict[typing.Hashable, typing.Any]:
+    """Run ``validations`` concurrently and return their error messages, nested
+    by path.
+
+    Like marshmallow validators, coroutine validators fail by raising a
+    `ValidationError` or returning ``False``. Other exceptions are propagated.
+
+    :param int concurrency: Maximum number of validators running at once.
+    :param float timeout: Time, in seconds, after which the validators that
+        are still running are cancelled and reported as failed.
+    """
+    if not validations:
+        return {}
+    semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+
+    async def run(validation: AsyncValidation) -> typing.Any:
+        if semaphore is None:
+            return await validation.validator(validation.value)
+        async with semaphore:
+            return await validation.validator(validation.value)
+
+    tasks = [asyncio.ensure_future(run(validation)) for validation in validations]
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+    finally:
+        for task in tasks:
+            task.cancel()
+    errors: typing.Dict[typing.Hashable, typing.Any] = {}
+    for validation, task in zip(validations, tasks):
+        if task in pending:
+            messages: typing.List[typing.Any] = [TIMEOUT_MESSAGE]
+        else:
+            try:
+                result = task.result()
+            except ValidationError as error:
+                messages = (
+                    error.messages
+                    if isinstance(error.messages, list)
+                    else [error.messages]
+                )
+            else:
+                if result is not False:
+                    continue
+                messages = [validation.failed_message]
+        _add_messages(errors, validation.path, messages)
+    return errors
@@ -0,0 +1,92 @@
+"""Ahead-of-time building of the schemas of ``use_annotations`` handlers."""
+import concurrent.futures
+import logging
+import time
+import typing
+
+from starlette.endpoints import HTTPEndpoint
+
+from .starletteparser import HTTP_METHOD_NAMES
+
+logger = logging.getLogger("webargs_starlette")
+
+# Attribute holding the schemas of a handler decorated with ``use_annotations``
+PLAN_ATTRIBUTE = "__webargs_starlette_annotations__"
+
+
+class WarmupResult(typing.NamedTuple):
+    """Schema build of one handler, reported by `warmup`."""
+
+    #: Path of the route, including the paths of enclosing mounts
+    path: str
+    #: Qualified name of the handler
+    handler: str
+    #: Time spent building the handler's schemas, in seconds
+    build_time: float
+    #: Whether the schemas were built by this `warmup` call, rather than at
+    #: decoration time or by an earlier request
+    built_now: bool
+
+
+def iter_annotated_handlers(
+    routes: typing.Iterable[typing.Any], prefix: str = ""
+) -> typing.Iterator[typing.Tuple[str, typing.Callable]]:
+    """Yield ``(path, handler)`` for each handler decorated with
+    ``use_annotations`` in ``routes``, descending into mounts and routers.
+    """
+    for route in routes:
+        path = prefix + getattr(route, "path", "")
+        endpoint = getattr(route, "endpoint", None)
+        if isinstance(endpoint, type) and issubclass(endpoint, HTTPEndpoint):
+            handlers = [
+                getattr(endpoint, name)
+                for name in HTTP_METHOD_NAMES
+                if hasattr(endpoint, name)
+            ]
+        elif endpoint is not None:
+            handlers = [endpoint]
+        else:
+            handlers = []
+        for handler in handlers:
+            if hasattr(handler, PLAN_ATTRIBUTE):
+                yield path, handler
+        # Mounts and routers
+        sub_routes = getattr(route, "routes", None)
+        if sub_routes is None:
+            sub_routes = getattr(getattr(route, "app", None), "routes", None)
+        if sub_routes:
+            yield from iter_annotated_handlers(sub_routes, path)
+
+
+def _build(path: str, handler: typing.Callable) -> WarmupResult:
+    plan = getattr(handler, PLAN_ATTRIBUTE)
+    built_now = not plan.is_built
+    plan.build()
+    return WarmupResult(path, handler.__qualname__, plan.build_time, built_now)
+
+
+def warmup(
+    app: typing.Any, *, max_workers: typing.Optional[int] = None
+) -> typing.List[WarmupResult]:
+    """Build the schemas of every ``use_annotations`` handler of ``app``
+    (a Starlette app or router), so that lazy handlers do not build them on
+    their first request. Call it at startup, e.g. from a lifespan handler.
+
+    :param int max_workers: Build the schemas in a pool of this many threads.
+        By default, they are built one after the other.
+    :return: The `WarmupResult` of each handler, in the order of the routes.
+    """
+    start = time.perf_counter()
+    handlers = list(iter_annotated_handlers(app.routes))
+    if max_workers is not None and max_workers > 1:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(lambda item: _build(*item), handlers))
+    else:
+        results = [_build(path, handler) for path, handler in handlers]
+    logger.debug(
+        "Built the schemas of %d handlers (%d on warmup) in %.1fms",
+        len(results),
+        sum(result.built_now for result in results),
+        (time.perf_counter() - start) * 1000,
+    )
+    return results
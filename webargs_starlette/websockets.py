@@ -0,0 +1,213 @@
+"""Validation of WebSocket handshakes and messages."""
+import functools
+import typing
+
+from marshmallow import Schema, ValidationError
+from starlette import status
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from .errors import truncate_messages
+from .validation import is_async_callable, split_async_validations
+
+try:
+    from starlette.exceptions import WebSocketException
+except ImportError:  # pragma: no cover
+    # Starlette<0.24
+
+    class WebSocketException(Exception):  # type: ignore[no-redef]
+        def __init__(self, code: int, reason: typing.Optional[str] = None) -> None:
+            self.code = code
+            self.reason = reason or ""
+
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from .starletteparser import StarletteParser
+
+#: Location under which the errors of a message are reported
+MESSAGE_LOCATION = "message"
+#: Close reasons must fit in a control frame
+MAX_CLOSE_REASON_SIZE = 123
+
+
+class WebargsWebSocketException(WebSocketException):
+    """Raised when the handshake arguments of a WebSocket connection are invalid.
+    Starlette closes the connection with ``code`` and ``reason``.
+
+    Stores the validation messages and the underlying exception.
+    """
+
+    def __init__(
+        self,
+        code: int,
+        reason: typing.Optional[str] = None,
+        messages: typing.Optional[dict] = None,
+        exception: typing.Optional[Exception] = None,
+    ) -> None:
+        super().__init__(code, reason)
+        self.messages = messages
+        self.exception = exception
+
+
+def close_reason(body: bytes, default: str) -> str:
+    """Return ``body`` as a close reason, or ``default`` if it is too long."""
+    return body.decode("utf-8") if len(body) <= MAX_CLOSE_REASON_SIZE else default
+
+
+class MessageParser:
+    """Loads the messages of WebSocket connections with a schema built once,
+    when the parser is created. Created with `StarletteParser.message_parser`.
+
+    Invalid messages are answered with an error frame, e.g.
+    ``{"message": {"id": ["Not a valid integer."]}}``, and skipped; or, when
+    ``error_close_code`` is set, the connection is closed with that code.
+    Messages that are not valid JSON are reported under ``"message"`` as well,
+    and close the connection with code 1007 when ``error_close_code`` is set.
+
+    Coroutine validators are awaited by `async_load`, as by the parser.
+    """
+
+    def __init__(
+        self,
+        parser: "StarletteParser",
+        schema: Schema,
+        *,
+        unknown: typing.Optional[str],
+        validators: typing.List[typing.Callable],
+        error_close_code: typing.Optional[int],
+    ) -> None:
+        self.parser = parser
+        # Loads messages without the coroutine validators of ``schema``
+        self.schema, self._collect_validations = split_async_validations(schema)
+        self.validators = [v for v in validators if not is_async_callable(v)]
+        self.async_validators = [v for v in validators if is_async_callable(v)]
+        self.error_close_code = error_close_code
+        self._load_kwargs = {"unknown": unknown} if unknown else {}
+
+    def load(self, data: typing.Any, websocket: typing.Optional[WebSocket] = None):
+        """Load a message, raising a `ValidationError` if it is invalid.
+
+        ``data`` is decoded with the parser's ``json_loads`` if it is a text or
+        bytes frame. Raises a `ValueError` if the schema or ``validate`` have
+        coroutine validators, which only `async_load` runs.
+        """
+        if self._collect_validations is not None or self.async_validators:
+            raise ValueError(
+                "Messages with coroutine validators must be loaded with async_load"
+            )
+        return self._load(self._decode(data), websocket)
+
+    async def async_load(
+        self, data: typing.Any, websocket: typing.Optional[WebSocket] = None
+    ) -> typing.Any:
+        """Load a message as `load` does, then await the coroutine validators."""
+        return await self._async_load(self._decode(data), websocket)
+
+    def _decode(self, data: typing.Any) -> typing.Any:
+        # Text frames are encoded, since ``json_loads`` receives bytes
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if isinstance(data, bytes):
+            data = self.parser.json_loads(data)
+        return data
+
+    async def _async_load(
+        self, data: typing.Any, websocket: typing.Optional[WebSocket]
+    ) -> typing.Any:
+        result = self._load(data, websocket)
+        await self.parser._await_validators(
+            result, self._collect_validations, self.async_validators
+        )
+        return result
+
+    def _load(self, data: typing.Any, websocket: typing.Optional[WebSocket]):
+        data = self.parser.pre_load(
+            data, schema=self.schema, req=websocket, location=MESSAGE_LOCATION
+        )
+        result = self.schema.load(data, **self._load_kwargs)
+        self.parser._validate_arguments(result, self.validators)
+        return result
+
+    async def handle_error(
+        self, websocket: WebSocket, messages: typing.Any, close_code: int
+    ) -> None:
+        """Send an error frame for an invalid message, or close the connection."""
+        messages = truncate_messages(messages, self.parser.max_error_messages)
+        body = self.parser.error_bodies.encode({MESSAGE_LOCATION: messages})
+        if self.error_close_code is None:
+            await websocket.send_text(body.decode("utf-8"))
+        else:
+            await websocket.close(
+                code=close_code, reason=close_reason(body, "Invalid message.")
+            )
+
+    async def _parse(
+        self, websocket: WebSocket, data: typing.Any
+    ) -> typing.Tuple[typing.Any, typing.Optional[int]]:
+        # Return the loaded message, or the close code that applies to the error
+        messages: typing.Any
+        try:
+            data = self._decode(data)
+        except self.parser.JSON_DECODE_ERRORS:
+            messages = ["Invalid JSON."]
+            close_code = status.WS_1007_INVALID_FRAME_PAYLOAD_DATA
+        else:
+            try:
+                return await self._async_load(data, websocket), None
+            except ValidationError as error:
+                messages = error.messages
+                close_code = self.error_close_code or status.WS_1008_POLICY_VIOLATION
+        await self.handle_error(websocket, messages, close_code)
+        return None, close_code
+
+    async def parse(self, websocket: WebSocket, data: typing.Any) -> typing.Any:
+        """Return the loaded message, or ``None`` if it is invalid, in which
+        case the error has been handled.
+        """
+        result, _ = await self._parse(websocket, data)
+        return result
+
+    async def receive(self, websocket: WebSocket) -> typing.Any:
+        """Receive the next valid message of ``websocket``, handling invalid
+        messages on the way.
+
+        Raises `WebSocketDisconnect` when the client disconnects, or when the
+        connection is closed because of an invalid message.
+        """
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            data = message.get("text")
+            if data is None:
+                data = message.get("bytes")
+            result, close_code = await self._parse(websocket, data)
+            if close_code is None:
+                return result
+            if self.error_close_code is not None:
+                raise WebSocketDisconnect(close_code)
+
+    async def iter_messages(
+        self, websocket: WebSocket
+    ) -> typing.AsyncIterator[typing.Any]:
+        """Yield the valid messages of ``websocket`` until it is disconnected."""
+        while True:
+            try:
+                yield await self.receive(websocket)
+            except WebSocketDisconnect:
+                return
+
+    def use(self, func: typing.Callable) -> typing.Callable:
+        """Decorate a message handler, e.g. `WebSocketEndpoint.on_receive`, whose
+        last positional argument is a message. The handler is called with the
+        loaded message, and not called for invalid messages.
+        """
+
+        @functools.wraps(func)
+        async def wrapper(*args):
+            websocket = next(arg for arg in args if isinstance(arg, WebSocket))
+            result, close_code = await self._parse(websocket, args[-1])
+            if close_code is not None:
+                return None
+            return await func(*args[:-1], result)
+
+        return wrapper